@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shutil
+import time
+
+from generate_violations import VIOLATING_POSTS_BY_SUBREDDIT, create_post_json
+
+PACKED_POSTS_FILE = "posts.jsonl"
+PACKED_INDEX_FILE = "posts.index.json"
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+class LengthDistribution:
+    """Character counts: fixed:<n>, uniform:<low>:<high>, normal:<mean>:<std> or lognormal:<median>:<sigma>"""
+
+    ARITY = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, spec, minimum=0, maximum=None):
+        kind, *params = spec.split(":")
+        if kind not in self.ARITY or len(params) != self.ARITY[kind]:
+            raise ValueError(f"Invalid distribution spec '{spec}'")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            value = rng.gauss(self.params[0], self.params[1])
+        else:
+            value = self.params[0] * math.exp(rng.gauss(0, self.params[1]))
+        value = max(self.minimum, int(value))
+        return min(value, self.maximum) if self.maximum is not None else value
+
+
+def parse_violation_mix(spec, rule_indexes):
+    """'uniform' or 'rule_index:weight,...' e.g. '0:3,5:1,12:1'"""
+    if not spec or spec == "uniform":
+        return {idx: 1.0 for idx in rule_indexes}
+    weights = {}
+    for item in spec.split(","):
+        idx, _, weight = item.partition(":")
+        idx = int(idx)
+        if idx not in rule_indexes:
+            raise ValueError(f"No violation template for rule index {idx}")
+        weights[idx] = float(weight or 1)
+    return weights
+
+
+def load_source_corpus(source_dir):
+    posts = []
+    comments = []
+    for post_dir in sorted((d for d in os.scandir(source_dir) if d.is_dir()), key=lambda d: d.name):
+        with open(os.path.join(post_dir.path, "post.json"), "r", encoding="utf-8") as f:
+            post = json.load(f)["data"]
+        posts.append({"title": post.get("title", ""), "body": post.get("selftext", "")})
+
+        comments_file = os.path.join(post_dir.path, "comments.json")
+        if os.path.exists(comments_file):
+            with open(comments_file, "r", encoding="utf-8") as f:
+                comments.extend(c["body"] for c in json.load(f) if c.get("body"))
+
+    if not posts:
+        raise FileNotFoundError(f"No posts found in {source_dir}")
+    return posts, comments
+
+
+class CorpusGenerator:
+    def __init__(self, source_dir, subreddit_name, seed=0, violation_rate=0.05, violation_mix="uniform",
+                 body_length="lognormal:600:0.9", comments_per_post="lognormal:6:1.0",
+                 max_depth=6, reply_probability=0.6, full_records=False):
+        self.rng = random.Random(seed)
+        self.subreddit_name = subreddit_name
+        self.violation_rate = violation_rate
+        self.body_length = LengthDistribution(body_length, minimum=0, maximum=40000)
+        self.comments_per_post = LengthDistribution(comments_per_post, minimum=0, maximum=500)
+        self.max_depth = max_depth
+        self.reply_probability = reply_probability
+        self.full_records = full_records
+
+        self.source_posts, source_comments = load_source_corpus(source_dir)
+        self.comment_pool = source_comments or [p["body"] for p in self.source_posts if p["body"]]
+        self.sentence_pool = [s for text in self.comment_pool for s in SENTENCE_SPLIT.split(text) if 20 <= len(s) <= 400]
+
+        source_name = os.path.basename(os.path.normpath(source_dir))
+        self.templates = VIOLATING_POSTS_BY_SUBREDDIT.get(source_name, {})
+        mix = parse_violation_mix(violation_mix, set(self.templates))
+        self.violation_rules = list(mix.keys())
+        self.violation_weights = list(mix.values())
+
+    def _fit_body(self, body, target_length, keep_prefix=False):
+        # Pad with real sentences or trim at a word boundary; violation templates are never trimmed
+        if len(body) < target_length and self.sentence_pool:
+            parts = [body] if body else []
+            length = len(body)
+            while length < target_length:
+                sentence = self.rng.choice(self.sentence_pool)
+                parts.append(sentence)
+                length += len(sentence) + 1
+            return " ".join(parts)
+        if len(body) > target_length and not keep_prefix:
+            return body[:target_length].rsplit(" ", 1)[0]
+        return body
+
+    def _post_record(self, post_id, title, body, num_comments, created_utc, violation):
+        if self.full_records:
+            record = create_post_json({"title": title, "content": body}, post_id, self.subreddit_name)
+            record["data"].update({"num_comments": num_comments, "created_utc": created_utc, "created": created_utc})
+            if not violation:
+                record["data"]["author"] = f"synthetic_user_{self.rng.randrange(100000)}"
+            return record
+        return {
+            "kind": "t3",
+            "data": {
+                "id": post_id,
+                "name": f"t3_{post_id}",
+                "title": title,
+                "selftext": body,
+                "author": "violation_example_user" if violation else f"synthetic_user_{self.rng.randrange(100000)}",
+                "subreddit": self.subreddit_name,
+                "num_comments": num_comments,
+                "score": self.rng.randrange(0, 500),
+                "created_utc": created_utc,
+                "permalink": f"/r/{self.subreddit_name}/comments/{post_id}/"
+            }
+        }
+
+    def _comment_tree(self, post_id, count, created_utc):
+        comments = []
+        for idx in range(count):
+            comment_id = f"{post_id}c{idx:x}"
+            candidates = [c for c in comments if c["depth"] < self.max_depth] if comments else []
+            if candidates and self.rng.random() < self.reply_probability:
+                parent = self.rng.choice(candidates)
+                parent_id, depth = parent["name"], parent["depth"] + 1
+            else:
+                parent_id, depth = f"t3_{post_id}", 0
+
+            comments.append({
+                "id": comment_id,
+                "name": f"t1_{comment_id}",
+                "parent_id": parent_id,
+                "link_id": f"t3_{post_id}",
+                "body": self.rng.choice(self.comment_pool),
+                "author": f"synthetic_user_{self.rng.randrange(100000)}",
+                "depth": depth,
+                "score": self.rng.randrange(-5, 200),
+                "created_utc": created_utc + 60 * (idx + 1),
+                "subreddit": self.subreddit_name
+            })
+        return comments
+
+    def generate(self, size, start_utc=1700000000.0):
+        """Yield (post_id, post_json, comments_json) for `size` posts"""
+        for idx in range(size):
+            created_utc = start_utc + idx * 37.0
+            target_length = self.body_length.sample(self.rng)
+            violation = bool(self.violation_rules) and self.rng.random() < self.violation_rate
+
+            if violation:
+                rule_index = self.rng.choices(self.violation_rules, weights=self.violation_weights)[0]
+                template = self.templates[rule_index]
+                # The violation_rule_<N>_ prefix is what the fake LLM backend keys verdicts on
+                post_id = f"violation_rule_{rule_index}_syn{idx:07d}"
+                title = template["title"]
+                body = self._fit_body(template["content"], target_length, keep_prefix=True)
+            else:
+                source = self.rng.choice(self.source_posts)
+                post_id = f"syn{idx:07d}"
+                title = source["title"]
+                body = self._fit_body(source["body"], target_length)
+
+            num_comments = self.comments_per_post.sample(self.rng)
+            comments = self._comment_tree(post_id, num_comments, created_utc)
+            yield post_id, self._post_record(post_id, title, body, num_comments, created_utc, violation), comments
+
+
+def write_directory_layout(output_dir, records):
+    count = 0
+    for post_id, post_json, comments_json in records:
+        post_dir = os.path.join(output_dir, post_id)
+        os.makedirs(post_dir, exist_ok=True)
+        with open(os.path.join(post_dir, "post.json"), "w", encoding="utf-8") as f:
+            json.dump(post_json, f, ensure_ascii=False)
+        with open(os.path.join(post_dir, "comments.json"), "w", encoding="utf-8") as f:
+            json.dump(comments_json, f, ensure_ascii=False)
+        count += 1
+    return count
+
+
+def write_packed_layout(output_dir, records):
+    offsets = {}
+    with open(os.path.join(output_dir, PACKED_POSTS_FILE), "wb") as f:
+        for post_id, post_json, comments_json in records:
+            offsets[post_id] = f.tell()
+            line = json.dumps({"id": post_id, "post": post_json, "comments": comments_json}, ensure_ascii=False)
+            f.write(line.encode("utf-8") + b"\n")
+    with open(os.path.join(output_dir, PACKED_INDEX_FILE), "w") as f:
+        json.dump(offsets, f)
+    return len(offsets)
+
+
+def generate_corpus(source_dir, output_dir, size, layout="dir", overwrite=False, **generator_options):
+    if os.path.exists(output_dir):
+        if not overwrite:
+            raise FileExistsError(f"{output_dir} already exists, pass overwrite=True to replace it")
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+
+    subreddit_name = os.path.basename(os.path.normpath(output_dir))
+    for name in ("rules.json", "subreddit_info.json"):
+        shutil.copy2(os.path.join(source_dir, name), os.path.join(output_dir, name))
+
+    generator = CorpusGenerator(source_dir, subreddit_name, **generator_options)
+    records = generator.generate(size)
+    if layout == "packed":
+        return write_packed_layout(output_dir, records)
+    return write_directory_layout(output_dir, records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic corpus from real posts and the violation templates")
+    parser.add_argument("--source", default="data/AskHistorians", help="Real subreddit directory to draw posts and comments from")
+    parser.add_argument("--output", help="Output subreddit directory (default: data/Synth_<source>_<size>)")
+    parser.add_argument("--size", type=int, default=10000, help="Number of posts")
+    parser.add_argument("--layout", choices=["dir", "packed"], default="dir",
+                        help="dir: one directory per post like data/AskHistorians; packed: posts.jsonl plus an offset index")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--violation-rate", type=float, default=0.05, help="Fraction of posts built from violation templates")
+    parser.add_argument("--violation-mix", default="uniform", help="'uniform' or rule_index:weight pairs, e.g. 0:3,5:1,12:1")
+    parser.add_argument("--body-length", default="lognormal:600:0.9", help="Body length distribution in characters")
+    parser.add_argument("--comments", default="lognormal:6:1.0", help="Comments per post distribution")
+    parser.add_argument("--max-depth", type=int, default=6, help="Maximum reply depth of comment threads")
+    parser.add_argument("--reply-probability", type=float, default=0.6, help="Chance a comment replies to another comment")
+    parser.add_argument("--full-records", action="store_true", help="Write full Reddit API records instead of the fields the loader reads")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    source_name = os.path.basename(os.path.normpath(args.source))
+    output_dir = args.output or f"data/Synth_{source_name}_{args.size}"
+
+    start = time.time()
+    count = generate_corpus(
+        args.source, output_dir, args.size, layout=args.layout, overwrite=args.overwrite,
+        seed=args.seed,
+        violation_rate=args.violation_rate,
+        violation_mix=args.violation_mix,
+        body_length=args.body_length,
+        comments_per_post=args.comments,
+        max_depth=args.max_depth,
+        reply_probability=args.reply_probability,
+        full_records=args.full_records
+    )
+    print(f"Generated {count} posts in {output_dir}/ ({args.layout} layout) in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
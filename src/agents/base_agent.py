@@ -1,17 +1,49 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import contextvars
 import json
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from openai import OpenAI
+from agents.llm_backend import create_client, estimate_cost
+from agents.call_policy import CallPolicy, call_with_policy, get_circuit_breaker
+from agents.dispatch import LANES, current_lane, get_dispatcher
+from agents.response_cache import request_fingerprint
+from agents.single_flight import get_single_flight
+from agents.usage import get_usage_tracker
+from tracing import span
+
+_usage_scope: contextvars.ContextVar = contextvars.ContextVar("usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope():
+    """Totals (calls, tokens, estimated cost) of every chat completion made in this context inside the block.
+    A nested scope's totals are added to the enclosing scope when it closes"""
+    outer = _usage_scope.get()
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+    token = _usage_scope.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage_scope.reset(token)
+        if outer is not None:
+            for key, value in usage.items():
+                outer[key] += value
 
 
 class BaseAgent(ABC):
     def __init__(self, model="gpt-4o-mini", temperature: float = 0, max_tokens: int=500):
-        self.client = OpenAI()
+        self.client = create_client()
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.response_format = {"type": "json_object"}
+        self.token_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
+        # Deadline, retries and backoff for every request this agent makes (MOD_AGENT_CALL_POLICY)
+        self.call_policy = CallPolicy.from_env(type(self).__name__)
 
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -21,13 +53,65 @@ class BaseAgent(ABC):
     def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         pass
 
-    def _make_api_call(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    def _chat_completion(self, **kwargs):
+        """Single entry point for every chat completion request made by an agent"""
+        model = kwargs.get("model") or self.model
+        with span("llm.chat_completion", agent=type(self).__name__, model=model) as call_span:
+            # Identical requests already in flight (same post reviewed by two workers) share one response, unless
+            # the flight is in a lower-priority dispatch lane: an interactive call never waits on a background ticket
+            response, shared = get_single_flight().do(request_fingerprint(kwargs), lambda: call_with_policy(
+                lambda timeout: self._dispatch(timeout=timeout, **kwargs),
+                self.call_policy,
+                get_circuit_breaker(model, self.call_policy)
+            ), rank=LANES.index(current_lane()))
+            if shared:
+                # The tokens were spent, and counted, by the caller whose request it was
+                call_span.set(coalesced=True)
+                return response
+            self._record_usage(response, kwargs.get("model"))
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                call_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            return response
+
+    def _dispatch(self, timeout: float, **kwargs):
+        # One attempt holds one slot in the caller's lane; backoff between attempts doesn't. Queueing for the
+        # slot counts against the attempt's timeout
+        start = time.monotonic()
+        with get_dispatcher().slot(timeout=timeout):
+            remaining = max(0.001, timeout - (time.monotonic() - start))
+            return self.client.chat.completions.create(timeout=remaining, **kwargs)
+
+    def _record_usage(self, response, model: Optional[str] = None):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        with self._usage_lock:
+            self.token_usage["calls"] += 1
+            self.token_usage["prompt_tokens"] += prompt_tokens
+            self.token_usage["completion_tokens"] += completion_tokens
+
+        model = model or self.model
+        cost_usd = estimate_cost(model, prompt_tokens, completion_tokens)
+        get_usage_tracker().record(type(self).__name__, model, prompt_tokens, completion_tokens, cost_usd)
+
+        # Scopes are per context, so concurrent reviews on other threads never land in this one
+        scope = _usage_scope.get()
+        if scope is not None:
+            scope["calls"] += 1
+            scope["prompt_tokens"] += prompt_tokens
+            scope["completion_tokens"] += completion_tokens
+            scope["cost_usd"] += cost_usd
+
+    def _make_api_call(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> Dict[str, Any]:
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
-                max_tokens=self.max_tokens,
+                max_tokens=max_tokens or self.max_tokens,
                 response_format=self.response_format
             )
             content = response.choices[0].message.content.strip()
@@ -62,12 +146,13 @@ class EventBus:
 
     def publish(self, event_type: str, data: Dict[str, Any]):
         if event_type in self._subscribers:
-            for callback in self._subscribers[event_type]:
-                try:
-                    callback(data)
-                except Exception as e:
-                    # print(f"Error in event callback: {e}")
-                    pass
+            with span("event.publish", event=event_type, subscribers=len(self._subscribers[event_type])):
+                for callback in self._subscribers[event_type]:
+                    try:
+                        callback(data)
+                    except Exception as e:
+                        # print(f"Error in event callback: {e}")
+                        pass
 
     def unsubscribe(self, event_type: str, callback):
         if event_type in self._subscribers:
@@ -0,0 +1,116 @@
+import re
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional
+
+# Intent secondaries the orchestrator routes to MetaChatAgent._bulk_moderate
+BULK_INTENTS = {"approve": "BULK_APPROVE", "reject": "BULK_REJECT"}
+# A parsed bulk command only proposes the action; it runs when the next message confirms it
+BULK_CONFIRM, BULK_CANCEL = "BULK_CONFIRM", "BULK_CANCEL"
+BULK_CONFIRM_TTL = 120.0
+# A bulk command the grammar can't express; answered with a request to rephrase, never run as a single-post action
+BULK_UNSUPPORTED = "BULK_UNSUPPORTED"
+_CONFIRM_WORDS = {"confirm", "yes", "y", "yes confirm", "confirm it", "do it", "proceed", "go ahead"}
+_CANCEL_WORDS = {"cancel", "no", "n", "abort", "stop", "never mind", "nevermind"}
+
+_ACTION = re.compile(r"^\s*(?:please\s+)?(?P<verb>approve|accept|reject|remove|delete)\s+(?:all|every|each)\b(?P<rest>.*)$")
+_VERB_ACTION = {"approve": "approve", "accept": "approve", "reject": "reject", "remove": "reject", "delete": "reject"}
+_RULE_REF = re.compile(r"\brule[\s_#]*(\d+)\b")
+_LEVEL = re.compile(r"\b(high|medium|low)[\s-]+confidence\b|\bconfidence\s+(?:is\s+)?(high|medium|low)\b")
+_BELOW = r"<=|<|under|below|less\s+than|lower\s+than"
+_ABOVE = r">=|>|over|above|at\s+least|more\s+than|greater\s+than|higher\s+than"
+_THRESHOLD = re.compile(rf"\bconfidence\s*(?:is\s+)?(?P<op>{_BELOW}|{_ABOVE})\s*(?P<value>\d*\.?\d+)(?P<percent>\s*%)?")
+_STATUS = re.compile(r"\b(flagged|todo|approved)\b")
+# Exclusions the grammar can't express; parsing around them would act on exactly the excluded set
+_NEGATION = re.compile(r"\b(?:except|excluding|not|but|without|other\s+than|besides|unless)\b|n't\b")
+# Words allowed around the recognised clauses; anything else (an author, a range, a date...) is a filter we
+# would otherwise drop, so the message goes to the LLM instead
+_FILLER = {"the", "a", "of", "post", "posts", "that", "which", "are", "is", "have", "has", "with", "under", "for",
+           "in", "from", "on", "violating", "breaking", "matching", "and", "currently", "remaining", "these", "those"}
+
+
+@dataclass
+class BulkQuery:
+    action: str
+    status: str = "flagged"
+    rule_id: Optional[str] = None
+    min_confidence: Optional[float] = None
+    max_confidence: Optional[float] = None
+    confidence_level: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def describe(self) -> str:
+        parts = [f"{self.status} posts"]
+        if self.rule_id:
+            parts.append(f"under {self.rule_id}")
+        if self.confidence_level:
+            parts.append(f"with {self.confidence_level} confidence")
+        if self.min_confidence is not None:
+            parts.append(f"with confidence >= {self.min_confidence:g}")
+        if self.max_confidence is not None:
+            parts.append(f"with confidence < {self.max_confidence:g}")
+        return " ".join(parts)
+
+
+def parse_bulk_reply(message: str) -> Optional[str]:
+    """BULK_CONFIRM or BULK_CANCEL for a reply to a bulk proposal, None for anything else"""
+    text = " ".join(message.lower().split()).strip(".!")
+    if text in _CONFIRM_WORDS:
+        return BULK_CONFIRM
+    if text in _CANCEL_WORDS:
+        return BULK_CANCEL
+    return None
+
+
+def is_bulk_command(message: str) -> bool:
+    """Whether message asks for a bulk action ("approve all ..."), whether or not parse_bulk_command accepts it"""
+    return _ACTION.match(" ".join(message.lower().split())) is not None
+
+
+def parse_bulk_command(message: str) -> Optional[BulkQuery]:
+    """BulkQuery for "approve all flagged under rule_5 with confidence < 0.6" style messages, None otherwise.
+    Bulk actions always target flagged posts"""
+    text = " ".join(message.lower().split()).rstrip(".!")
+    match = _ACTION.match(text)
+    if not match:
+        return None
+
+    rest = match.group("rest")
+    if _NEGATION.search(rest):
+        return None
+    status = _STATUS.search(rest)
+    if status and status.group(1) == "approved":
+        # Approved posts are already resolved; refuse rather than silently act on a different set
+        return None
+
+    rule_numbers = set(_RULE_REF.findall(rest))
+    if len(rule_numbers) > 1:
+        return None
+
+    query = BulkQuery(action=_VERB_ACTION[match.group("verb")])
+    if rule_numbers:
+        query.rule_id = f"rule_{rule_numbers.pop()}"
+
+    level = _LEVEL.search(rest)
+    if level:
+        query.confidence_level = level.group(1) or level.group(2)
+
+    for threshold in _THRESHOLD.finditer(rest):
+        value = float(threshold.group("value"))
+        if threshold.group("percent") or value > 1:
+            value /= 100
+        op = threshold.group("op")
+        # The query range is [min, max); nudge the bound for "<=" and ">" so the boundary lands on the right side
+        nudge = 1e-9 if op in ("<=", ">") or op.startswith(("more", "greater", "higher")) else 0.0
+        if re.fullmatch(_BELOW, op):
+            query.max_confidence = value + nudge
+        else:
+            query.min_confidence = value + nudge
+
+    leftover = rest
+    for pattern in (_THRESHOLD, _LEVEL, _RULE_REF, _STATUS):
+        leftover = pattern.sub(" ", leftover)
+    if any(word not in _FILLER for word in re.findall(r"[^\s,;]+", leftover)):
+        return None
+    return query
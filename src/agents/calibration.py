@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from agents.history import HISTORY_DIR_ENV, DEFAULT_HISTORY_DIR
+from checkpoint import save_checkpoint, load_checkpoint
+
+# Fitted calibration applied at review time, and the log of moderator decisions it is fitted from
+CALIBRATION_ENV = "MOD_AGENT_CALIBRATION"
+VERDICT_LOG_ENV = "MOD_AGENT_VERDICT_LOG"
+
+METHODS = ("isotonic", "platt")
+DEFAULT_TARGET_PRECISION = {"high": 0.95, "medium": 0.8}
+# Calibrated values are tabulated on this many steps of the raw score so applying one is a list index
+TABLE_SIZE = 1000
+_EPS = 1e-6
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("Fitting calibration needs NumPy: pip install 'mod_agent[calibration]'") from e
+    return np
+
+
+class VerdictLog:
+    """Append-only JSONL of moderator decisions on posts the reviewer flagged with a confidence score"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "VerdictLog":
+        path = os.getenv(VERDICT_LOG_ENV)
+        if path is None:
+            history_dir = os.getenv(HISTORY_DIR_ENV, DEFAULT_HISTORY_DIR)
+            path = os.path.join(history_dir, "verdicts.jsonl") if history_dir else ""
+        return cls(path or None)
+
+    def record(self, post: Dict[str, Any], final_violation: bool, action: str, bulk: bool = False):
+        """bulk marks decisions made by a bulk action: posts picked by their confidence, not judged one by one"""
+        raw_confidence = post.get("raw_confidence", post.get("confidence"))
+        if not self.path or raw_confidence is None or not post.get("rule_id"):
+            return
+        entry = {
+            "post_id": post.get("id"),
+            "subreddit": post.get("subreddit"),
+            "rule_id": post["rule_id"],
+            "raw_confidence": raw_confidence,
+            "predicted_violation": bool(post.get("violation")),
+            "final_violation": final_violation,
+            "action": action,
+            "timestamp": time.time()
+        }
+        if bulk:
+            entry["bulk"] = True
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError:
+                # Losing calibration data must not break moderation
+                self.path = None
+
+    @staticmethod
+    def load(path: str, include_bulk: bool = False) -> List[Dict[str, Any]]:
+        """Logged decisions; bulk ones are left out unless include_bulk, since fitting on posts a bulk action
+        selected by confidence would confirm the scores it was given"""
+        records = []
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if include_bulk or not is_bulk_record(record):
+                        records.append(record)
+        return records
+
+
+def is_bulk_record(record: Dict[str, Any]) -> bool:
+    # Logs written before the flag existed only tell bulk decisions apart by their action
+    return bool(record.get("bulk")) or str(record.get("action", "")).startswith("bulk_")
+
+
+def _logit(np, scores):
+    scores = np.clip(scores, _EPS, 1 - _EPS)
+    return np.log(scores / (1 - scores))
+
+
+def fit_platt(scores, labels, iterations: int = 50) -> Tuple[float, float]:
+    """(a, b) for p = sigmoid(a * logit(score) + b), fitted by Newton's method on Platt's smoothed targets"""
+    np = _require_numpy()
+    scores = np.asarray(scores, dtype=float)
+    labels = np.asarray(labels, dtype=float)
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    targets = np.where(labels > 0, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+    features = np.column_stack([_logit(np, scores), np.ones_like(scores)])
+    weights = np.array([1.0, 0.0])
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-features @ weights))
+        gradient = features.T @ (p - targets)
+        hessian = features.T @ (features * (p * (1 - p))[:, None]) + 1e-9 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-9:
+            break
+    return float(weights[0]), float(weights[1])
+
+
+def fit_isotonic(scores, labels) -> Tuple[List[float], List[float]]:
+    """Pool-adjacent-violators: (block score means, block label means), non-decreasing, for interpolation"""
+    np = _require_numpy()
+    xs = np.asarray(scores, dtype=float)
+    ys = np.asarray(labels, dtype=float)
+
+    # Tied scores always end up in one block, so start from one block per distinct score: raw confidences are
+    # rounded, which leaves at most a thousand or so blocks however many verdicts were logged
+    _, inverse = np.unique(xs, return_inverse=True)
+    block_x = np.bincount(inverse, weights=xs)
+    block_y = np.bincount(inverse, weights=ys)
+    block_n = np.bincount(inverse).astype(float)
+
+    # Pool every adjacent pair that violates the order in one vectorized pass, until none is left; the order in
+    # which violators are pooled doesn't change the result
+    while len(block_n) > 1:
+        means = block_y / block_n
+        violates = means[:-1] >= means[1:]
+        if not violates.any():
+            break
+        group = np.concatenate(([0], np.cumsum(~violates)))
+        block_x = np.bincount(group, weights=block_x)
+        block_y = np.bincount(group, weights=block_y)
+        block_n = np.bincount(group, weights=block_n)
+
+    return (block_x / block_n).tolist(), (block_y / block_n).tolist()
+
+
+def _table(np, method: str, scores, labels) -> Tuple[List[float], Dict[str, Any]]:
+    grid = np.arange(TABLE_SIZE + 1) / TABLE_SIZE
+    if method == "platt":
+        a, b = fit_platt(scores, labels)
+        values = 1 / (1 + np.exp(-(a * _logit(np, grid) + b)))
+        params = {"a": round(a, 6), "b": round(b, 6)}
+    else:
+        block_x, block_y = fit_isotonic(scores, labels)
+        values = np.interp(grid, block_x, block_y)
+        params = {"blocks": len(block_x)}
+    return np.round(values, 4).tolist(), params
+
+
+def thresholds_for_precision(calibrated, labels, target_precision: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """Lowest calibrated score per level at which posts scoring at or above it reach the target precision.
+    None when no cutoff reaches it"""
+    np = _require_numpy()
+    calibrated = np.asarray(calibrated, dtype=float)
+    labels = np.asarray(labels, dtype=float)
+    order = np.argsort(-calibrated, kind="mergesort")
+    ranked = calibrated[order]
+    precision = np.cumsum(labels[order]) / np.arange(1, len(ranked) + 1)
+    # A cutoff can only sit between distinct scores; evaluate precision at the last index of each tie group
+    group_ends = np.append(ranked[1:] != ranked[:-1], True)
+
+    thresholds = {}
+    for level, target in target_precision.items():
+        eligible = np.nonzero(group_ends & (precision >= target))[0]
+        thresholds[level] = round(float(ranked[eligible[-1]]), 4) if len(eligible) else None
+    return thresholds
+
+
+def fit_calibration(records: List[Dict[str, Any]], method: str = "isotonic", min_samples: int = 30,
+                    target_precision: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Calibration model from verdict log records: a global calibrator plus one per rule with enough samples"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown calibration method '{method}', expected one of {METHODS}")
+    np = _require_numpy()
+    target_precision = target_precision or DEFAULT_TARGET_PRECISION
+    records = [record for record in records if record.get("raw_confidence") is not None and record.get("rule_id")]
+    if not records:
+        raise ValueError("No verdict records with a raw confidence to fit")
+
+    rule_ids = np.array([record["rule_id"] for record in records])
+    scores = np.array([float(record["raw_confidence"]) for record in records])
+    labels = np.array([1.0 if record["final_violation"] else 0.0 for record in records])
+
+    def fit_group(mask) -> Dict[str, Any]:
+        table, params = _table(np, method, scores[mask], labels[mask])
+        calibrated = np.asarray(table)[np.rint(scores[mask] * TABLE_SIZE).astype(int)]
+        return {
+            "method": method,
+            "samples": int(mask.sum()),
+            "base_rate": round(float(labels[mask].mean()), 4),
+            "params": params,
+            "thresholds": thresholds_for_precision(calibrated, labels[mask], target_precision),
+            "table": table
+        }
+
+    model = {
+        "version": 1,
+        "fitted_at": time.time(),
+        "method": method,
+        "table_size": TABLE_SIZE,
+        "target_precision": target_precision,
+        "global": fit_group(np.ones(len(records), dtype=bool)),
+        "rules": {}
+    }
+    for rule_id in sorted(set(rule_ids.tolist())):
+        mask = rule_ids == rule_id
+        if mask.sum() >= min_samples:
+            model["rules"][rule_id] = fit_group(mask)
+    return model
+
+
+class Calibrator:
+    """Applies a fitted calibration model: one table lookup per score, no NumPy needed"""
+
+    def __init__(self, model: Dict[str, Any]):
+        self.model = model
+        self.table_size = model.get("table_size", TABLE_SIZE)
+        self.global_entry = model["global"]
+        self.rules = model.get("rules", {})
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Calibrator"]:
+        model = load_checkpoint(path)
+        return cls(model) if model else None
+
+    def save(self, path: str):
+        save_checkpoint(path, self.model)
+
+    def _entry(self, rule_id: Optional[str]) -> Dict[str, Any]:
+        return self.rules.get(rule_id) or self.global_entry
+
+    def calibrate(self, rule_id: Optional[str], raw_confidence: float) -> float:
+        index = int(round(min(1.0, max(0.0, raw_confidence)) * self.table_size))
+        return self._entry(rule_id)["table"][index]
+
+    def level(self, rule_id: Optional[str], calibrated: float) -> str:
+        thresholds = self._entry(rule_id)["thresholds"]
+        for level in ("high", "medium"):
+            cutoff = thresholds.get(level)
+            if cutoff is not None and calibrated >= cutoff:
+                return level
+        return "low"
+
+
+_calibrators: Dict[str, Optional[Calibrator]] = {}
+_calibrators_lock = threading.Lock()
+
+
+def calibrator_from_env() -> Optional[Calibrator]:
+    """Calibrator at MOD_AGENT_CALIBRATION, loaded once per process and shared by every reviewer"""
+    path = os.getenv(CALIBRATION_ENV)
+    if not path:
+        return None
+    with _calibrators_lock:
+        if path not in _calibrators:
+            _calibrators[path] = Calibrator.load(path)
+        return _calibrators[path]
+
+
+def reliability(records: List[Dict[str, Any]], calibrator: Optional[Calibrator] = None, bins: int = 10) -> Dict[str, Any]:
+    """Per-bin predicted vs observed violation rate and expected calibration error, raw or calibrated"""
+    np = _require_numpy()
+    records = [record for record in records if record.get("raw_confidence") is not None]
+    if not records:
+        return {"bins": [], "ece": None, "samples": 0}
+    scores = np.array([float(record["raw_confidence"]) for record in records])
+    if calibrator is not None:
+        scores = np.array([calibrator.calibrate(record.get("rule_id"), score) for record, score in zip(records, scores.tolist())])
+    labels = np.array([1.0 if record["final_violation"] else 0.0 for record in records])
+
+    bin_index = np.minimum((scores * bins).astype(int), bins - 1)
+    counts = np.bincount(bin_index, minlength=bins)
+    predicted = np.bincount(bin_index, weights=scores, minlength=bins)
+    observed = np.bincount(bin_index, weights=labels, minlength=bins)
+    filled = counts > 0
+    mean_predicted = np.divide(predicted, counts, out=np.zeros(bins), where=filled)
+    observed_rate = np.divide(observed, counts, out=np.zeros(bins), where=filled)
+    ece = float((counts / len(scores) * np.abs(mean_predicted - observed_rate)).sum())
+
+    return {
+        "samples": len(scores),
+        "ece": round(ece, 4),
+        "bins": [{
+            "low": i / bins,
+            "high": (i + 1) / bins,
+            "count": int(counts[i]),
+            "predicted": round(float(mean_predicted[i]), 4),
+            "observed": round(float(observed_rate[i]), 4)
+        } for i in range(bins) if filled[i]]
+    }
+
+
+def format_reliability(report: Dict[str, Any], width: int = 30) -> List[str]:
+    """Text reliability diagram: observed rate as a bar, predicted mean marked with |"""
+    lines = [f"samples={report['samples']} ECE={report['ece']}"]
+    for row in report["bins"]:
+        bar = ["█" if i < int(round(row["observed"] * width)) else " " for i in range(width)]
+        marker = min(width - 1, int(round(row["predicted"] * width)))
+        bar[marker] = "|"
+        lines.append(f"{row['low']:.1f}-{row['high']:.1f} n={row['count']:<5} pred={row['predicted']:.2f} "
+                     f"obs={row['observed']:.2f} {''.join(bar)}")
+    return lines
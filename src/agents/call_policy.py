@@ -0,0 +1,251 @@
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Callable, List, Optional
+
+import openai
+
+# Comma separated key=value options; "<AgentClass>.<key>=value" applies to one agent class only,
+# e.g. "timeout=30,max_retries=3,ConfidenceRuleAgent.timeout=5,breaker_error_rate=0.5"
+CALL_POLICY_ENV = "MOD_AGENT_CALL_POLICY"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+@dataclass
+class CallPolicy:
+    timeout: float = 30.0  # per attempt
+    deadline: float = 90.0  # whole call: every attempt plus backoff
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 20.0
+    # Circuit breaker per model: opens when error_rate of the last breaker_window calls fails (after
+    # breaker_min_calls), stays open for breaker_cooldown seconds, then lets one probe through
+    breaker_window: int = 20
+    breaker_min_calls: int = 10
+    breaker_error_rate: float = 0.5
+    breaker_cooldown: float = 30.0
+
+    @classmethod
+    def from_spec(cls, spec: str, agent: Optional[str] = None) -> "CallPolicy":
+        policy = cls()
+        types = {f.name: f.type for f in fields(cls)}
+        overrides = []
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            scope, _, key = key.strip().rpartition(".")
+            if key not in types:
+                raise ValueError(f"Unknown call policy option '{key}'")
+            if not scope:
+                setattr(policy, key, types[key](value.strip()))
+            elif scope == agent:
+                overrides.append((key, types[key](value.strip())))
+        # Agent-specific values win regardless of their position in the spec
+        for key, value in overrides:
+            setattr(policy, key, value)
+        return policy
+
+    @classmethod
+    def from_env(cls, agent: Optional[str] = None) -> "CallPolicy":
+        return cls.from_spec(os.getenv(CALL_POLICY_ENV, ""), agent)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open; not sending requests for another {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Error-rate breaker over the last `window` calls: closed -> open -> half-open (one probe) -> closed"""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 10, error_rate: float = 0.5,
+                 cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.outcomes: List[bool] = []
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "short_circuited": 0, "opened": 0}
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a request may be sent now"""
+        transition = None
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.cooldown - (self.clock() - self.opened_at)
+                if remaining > 0:
+                    self.stats["short_circuited"] += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                transition = (OPEN, HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.stats["short_circuited"] += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._probe_in_flight = True
+        if transition:
+            _notify(self.name, *transition)
+
+    def record(self, success: bool):
+        transition = None
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["failures"] += 0 if success else 1
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    self.state, self.outcomes = CLOSED, []
+                    transition = (HALF_OPEN, CLOSED)
+                else:
+                    self._open()
+                    transition = (HALF_OPEN, OPEN)
+            else:
+                self.outcomes.append(success)
+                if len(self.outcomes) > self.window:
+                    del self.outcomes[0]
+                failures = self.outcomes.count(False)
+                if (self.state == CLOSED and len(self.outcomes) >= self.min_calls
+                        and failures / len(self.outcomes) >= self.error_rate):
+                    self._open()
+                    transition = (CLOSED, OPEN)
+        if transition:
+            _notify(self.name, *transition)
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.outcomes = []
+        self.stats["opened"] += 1
+
+    def count_retry(self):
+        with self._lock:
+            self.stats["retries"] += 1
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == OPEN and self.clock() - self.opened_at < self.cooldown
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, state=self.state)
+            window = list(self.outcomes)
+        stats["window_error_rate"] = round(window.count(False) / len(window), 3) if window else 0.0
+        return stats
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_listeners: List[Callable[[str, str, str], None]] = []
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, policy: Optional[CallPolicy] = None) -> CircuitBreaker:
+    """Process-wide breaker for one model; created from the first caller's policy"""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            policy = policy or CallPolicy.from_env()
+            breaker = _breakers[name] = CircuitBreaker(name, policy.breaker_window, policy.breaker_min_calls,
+                                                       policy.breaker_error_rate, policy.breaker_cooldown)
+        return breaker
+
+
+def any_circuit_open() -> bool:
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return any(breaker.is_open() for breaker in breakers)
+
+
+def circuit_stats() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.get_stats() for name, breaker in breakers.items()}
+
+
+def add_breaker_listener(listener: Callable[[str, str, str], None]):
+    """listener(name, old_state, new_state) on every breaker transition"""
+    with _registry_lock:
+        _listeners.append(listener)
+
+
+def remove_breaker_listener(listener: Callable[[str, str, str], None]):
+    with _registry_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def _notify(name: str, old_state: str, new_state: str):
+    with _registry_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(name, old_state, new_state)
+        except Exception:
+            pass
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, TimeoutError)):  # includes APITimeoutError
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                # HTTP-date Retry-After values are rare for this API; fall back to our own backoff
+                return None
+    return None
+
+
+def backoff_delay(attempt: int, policy: CallPolicy, retry_after: Optional[float] = None,
+                  rng: random.Random = random) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = rng.uniform(0, min(policy.backoff_max, policy.backoff_base * (2 ** attempt)))
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+def call_with_policy(call: Callable[[float], Any], policy: CallPolicy, breaker: CircuitBreaker,
+                     sleep: Callable[[float], None] = time.sleep) -> Any:
+    """Run call(timeout) with retries for transient errors inside policy.deadline, guarded by breaker"""
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        breaker.allow()
+        remaining = policy.deadline - (time.monotonic() - start)
+        try:
+            result = call(max(0.001, min(policy.timeout, remaining)))
+        except Exception as e:
+            if not is_retryable(e):
+                # The service answered; a bad request says nothing about its health
+                breaker.record(True)
+                raise
+            breaker.record(False)
+            if attempt >= policy.max_retries:
+                raise
+            delay = backoff_delay(attempt, policy, retry_after_seconds(e))
+            if time.monotonic() - start + delay >= policy.deadline:
+                raise
+            breaker.count_retry()
+            sleep(delay)
+            attempt += 1
+            continue
+        breaker.record(True)
+        return result
@@ -0,0 +1,222 @@
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Optional
+
+from agents.base_agent import usage_scope
+from agents.confidence_rule_agent import MultiRuleConfidenceAgent
+from agents.post_agent import MCPEnvelope, PostSpecificAgent, confidence_level_for
+
+# Comma separated key=value options, e.g. "screener=model,screener_model=gpt-4.1-nano,escalate_model=gpt-4o".
+# Setting it (even to "") makes create_review_agent() return a cascade
+CASCADE_ENV = "MOD_AGENT_CASCADE"
+
+TIERS = ("screener", "full", "escalated")
+
+# Local risk signals: (pattern, weight). Weights add up and are squashed into a 0..1 risk score
+RISK_SIGNALS = [
+    (r"\b(?:idiot|stupid|moron|dumb|retard\w*|shut up|loser|pathetic)\b", 2.0),
+    (r"\b(?:fuck\w*|shit\w*|bitch\w*|asshole|crap)\b", 2.0),
+    (r"\b(?:lol|lmao|rofl|haha\w*|jk)\b", 1.0),
+    (r"\bwhat if\b|\bwould have happened\b|\bhypothetical(?:ly)?\b|\bcould have won\b", 1.5),
+    (r"\b(?:homework|assignment|essay|my teacher|due tomorrow)\b", 1.5),
+    (r"\b(?:who was the (?:best|worst|greatest)|your favou?rite|rank(?:ed)? the)\b", 1.2),
+    (r"\b(?:trump|biden|brexit|covid|ukraine war|maga|woke)\b", 1.2),
+    (r"https?://\S+", 0.6),
+    (r"!{3,}|\?{3,}", 0.5),
+]
+
+
+@dataclass
+class CascadeConfig:
+    # "model" (cheap model gated by the local risk score), "distribution" (one 1-token call scoring every rule),
+    # "heuristic" (local only) or "none"
+    screener: str = "model"
+    screener_model: str = "gpt-4.1-nano"
+    accept_levels: str = "high"  # "|"-separated confidence levels at which a screener violation is final
+    clean_risk: float = 0.15  # clean verdicts are final only when the local risk score is below this
+    clean_probability: float = 0.9  # distribution screener: P(none) needed to clear a post
+    violation_probability: float = 0.8  # distribution screener: P(top rule) needed to flag a post
+    escalate_model: str = ""  # stronger model for low-confidence violations; empty disables escalation
+    escalate_levels: str = "low"
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "CascadeConfig":
+        config = cls()
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in types:
+                raise ValueError(f"Unknown cascade option '{key}'")
+            setattr(config, key, types[key](value.strip()))
+        if config.screener not in ("heuristic", "model", "distribution", "none"):
+            raise ValueError(f"Unknown cascade screener '{config.screener}'")
+        return config
+
+    @classmethod
+    def from_env(cls) -> "CascadeConfig":
+        return cls.from_spec(os.getenv(CASCADE_ENV, ""))
+
+    def levels(self, name: str) -> set:
+        return {level.strip() for level in getattr(self, name).split("|") if level.strip()}
+
+
+class HeuristicScreener:
+    """Local risk score for a post from keyword and structure signals. Only ever used to clear posts, never to flag"""
+
+    def __init__(self, signals=RISK_SIGNALS):
+        self.signals = [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in signals]
+
+    def risk(self, title: str, body: str) -> float:
+        text = f"{title}\n{body}"
+        score = sum(weight for pattern, weight in self.signals if pattern.search(text))
+        words = len(body.split())
+        if "?" not in title and "?" not in body:
+            score += 0.4
+        if words > 0 and sum(1 for word in body.split() if word.isupper() and len(word) > 2) / words > 0.3:
+            score += 1.0
+        return 1.0 - math.exp(-score)
+
+
+class CascadeReviewAgent(PostSpecificAgent):
+    """PostSpecificAgent that tries a cheap screener first and only runs the full review when the screener is
+    unsure; low-confidence violations from the full review can be escalated to a stronger model"""
+
+    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500, review_mode: Optional[str] = None,
+                 config: Optional[CascadeConfig] = None, confidence_mode: Optional[str] = None):
+        super().__init__(model, temperature, max_tokens, review_mode, confidence_mode=confidence_mode)
+        self.config = config or CascadeConfig.from_env()
+        self.heuristic = HeuristicScreener()
+
+        self.screener_agent = None
+        if self.config.screener == "model":
+            self.screener_agent = PostSpecificAgent(model=self.config.screener_model, temperature=temperature,
+                                                    max_tokens=max_tokens, review_mode="two_tier")
+            self.screener_agent.confidence_agent.model = self.config.screener_model
+        self.distribution_agent = None
+        if self.config.screener == "distribution":
+            self.distribution_agent = MultiRuleConfidenceAgent(model=self.config.screener_model)
+        self.escalation_agent = None
+        if self.config.escalate_model:
+            self.escalation_agent = PostSpecificAgent(model=self.config.escalate_model, temperature=temperature,
+                                                      max_tokens=max_tokens, review_mode=self.review_mode)
+            self.escalation_agent.confidence_agent.model = self.config.escalate_model
+
+        self.tier_stats = {tier: {"calls": 0, "decided": 0, "latency_ms": 0.0, "prompt_tokens": 0,
+                                  "completion_tokens": 0, "cost_usd": 0.0} for tier in TIERS}
+        self.review_count = 0
+        self._stats_lock = threading.Lock()
+
+    def _review(self, mcp_envelope: MCPEnvelope, explain: bool = True) -> dict:
+        with self._stats_lock:
+            self.review_count += 1
+        # A moderator waiting on an explanation gets the full reviewer straight away
+        if not explain and self.config.screener != "none":
+            result = self._run_tier("screener", lambda: self._screen(mcp_envelope))
+            if result is not None:
+                return result
+
+        result = self._run_tier("full", lambda: super(CascadeReviewAgent, self)._review(mcp_envelope, explain),
+                                decided=lambda r: not self._should_escalate(r))
+        if not self._should_escalate(result):
+            return result
+
+        escalated = self._run_tier("escalated", lambda: self.escalation_agent._review(mcp_envelope, explain))
+        if escalated.get("error"):
+            # The stronger model failing must not lose the verdict we already have
+            return result
+        escalated["escalated_from"] = {"rule_id": result.get("rule_id"), "confidence": result.get("confidence")}
+        return escalated
+
+    def _should_escalate(self, result: Optional[dict]) -> bool:
+        return (self.escalation_agent is not None and result is not None and not result.get("error")
+                and bool(result.get("violation")) and result.get("confidence_level") in self.config.levels("escalate_levels"))
+
+    def _screen(self, mcp_envelope: MCPEnvelope) -> Optional[dict]:
+        """Final verdict from the screener tier, or None to hand the post to the full reviewer"""
+        post = mcp_envelope.data["post"]
+        risk = self.heuristic.risk(post.get("title", ""), post.get("body", ""))
+        if mcp_envelope.data.get("override_rules"):
+            # Overrides change what counts as a violation in ways the screener can't see
+            return None
+
+        if self.distribution_agent is not None:
+            return self._screen_distribution(mcp_envelope, risk)
+
+        if self.screener_agent is None:
+            if risk >= self.config.clean_risk:
+                return None
+            return {"violation": False, "rule_id": None, "explanation": None, "explanation_pending": True,
+                    "screener_risk": round(risk, 3)}
+
+        result = self.screener_agent._review(mcp_envelope, explain=False)
+        if result.get("error"):
+            return None
+        if result.get("violation"):
+            if result.get("confidence_level") not in self.config.levels("accept_levels"):
+                return None
+        elif risk >= self.config.clean_risk:
+            return None
+        result["screener_risk"] = round(risk, 3)
+        return result
+
+    def _screen_distribution(self, mcp_envelope: MCPEnvelope, risk: float) -> Optional[dict]:
+        distribution = self.rule_distribution(mcp_envelope, agent=self.distribution_agent)
+        if distribution is None:
+            return None
+        p_none = distribution["distribution"]["none"]
+        if p_none >= self.config.clean_probability:
+            return {"violation": False, "rule_id": None, "explanation": None, "explanation_pending": True,
+                    "screener_risk": round(risk, 3), "rule_distribution": distribution["distribution"]}
+        top_probability = distribution["top_rule_probability"]
+        if distribution["top_rule"] and top_probability >= self.config.violation_probability:
+            return {"violation": True, "rule_id": distribution["top_rule"], "explanation": None,
+                    "explanation_pending": True, "confidence": top_probability,
+                    "confidence_level": confidence_level_for(top_probability),
+                    "rule_distribution": distribution["distribution"]}
+        return None
+
+    def _run_tier(self, tier: str, call, decided=lambda result: result is not None) -> Optional[dict]:
+        start = time.perf_counter()
+        with usage_scope() as usage:
+            result = call()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        is_decided = decided(result)
+        if is_decided:
+            result["review_tier"] = tier
+
+        with self._stats_lock:
+            stats = self.tier_stats[tier]
+            stats["calls"] += 1
+            stats["decided"] += int(is_decided)
+            stats["latency_ms"] += elapsed_ms
+            stats["prompt_tokens"] += usage["prompt_tokens"]
+            stats["completion_tokens"] += usage["completion_tokens"]
+            stats["cost_usd"] += usage["cost_usd"]
+        return result
+
+    def get_tier_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            snapshot = {tier: dict(stats) for tier, stats in self.tier_stats.items()}
+            reviews = self.review_count
+        for tier, stats in snapshot.items():
+            calls = stats["calls"]
+            stats["hit_rate"] = round(stats["decided"] / calls, 3) if calls else 0.0
+            stats["share_of_reviews"] = round(stats["decided"] / reviews, 3) if reviews else 0.0
+            stats["avg_latency_ms"] = round(stats["latency_ms"] / calls, 1) if calls else 0.0
+            stats["latency_ms"] = round(stats["latency_ms"], 1)
+            stats["cost_usd"] = round(stats["cost_usd"], 6)
+        snapshot["reviews"] = reviews
+        snapshot["total_cost_usd"] = round(sum(snapshot[tier]["cost_usd"] for tier in TIERS), 6)
+        return snapshot
+
+
+def create_review_agent(model: str = "gpt-4o-mini", review_mode: Optional[str] = None) -> PostSpecificAgent:
+    """CascadeReviewAgent when MOD_AGENT_CASCADE is set, plain PostSpecificAgent otherwise"""
+    if os.getenv(CASCADE_ENV) is not None:
+        return CascadeReviewAgent(model=model, review_mode=review_mode)
+    return PostSpecificAgent(model=model, review_mode=review_mode)
@@ -0,0 +1,231 @@
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+from types import SimpleNamespace
+from typing import Dict, Any, Deque, List, Optional
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from agents.fake_llm import FakeLLMError, to_openai_error
+from agents.response_cache import request_fingerprint, REQUEST_OPTIONS
+
+# Comma separated key=value options for the "record" and "replay" backends,
+# e.g. "path=cassettes/eval.jsonl.gz,backend=openai" or "path=cassettes/eval.jsonl.gz,timing=compressed,speed=10"
+CASSETTE_ENV = "MOD_AGENT_CASSETTE"
+
+TIMINGS = ("original", "compressed", "none")
+
+
+@dataclass
+class CassetteConfig:
+    path: str = "cassettes/llm.jsonl.gz"
+    backend: str = "openai"  # backend whose traffic is recorded
+    timing: str = "original"  # replay: sleep each response's recorded latency, latency / speed, or not at all
+    speed: float = 10.0
+    strict: bool = True  # replay: unknown requests raise; otherwise they fall through to `backend`
+    store_requests: bool = False  # record: keep full request bodies, not just their fingerprint and model
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "CassetteConfig":
+        config = cls()
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key, value = key.strip(), value.strip()
+            if key not in types:
+                raise ValueError(f"Unknown cassette option '{key}'")
+            setattr(config, key, value.lower() in ("1", "true", "yes") if types[key] is bool else types[key](value))
+        if config.timing not in TIMINGS:
+            raise ValueError(f"Unknown cassette timing '{config.timing}', expected one of {TIMINGS}")
+        return config
+
+    @classmethod
+    def from_env(cls) -> "CassetteConfig":
+        return cls.from_spec(os.getenv(CASSETTE_ENV, ""))
+
+
+class CassetteMissError(Exception):
+    pass
+
+
+class CassetteWriter:
+    """Appends interactions to a gzip JSONL cassette, one line per request, flushed as it goes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        atexit.register(self.close)
+
+    def write(self, entry: Dict[str, Any]):
+        with self._lock:
+            if self._file is None:
+                return
+            entry["offset_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            # Sync flush so a killed run still leaves a readable cassette
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_cassette(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+        except EOFError:
+            # A run killed mid-write leaves a truncated last member; everything before it is intact
+            pass
+    return entries
+
+
+class _RecordingCompletions:
+    def __init__(self, inner, writer: CassetteWriter, store_requests: bool = False):
+        self.inner = inner
+        self.writer = writer
+        self.store_requests = store_requests
+
+    def create(self, **kwargs) -> ChatCompletion:
+        key = request_fingerprint(kwargs)
+        if self.store_requests:
+            request = {key: value for key, value in kwargs.items() if key not in REQUEST_OPTIONS}
+        else:
+            request = {"model": kwargs.get("model")}
+        start = time.perf_counter()
+        try:
+            response = self.inner.chat.completions.create(**kwargs)
+        except openai.APIStatusError as e:
+            retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+            self.writer.write({
+                "key": key,
+                "request": request,
+                "error": {"status_code": e.status_code, "message": e.message,
+                          "retry_after": float(retry_after) if retry_after else None},
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+            })
+            raise
+        self.writer.write({
+            "key": key,
+            "request": request,
+            "response": response.model_dump(mode="json", exclude_none=True),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+        return response
+
+
+class RecordingClient:
+    """Passes every request to the wrapped client and records the request, response and latency"""
+
+    def __init__(self, inner, writer: CassetteWriter, store_requests: bool = False):
+        self.inner = inner
+        self.chat = SimpleNamespace(completions=_RecordingCompletions(inner, writer, store_requests))
+
+
+class Cassette:
+    """Recorded interactions by request fingerprint. Repeats of a request are served in recorded order and the
+    last recording is reused once they run out"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.interactions: Dict[str, Deque[Dict[str, Any]]] = {}
+        for entry in entries:
+            self.interactions.setdefault(entry["key"], deque()).append(entry)
+        self.stats = {"served": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        return cls(load_cassette(path))
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            queue = self.interactions.get(key)
+            if not queue:
+                self.stats["misses"] += 1
+                return None
+            self.stats["served"] += 1
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+class _ReplayCompletions:
+    def __init__(self, cassette: Cassette, config: CassetteConfig, fallback=None):
+        self.cassette = cassette
+        self.config = config
+        self.fallback = fallback
+
+    def create(self, **kwargs) -> ChatCompletion:
+        key = request_fingerprint(kwargs)
+        timeout = kwargs.get("timeout")
+        entry = self.cassette.next(key)
+        if entry is None:
+            if self.fallback is None:
+                raise CassetteMissError(f"No recorded response for request {key[:12]} (model {kwargs.get('model')})")
+            return self.fallback.chat.completions.create(**kwargs)
+
+        delay = entry.get("latency_ms", 0.0) / 1000
+        if self.config.timing == "compressed":
+            delay /= max(self.config.speed, 1e-9)
+        if self.config.timing == "none":
+            delay = 0.0
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise openai.APITimeoutError(request=None)
+        if delay > 0:
+            time.sleep(delay)
+
+        error = entry.get("error")
+        if error:
+            raise to_openai_error(FakeLLMError(error["status_code"], error["message"], error.get("retry_after")))
+        return ChatCompletion.model_validate(entry["response"])
+
+
+class ReplayClient:
+    """Serves recorded responses with the recorded (or compressed) latency; no network needed"""
+
+    def __init__(self, cassette: Cassette, config: CassetteConfig, fallback=None):
+        self.cassette = cassette
+        self.chat = SimpleNamespace(completions=_ReplayCompletions(cassette, config, fallback))
+
+
+_writers: Dict[str, CassetteWriter] = {}
+_cassettes: Dict[str, Cassette] = {}
+_registry_lock = threading.Lock()
+
+
+def create_recording_client(config: Optional[CassetteConfig] = None, inner=None) -> RecordingClient:
+    """Recording wrapper around `inner` (default: config.backend). Clients recording to one path share a writer"""
+    from agents.llm_backend import create_backend_client
+    config = config or CassetteConfig.from_env()
+    with _registry_lock:
+        if config.path not in _writers:
+            _writers[config.path] = CassetteWriter(config.path)
+        writer = _writers[config.path]
+    return RecordingClient(inner if inner is not None else create_backend_client(config.backend), writer,
+                           config.store_requests)
+
+
+def create_replay_client(config: Optional[CassetteConfig] = None) -> ReplayClient:
+    """Replay client; every client replaying one path shares the cassette so repeats advance together"""
+    from agents.llm_backend import create_backend_client
+    config = config or CassetteConfig.from_env()
+    with _registry_lock:
+        if config.path not in _cassettes:
+            _cassettes[config.path] = Cassette.load(config.path)
+        cassette = _cassettes[config.path]
+    fallback = None if config.strict else create_backend_client(config.backend)
+    return ReplayClient(cassette, config, fallback)
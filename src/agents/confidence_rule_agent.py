@@ -1,7 +1,7 @@
 import os
 import sys
 import math
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
 from agents.base_agent import BaseAgent
@@ -49,7 +49,7 @@ CRITICAL INSTRUCTIONS:
 
     def _make_confidence_api_call(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
@@ -126,6 +126,127 @@ CRITICAL INSTRUCTIONS:
         return round(confidence, 4)
 
 
+# Single-token answer labels: one letter per rule, plus NONE_LABEL. 19 rules + none fills top_logprobs=20
+RULE_LABELS = "ABCDEFGHIJKLMNOPQRS"
+NONE_LABEL = "0"
+
+
+class MultiRuleConfidenceAgent(BaseAgent):
+    """Probability for every rule (and "none") from the top_logprobs of a single one-token answer"""
+
+    def __init__(self, model="gpt-4o-mini", temperature=0, top_logprobs: int = 20, rule_kinds: Optional[List[str]] = None):
+        super().__init__(model=model, temperature=temperature, max_tokens=1)
+        self.response_format = None
+        self.top_logprobs = top_logprobs
+        self.rule_kinds = set(rule_kinds) if rule_kinds else None  # e.g. ["link", "all"] to score post rules only
+
+    def get_system_prompt(self) -> str:
+        return """You are a multi-rule violation detection agent. You will receive a labelled list of rules and one target (post or comment) to evaluate.
+
+Your task is to determine which rule, if any, the target violates.
+
+CRITICAL INSTRUCTIONS:
+- You MUST respond with exactly one label from the list
+- Answer with the label of the rule the target most clearly violates
+- Answer 0 if the target violates none of the rules
+- Do not include any explanation, punctuation, or additional text
+- Your entire response must be exactly one label"""
+
+    def label_rules(self, rules: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Label -> rule for the rules in scope; rules past the last label are not scored"""
+        scoped = [rule for rule in rules if isinstance(rule, dict) and rule.get("id")
+                  and (self.rule_kinds is None or rule.get("kind") in self.rule_kinds)]
+        max_rules = min(len(RULE_LABELS), max(1, self.top_logprobs - 1))
+        return dict(zip(RULE_LABELS, scoped[:max_rules]))
+
+    def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        rules = data.get('rules', [])
+        target = data.get('target', '')
+        labels = self.label_rules(rules)
+
+        if not labels or not target:
+            return {
+                "error": True,
+                "message": "At least one rule and a 'target' are required"
+            }
+
+        rule_lines = []
+        for label, rule in labels.items():
+            rule_text = " - ".join(part for part in (rule.get("short_name"), rule.get("description", "")[:300]) if part)
+            rule_lines.append(f"{label}: {rule['id']} - {rule_text}")
+        rule_lines.append(f"{NONE_LABEL}: none of the rules")
+
+        user_message = ("Rules:\n" + "\n".join(rule_lines) + f"\n\nTarget to evaluate: {target}\n\n"
+                        "Which rule does the target violate? Answer with the label only.")
+
+        messages = [
+            {"role": "system", "content": self.get_system_prompt()},
+            {"role": "user", "content": user_message}
+        ]
+
+        return self._make_distribution_api_call(messages, labels)
+
+    def _make_distribution_api_call(self, messages: List[Dict[str, str]], labels: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        try:
+            response = self._chat_completion(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=1,
+                logprobs=True,
+                top_logprobs=self.top_logprobs
+            )
+
+            logprobs = response.choices[0].logprobs
+            if not logprobs or not logprobs.content:
+                return {
+                    "error": True,
+                    "message": "No log probabilities available"
+                }
+
+            token_logprob = logprobs.content[0]
+            return self._distribution(token_logprob, labels)
+
+        except Exception as e:
+            return {
+                "error": True,
+                "message": str(e)
+            }
+
+    def _distribution(self, token_logprob, labels: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        label_ids = {label: rule["id"] for label, rule in labels.items()}
+        label_ids[NONE_LABEL] = "none"
+
+        # " A" and "A" are different tokens for the same answer; sum them
+        mass = {rule_id: 0.0 for rule_id in label_ids.values()}
+        seen = set()
+        for item in (token_logprob.top_logprobs or [token_logprob]):
+            label = item.token.strip().upper()
+            if label in label_ids and item.token not in seen:
+                seen.add(item.token)
+                mass[label_ids[label]] += math.exp(item.logprob)
+
+        coverage = sum(mass.values())
+        if coverage <= 0:
+            return {
+                "error": True,
+                "message": f"No rule label among the top tokens (answer: {token_logprob.token!r})"
+            }
+
+        distribution = {rule_id: round(p / coverage, 4) for rule_id, p in mass.items()}
+        rule_probabilities = {rule_id: p for rule_id, p in distribution.items() if rule_id != "none"}
+        top_rule = max(rule_probabilities, key=rule_probabilities.get) if rule_probabilities else None
+        return {
+            "answer": token_logprob.token,
+            "distribution": distribution,
+            "p_violation": round(1 - distribution["none"], 4),
+            "top_rule": top_rule,
+            "top_rule_probability": rule_probabilities.get(top_rule, 0.0),
+            # Probability mass the labels got before renormalizing; low coverage means the answer went off-script
+            "coverage": round(coverage, 4)
+        }
+
+
 class ConfidenceRuleAgentTester:
     def __init__(self):
         self.agent_log_odds = ConfidenceRuleAgent(confidence_method="log_odds")
@@ -165,7 +165,7 @@ class ConversationAgent(BaseConversationAgent):
         self.response_format = None
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
@@ -6,25 +6,49 @@ from agents.conversation_agents import (
 )
 from agents.override_rules_extraction import OverrideRuleExtractor
 from agents.context_understanding import ContextUnderstandingAgent
-from agents.base_agent import EventBus, ToolCall
+from agents.local_intent_classifier import LocalIntentClassifier
+from agents.stage_graph import StageGraph
+from agents.bulk_actions import (
+    BULK_INTENTS, BULK_CONFIRM, BULK_CANCEL, BULK_CONFIRM_TTL, BULK_UNSUPPORTED, BulkQuery, is_bulk_command,
+    parse_bulk_command, parse_bulk_reply
+)
+from agents.base_agent import EventBus, ToolCall, usage_scope
+from agents.usage import get_usage_tracker, usage_context
+from tracing import span
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import threading
 import time
 
+# The StageGraph of the message being processed in this context. Per context, not per orchestrator: the
+# background processor and the moderator send messages through the same orchestrator from different threads
+_message_stages: contextvars.ContextVar = contextvars.ContextVar("message_stages", default=None)
+
 
 class ConversationOrchestrator:
-    def __init__(self, meta_agent, post_agent, event_bus: Optional[EventBus] = None):
+    def __init__(self, meta_agent, post_agent, event_bus: Optional[EventBus] = None, local_intent: bool = True,
+                 conversation_state: Optional[ConversationState] = None):
         self.meta_agent = meta_agent
         self.post_agent = post_agent
         self.event_bus = event_bus or EventBus()
 
-        self.conversation_state = ConversationState()
+        self.conversation_state = conversation_state or ConversationState()
 
         self.intent_classifier = IntentClassificationAgent()
+        # Deterministic fast path for trivial messages; None disables it and every message goes to the LLM
+        self.local_intent_classifier = LocalIntentClassifier() if local_intent else None
         self.conversation_agent = ConversationAgent()
         self.moderation_agent = ModerationActionAgent()
         self.query_agent = QueryResponseAgent()
         self.context_understanding_agent = ContextUnderstandingAgent()
         self.override_rule_extractor = OverrideRuleExtractor(event_bus=event_bus)
 
+        # Independent LLM stages of a message (intent classification, speculative override extraction) run here
+        self._stage_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="orchestrator-stage")
+        self.last_stage_timings: Dict[str, Dict[str, Any]] = {}
+        self.speculation_stats = {"started": 0, "used": 0, "discarded": 0, "overlap_ms": 0.0}
+        self._speculation_lock = threading.Lock()
+
         self.setup_event_handlers()
 
     def setup_event_handlers(self):
@@ -48,21 +72,28 @@ class ConversationOrchestrator:
 
         # Update the post in meta_agent storage with current override rules
         if post_id and current_override_rules:
-            with self.meta_agent._lock:
-                if post_id in self.meta_agent.todo_posts:
-                    self.meta_agent.todo_posts[post_id]["override_rules"] = current_override_rules
-                elif post_id in self.meta_agent.approved_posts:
-                    self.meta_agent.approved_posts[post_id]["override_rules"] = current_override_rules
+            self.meta_agent.store.update_post(post_id, override_rules=current_override_rules)
 
         self.conversation_state.update_selected_entity("post", None)
         self.conversation_state.update_selected_post_details(None)
 
     def process_message(self, user_message: str, data_loader) -> Dict[str, Any]:
+        with span("orchestrator.process_message", message=user_message[:80]) as message_span, usage_scope() as usage, \
+                usage_context(subreddit=getattr(data_loader, "subreddit_name", None)):
+            response = self._process_message(user_message, data_loader)
+            get_usage_tracker().record_message(usage)
+            message_span.set(llm_calls=usage["calls"], tokens=usage["prompt_tokens"] + usage["completion_tokens"])
+            current_intent = self.conversation_state.current_intent
+            message_span.set(intent=current_intent.primary if current_intent else None, response_type=response.get("type"))
+            return response
+
+    def _process_message(self, user_message: str, data_loader) -> Dict[str, Any]:
         if not user_message.strip():
             return {"message": "Please provide a message.", "type": "error"}
 
+        token = _message_stages.set(None)
         try:
-            intent = self.intent_classifier.classify_intent(user_message, self.conversation_state)
+            intent = self._classify_intent(user_message, data_loader)
 
             response = self._route_to_agent(user_message, intent, data_loader)
 
@@ -87,6 +118,115 @@ class ConversationOrchestrator:
 
             return error_response
 
+        finally:
+            self._finish_stages()
+            _message_stages.reset(token)
+
+    def _classify_intent(self, user_message: str, data_loader) -> Intent:
+        # A bulk proposal is answered by the very next message; anything else drops it
+        pending = self._take_pending_bulk()
+        if pending is not None:
+            reply = parse_bulk_reply(user_message)
+            if reply is not None:
+                return Intent(primary="MODERATION_ACTION", secondary=reply, confidence=0.95,
+                              entities={"pending_bulk": pending})
+
+        # Bulk commands have a strict grammar and must not be mistaken for a single-post action
+        bulk_query = parse_bulk_command(user_message)
+        if bulk_query is not None:
+            return Intent(
+                primary="MODERATION_ACTION",
+                secondary=BULK_INTENTS[bulk_query.action],
+                confidence=0.95,
+                entities={"bulk_query": bulk_query}
+            )
+        if is_bulk_command(user_message):
+            # Neither the local classifier nor the LLM intents know bulk actions: they would read "approve all
+            # ... except rule 3" as approving the selected post
+            return Intent(primary="MODERATION_ACTION", secondary=BULK_UNSUPPORTED, confidence=0.95)
+
+        if self.local_intent_classifier is not None:
+            intent = self.local_intent_classifier.classify(user_message)
+            if intent is not None:
+                return intent
+
+        # The LLM decides the intent; start override extraction alongside it when a handler is likely to need it
+        stages = StageGraph(self._stage_executor)
+        _message_stages.set(stages)
+        stages.add_stage("intent", lambda ctx: self._classify_intent_llm(user_message))
+        override_inputs = self._speculative_override_inputs(user_message, data_loader)
+        if override_inputs:
+            stages.add_stage(
+                "override_rule",
+                lambda ctx: self.override_rule_extractor.extract_rule(user_message, *override_inputs),
+                speculative=True
+            )
+            with self._speculation_lock:
+                self.speculation_stats["started"] += 1
+        stages.start()
+        return stages.result("intent")
+
+    def _classify_intent_llm(self, user_message: str) -> Intent:
+        start = time.perf_counter()
+        intent = self.intent_classifier.classify_intent(user_message, self.conversation_state)
+        if self.local_intent_classifier is not None:
+            self.local_intent_classifier.record_llm_fallback(time.perf_counter() - start)
+        return intent
+
+    def _speculative_override_inputs(self, message: str, data_loader) -> Optional[tuple]:
+        # Only worth an extra LLM call when a post is selected and the local parser can't settle it
+        if not self.conversation_state.selected_entities.get("post"):
+            return None
+        try:
+            rules = data_loader.get_formatted_data().get("rules", [])
+        except Exception:
+            return None
+        existing_override_rules = list(self.conversation_state.get_post_override_rules())
+        if not self.override_rule_extractor.needs_llm(message, rules, existing_override_rules):
+            return None
+        return self.conversation_state.selected_post_details, rules, existing_override_rules
+
+    def _finish_stages(self):
+        stages = _message_stages.get()
+        _message_stages.set(None)
+        if stages is None:
+            self.last_stage_timings = {}
+            return
+        if "override_rule" in stages and not stages.stages["override_rule"].consumed:
+            stages.cancel("override_rule")
+            with self._speculation_lock:
+                self.speculation_stats["discarded"] += 1
+        self.last_stage_timings = stages.timings()
+
+    def _extract_override_rule(self, message: str, data_loader) -> Optional[str]:
+        """Extract (or take the speculative result of) an override rule, publish it and attach it to the post"""
+        post_context = self.conversation_state.selected_post_details
+        existing_override_rules = self.conversation_state.get_post_override_rules()
+
+        # Get rules from data loader for context
+        data = data_loader.get_formatted_data()
+        rules = data.get("rules", [])
+
+        stages = _message_stages.get()
+        if stages is not None and "override_rule" in stages:
+            override_rule = stages.take("override_rule")
+            with self._speculation_lock:
+                self.speculation_stats["used"] += 1
+                self.speculation_stats["overlap_ms"] += stages.overlap_ms("intent", "override_rule")
+        else:
+            override_rule = self.override_rule_extractor.extract_rule(
+                message, post_context, rules, existing_override_rules
+            )
+
+        self.override_rule_extractor.publish_rule_extracted(
+            override_rule, message, post_context, rules, existing_override_rules
+        )
+
+        # Add new rule to the current post if extracted
+        if override_rule:
+            self.conversation_state.add_post_override_rule(override_rule)
+        return override_rule
+
     def _route_to_agent(self, message: str, intent: Intent, data_loader) -> Dict[str, Any]:
         if intent.primary == "MODERATION_ACTION":
             return self._handle_moderation_action(message, intent, data_loader)
@@ -100,6 +240,22 @@ class ConversationOrchestrator:
             return self._handle_conversation(message, intent, data_loader)
 
     def _handle_moderation_action(self, message: str, intent: Intent, data_loader) -> Dict[str, Any]:
+        if intent.secondary in BULK_INTENTS.values():
+            return self._propose_bulk(intent.entities["bulk_query"], message)
+        if intent.secondary == BULK_CONFIRM:
+            pending = intent.entities["pending_bulk"]
+            return self._execute_bulk(pending["query"], pending["reason"], pending["post_ids"])
+        if intent.secondary == BULK_CANCEL:
+            return {"message": f"Cancelled: bulk {intent.entities['pending_bulk']['query'].action} not applied.",
+                    "type": "feedback"}
+        if intent.secondary == BULK_UNSUPPORTED:
+            return {
+                "message": "I can't run that bulk filter. Bulk commands take flagged posts with at most one rule and a "
+                           "confidence level or threshold, e.g. 'approve all flagged under rule_5 with confidence < 0.6'. "
+                           "Please rephrase; nothing was changed.",
+                "type": "feedback"
+            }
+
         selected_post_id = self.conversation_state.selected_entities.get("post")
 
         if not selected_post_id:
@@ -151,21 +307,7 @@ class ConversationOrchestrator:
 
     def _handle_system_command(self, message: str, intent: Intent, data_loader) -> Dict[str, Any]:
         try:
-            # Get post context and existing override rules for this post
-            post_context = self.conversation_state.selected_post_details
-            existing_override_rules = self.conversation_state.get_post_override_rules()
-
-            # Get rules from data loader for context
-            data = data_loader.get_formatted_data()
-            rules = data.get("rules", [])
-
-            override_rule = self.override_rule_extractor.extract(
-                message, post_context, rules, existing_override_rules
-            )
-
-            # Add new rule to the current post if extracted
-            if override_rule:
-                self.conversation_state.add_post_override_rule(override_rule)
+            self._extract_override_rule(message, data_loader)
 
             override_rules = self.conversation_state.get_post_override_rules()
             result = self.meta_agent._auto_review_posts(data_loader, override_rules)
@@ -187,21 +329,7 @@ class ConversationOrchestrator:
         selected_post_id = self.conversation_state.selected_entities.get("post")
 
         if selected_post_id and (intent.requires_review or intent.has_new_override_rules):
-            # Get post context and existing override rules for this post
-            post_context = self.conversation_state.selected_post_details
-            existing_override_rules = self.conversation_state.get_post_override_rules()
-
-            # Get rules from data loader for context
-            data = data_loader.get_formatted_data()
-            rules = data.get("rules", [])
-
-            override_rule = self.override_rule_extractor.extract(
-                message, post_context, rules, existing_override_rules
-            )
-
-            # Add new rule to the current post if extracted
-            if override_rule:
-                self.conversation_state.add_post_override_rule(override_rule)
+            self._extract_override_rule(message, data_loader)
 
             override_rules = self.conversation_state.get_post_override_rules()
             return self._re_review_with_feedback(selected_post_id, message, override_rules, data_loader)
@@ -212,21 +340,7 @@ class ConversationOrchestrator:
         selected_post_id = self.conversation_state.selected_entities.get("post")
 
         if selected_post_id and intent.has_new_override_rules:
-            # Get post context and existing override rules for this post
-            post_context = self.conversation_state.selected_post_details
-            existing_override_rules = self.conversation_state.get_post_override_rules()
-
-            # Get rules from data loader for context
-            data = data_loader.get_formatted_data()
-            rules = data.get("rules", [])
-
-            override_rule = self.override_rule_extractor.extract(
-                message, post_context, rules, existing_override_rules
-            )
-
-            # Add new rule to the current post if extracted
-            if override_rule:
-                self.conversation_state.add_post_override_rule(override_rule)
+            self._extract_override_rule(message, data_loader)
 
             override_rules = self.conversation_state.get_post_override_rules()
             return self._re_review_with_feedback(selected_post_id, message, override_rules, data_loader)
@@ -269,6 +383,47 @@ class ConversationOrchestrator:
         except Exception as e:
             return {"message": f"Error rejecting post: {str(e)}", "type": "error"}
 
+    def _take_pending_bulk(self) -> Optional[Dict[str, Any]]:
+        pending = next((action for action in self.conversation_state.pending_actions if action.get("type") == "bulk"), None)
+        self.conversation_state.clear_pending_actions()
+        if pending is None or time.time() - pending["created_at"] > BULK_CONFIRM_TTL:
+            return None
+        return pending
+
+    def _propose_bulk(self, query: BulkQuery, reason: str) -> Dict[str, Any]:
+        """Show what a bulk command matches and wait for the moderator to confirm it"""
+        post_ids = self.meta_agent.bulk_preview(query)
+        if not post_ids:
+            return {"message": f"No {query.describe()} to {query.action}.", "type": "feedback"}
+        self.conversation_state.add_pending_action({
+            "type": "bulk",
+            "query": query,
+            "reason": reason,
+            "post_ids": post_ids,
+            "created_at": time.time()
+        })
+        return {
+            "message": f"This will {query.action} {len(post_ids)} {query.describe()}. Reply 'confirm' to proceed or 'cancel'.",
+            "type": "confirmation",
+            "bulk": True,
+            "post_ids": post_ids
+        }
+
+    def _execute_bulk(self, query: BulkQuery, reason: str, confirmed_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        try:
+            result = self.meta_agent._bulk_moderate(query, reason, confirmed_ids)
+            return {
+                "message": result["message"],
+                "type": "moderation_action",
+                "action": f"bulk_{query.action}",
+                "bulk": True,
+                "post_ids": result["post_ids"],
+                "actions_taken": [f"bulk_{query.action}_post"] if result["post_ids"] else [],
+                "tool_results": result["tool_results"]
+            }
+        except Exception as e:
+            return {"message": f"Error in bulk {query.action}: {str(e)}", "type": "error"}
+
     def _execute_flag(self, post_id: str, reason: str) -> Dict[str, Any]:
         tool_call = ToolCall("flag_for_review", {"post_id": post_id, "reason": reason})
         result = tool_call.execute()
@@ -325,7 +480,7 @@ class ConversationOrchestrator:
         selected_post_id = self.conversation_state.selected_entities.get("post")
 
         if selected_post_id:
-            selected_post = self.meta_agent.get_selected_post()
+            selected_post = self.meta_agent.ensure_explanation(selected_post_id)
             if selected_post and selected_post.get("explanation"):
                 explanation_parts = [f"Decision explanation for post {selected_post_id}:"]
                 explanation_parts.append(selected_post['explanation'])
@@ -406,10 +561,18 @@ class ConversationOrchestrator:
         contextual_instruction = self.meta_agent._create_contextual_message(feedback_message)
         return self.meta_agent._re_review_selected_post_with_context(contextual_instruction, override_rules, data_loader)
 
+    def shutdown(self):
+        self._stage_executor.shutdown(wait=False)
+
     def get_conversation_summary(self) -> Dict[str, Any]:
         return {
-            "conversation_turns": len(self.conversation_state.conversation_history),
+            "conversation_turns": self.conversation_state.conversation_history.total,
+            "history": self.conversation_state.conversation_history.stats(),
             "selected_post": self.conversation_state.selected_entities.get("post"),
             "conversation_mode": self.conversation_state.conversation_mode.value,
-            "recent_intents": [turn.intent.primary for turn in self.conversation_state.get_recent_context(5)]
+            "recent_intents": [turn.intent.primary for turn in self.conversation_state.get_recent_context(5)],
+            "intent_fast_path": self.local_intent_classifier.get_stats() if self.local_intent_classifier else None,
+            "override_fast_path": dict(self.override_rule_extractor.stats),
+            "speculation": dict(self.speculation_stats),
+            "last_stage_timings": self.last_stage_timings
         }
\ No newline at end of file
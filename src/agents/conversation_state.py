@@ -1,7 +1,8 @@
 from typing import Dict, Any, List, Optional
 from enum import Enum
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 import time
+from agents.history import BoundedHistory, history_limit, spill_path, count_into, extend_span
 
 
 class ConversationMode(Enum):
@@ -41,10 +42,25 @@ class ConversationTurn:
             self.actions_taken = []
 
 
+def summarize_turn(summary: Dict[str, Any], turn: ConversationTurn):
+    """Fold an evicted turn into the compact summary kept in place of old history"""
+    summary["turns"] = summary.get("turns", 0) + 1
+    extend_span(summary, turn.timestamp)
+    count_into(summary, "intents", turn.intent.primary if turn.intent else None)
+    for action in turn.actions_taken:
+        count_into(summary, "actions", action)
+
+
 class ConversationState:
-    def __init__(self):
+    def __init__(self, max_turns: Optional[int] = None, history_dir: Optional[str] = None, spill_name: str = "conversation"):
         self.current_intent: Optional[Intent] = None
-        self.conversation_history: List[ConversationTurn] = []
+        self.conversation_history: BoundedHistory = BoundedHistory(
+            maxlen=max_turns or history_limit(200),
+            compact_batch=50,
+            serialize=asdict,
+            summarize=summarize_turn,
+            spill_path=spill_path(spill_name, history_dir)
+        )
         self.pending_actions: List[Dict[str, Any]] = []
         self.user_preferences: Dict[str, Any] = {}
 
@@ -71,7 +87,7 @@ class ConversationState:
         self.last_activity = time.time()
 
     def get_recent_context(self, turns: int = 3) -> List[ConversationTurn]:
-        return self.conversation_history[-turns:] if turns > 0 else self.conversation_history
+        return self.conversation_history.recent(turns)
 
     def update_selected_entity(self, entity_type: str, entity_value: Any):
         if entity_type in self.selected_entities:
@@ -0,0 +1,215 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Deque, List, Optional
+
+from agents.stats import percentile
+
+# Comma separated key=value options, e.g. "max_concurrency=8,reserve_interactive=2,aging_s=5";
+# max_concurrency=0 sends every request straight through
+DISPATCH_ENV = "MOD_AGENT_DISPATCH"
+
+# Highest priority first
+LANES = ("interactive", "re_review", "background")
+DEFAULT_LANE = "interactive"
+
+_lane: contextvars.ContextVar = contextvars.ContextVar("dispatch_lane", default=None)
+
+
+@contextmanager
+def dispatch_lane(lane: str):
+    """Send the chat completions made inside the block through `lane`; the innermost block wins"""
+    if lane not in LANES:
+        raise ValueError(f"Unknown dispatch lane '{lane}', expected one of {LANES}")
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> str:
+    return _lane.get() or DEFAULT_LANE
+
+
+class DispatchTimeout(TimeoutError):
+    """No slot freed up within the caller's timeout; a TimeoutError, so the call policy retries it"""
+
+
+@dataclass
+class DispatchConfig:
+    max_concurrency: int = 16
+    # Slots only that lane may use, so a full backlog never takes the last slots a moderator needs
+    # (and background review never stops entirely)
+    reserve_interactive: int = 2
+    reserve_re_review: int = 1
+    reserve_background: int = 1
+    # A waiter moves up one lane for every aging_s seconds it has waited; 0 disables aging
+    aging_s: float = 5.0
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "DispatchConfig":
+        config = cls()
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in types:
+                raise ValueError(f"Unknown dispatch option '{key}'")
+            setattr(config, key, types[key](value.strip()))
+        if config.max_concurrency and sum(config.reservations().values()) > config.max_concurrency:
+            raise ValueError("Dispatch reservations exceed max_concurrency")
+        return config
+
+    @classmethod
+    def from_env(cls) -> "DispatchConfig":
+        return cls.from_spec(os.getenv(DISPATCH_ENV, ""))
+
+    def reservations(self) -> Dict[str, int]:
+        return {lane: getattr(self, f"reserve_{lane}") for lane in LANES}
+
+
+class _Ticket:
+    __slots__ = ("lane", "rank", "seq", "enqueued", "event")
+
+    def __init__(self, lane: str, seq: int):
+        self.lane = lane
+        self.rank = LANES.index(lane)
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.event = threading.Event()
+
+
+class LLMDispatcher:
+    """Shared concurrency limit for LLM requests with priority lanes. Free slots go to the highest-priority
+    waiter (FIFO within a lane, with aging); each lane's reserved slots are never taken by the others"""
+
+    def __init__(self, config: Optional[DispatchConfig] = None, max_samples: int = 1000):
+        self.config = config or DispatchConfig()
+        self.reserved = self.config.reservations()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting: List[_Ticket] = []
+        self._active = {lane: 0 for lane in LANES}
+        self._waits: Dict[str, Deque[float]] = {lane: deque(maxlen=max_samples) for lane in LANES}
+        self._stats = {lane: {"requests": 0, "queued": 0, "aged": 0, "abandoned": 0, "wait_s": 0.0} for lane in LANES}
+
+    @classmethod
+    def from_env(cls) -> "LLMDispatcher":
+        return cls(DispatchConfig.from_env())
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.max_concurrency > 0
+
+    @contextmanager
+    def slot(self, lane: Optional[str] = None, timeout: Optional[float] = None):
+        """Hold one request slot in lane (default: the current dispatch_lane) for the duration of the block"""
+        lane = lane or current_lane()
+        if not self.enabled:
+            yield
+            return
+        self.acquire(lane, timeout)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def acquire(self, lane: str, timeout: Optional[float] = None):
+        """Wait for a slot in lane; raises DispatchTimeout when none is granted within timeout seconds"""
+        ticket = _Ticket(lane, next(self._seq))
+        with self._lock:
+            self._waiting.append(ticket)
+            self._dispatch()
+        try:
+            if ticket.event.wait(timeout):
+                return
+        except BaseException:
+            # A ticket left behind would be granted a slot nobody ever releases
+            if not self._withdraw(ticket):
+                self.release(lane)
+            raise
+        if self._withdraw(ticket):
+            raise DispatchTimeout(f"No {lane} dispatch slot within {timeout:.3f}s")
+
+    def _withdraw(self, ticket: _Ticket) -> bool:
+        """Take a ticket out of the queue; False when it was granted a slot in the meantime"""
+        with self._lock:
+            if ticket not in self._waiting:
+                return False
+            self._waiting.remove(ticket)
+            self._stats[ticket.lane]["abandoned"] += 1
+            return True
+
+    def release(self, lane: str):
+        with self._lock:
+            self._active[lane] -= 1
+            self._dispatch()
+
+    def _can_start(self, lane: str) -> bool:
+        # Other lanes' unused reservations are off limits
+        held = sum(max(0, self.reserved[other] - self._active[other]) for other in LANES if other != lane)
+        return sum(self._active.values()) + held < self.config.max_concurrency
+
+    def _dispatch(self):
+        now = time.monotonic()
+        aging = self.config.aging_s
+
+        def effective_rank(ticket: _Ticket) -> int:
+            return max(0, ticket.rank - int((now - ticket.enqueued) / aging)) if aging > 0 else ticket.rank
+
+        for ticket in sorted(self._waiting, key=lambda ticket: (effective_rank(ticket), ticket.seq)):
+            if not self._can_start(ticket.lane):
+                continue
+            self._waiting.remove(ticket)
+            self._active[ticket.lane] += 1
+            wait = now - ticket.enqueued
+            stats = self._stats[ticket.lane]
+            stats["requests"] += 1
+            stats["wait_s"] += wait
+            stats["queued"] += 1 if wait > 0.001 else 0
+            stats["aged"] += 1 if effective_rank(ticket) < ticket.rank else 0
+            self._waits[ticket.lane].append(wait)
+            ticket.event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = dict(self._active)
+            waiting = {lane: sum(1 for ticket in self._waiting if ticket.lane == lane) for lane in LANES}
+            stats = {lane: dict(self._stats[lane]) for lane in LANES}
+            waits = {lane: sorted(self._waits[lane]) for lane in LANES}
+
+        lanes = {}
+        for lane in LANES:
+            lane_stats = stats[lane]
+            requests = lane_stats.pop("requests")
+            wait_s = lane_stats.pop("wait_s")
+            lanes[lane] = {
+                "requests": requests,
+                **lane_stats,
+                "active": active[lane],
+                "waiting": waiting[lane],
+                "reserved": self.reserved[lane],
+                "mean_wait_ms": round(wait_s / requests * 1000, 2) if requests else 0.0,
+                "p50_wait_ms": round(percentile(waits[lane], 50) * 1000, 2),
+                "p95_wait_ms": round(percentile(waits[lane], 95) * 1000, 2),
+                "max_wait_ms": round(waits[lane][-1] * 1000, 2) if waits[lane] else 0.0
+            }
+        return {"max_concurrency": self.config.max_concurrency, "lanes": lanes}
+
+
+_dispatcher = LLMDispatcher.from_env()
+
+
+def get_dispatcher() -> LLMDispatcher:
+    return _dispatcher
+
+
+def set_dispatcher(dispatcher: LLMDispatcher):
+    global _dispatcher
+    _dispatcher = dispatcher
@@ -0,0 +1,484 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+
+import openai
+from openai.types.chat import ChatCompletion
+
+# Comma separated key=value overrides, e.g. "latency=lognormal:300:0.4,error_rate=0.01,seed=7"
+FAKE_LLM_ENV = "MOD_AGENT_FAKE_LLM"
+
+VIOLATION_POST_ID = re.compile(r"violation_rule_(\d+)_")
+RULE_REFERENCE = re.compile(r"rule[\s_#]*(\d+)", re.IGNORECASE)
+RULE_LABEL_LINE = re.compile(r"^(\w): (rule_\d+|none)\b", re.MULTILINE)
+
+
+class LatencyModel:
+    """Latency in ms: fixed:<ms>, uniform:<low>:<high>, normal:<mean>:<std> or lognormal:<median>:<sigma>"""
+
+    ARITY = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *params = spec.split(":")
+        if kind not in self.ARITY or len(params) != self.ARITY[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params]
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            value = rng.gauss(self.params[0], self.params[1])
+        else:
+            value = self.params[0] * math.exp(rng.gauss(0, self.params[1]))
+        return max(0.0, value)
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: str = "fixed:0"
+    per_token_ms: float = 0.0  # extra latency per completion token, output tokens dominate real latency
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int = 0
+    data_dir: str = "data"
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "FakeLLMConfig":
+        config = cls()
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in types:
+                raise ValueError(f"Unknown fake LLM option '{key}'")
+            setattr(config, key, types[key](value.strip()))
+        return config
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        return cls.from_spec(os.getenv(FAKE_LLM_ENV, ""))
+
+
+class FakeLLMError(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _stable_fraction(text: str) -> float:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+def _extract_json(text: str) -> Dict[str, Any]:
+    start = text.find("{")
+    if start < 0:
+        return {}
+    try:
+        return json.loads(text[start:])
+    except json.JSONDecodeError:
+        return {}
+
+
+class FakeLLMEngine:
+    """Produces chat-completions shaped responses with deterministic, rule-based verdicts.
+
+    A post is a violation when its id matches violation_rule_<N>_ (rule_<N+1>) or its content is one
+    of the Viol_ posts found under data_dir. Override rules that name the violated rule clear it.
+    """
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig()
+        self.latency = LatencyModel(self.config.latency)
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._request_counter = 0
+        self._known_violations: Optional[Dict[str, int]] = None
+
+    def handle(self, request: Dict[str, Any]) -> Tuple[float, Optional[FakeLLMError], Optional[Dict[str, Any]]]:
+        """Returns (delay_seconds, error, response). Exactly one of error/response is set"""
+        with self._lock:
+            self._request_counter += 1
+            request_number = self._request_counter
+            roll = self._rng.random()
+            delay_ms = self.latency.sample(self._rng)
+
+        if roll < self.config.rate_limit_rate:
+            return delay_ms / 1000, FakeLLMError(429, "Rate limit reached (fake)", self.config.retry_after), None
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return delay_ms / 1000, FakeLLMError(500, "Internal server error (fake)"), None
+
+        response = self.build_response(request, request_number)
+        delay_ms += self.config.per_token_ms * response["usage"]["completion_tokens"]
+        return delay_ms / 1000, None, response
+
+    def build_response(self, request: Dict[str, Any], request_number: int = 0) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        max_tokens = request.get("max_tokens") or 500
+
+        logprobs = None
+        if request.get("logprobs") and "Which rule does the target violate?" in user:
+            content, logprobs = self._rule_distribution(user, request.get("top_logprobs") or 1)
+        elif request.get("logprobs"):
+            content, logprobs = self._confidence(user, request.get("top_logprobs") or 1)
+        elif "Intent Classification Agent" in system:
+            content = json.dumps(self._classify_intent(user))
+        elif "Override Rule Extraction Agent" in system:
+            content = json.dumps(self._extract_override_rule(user))
+        elif "Review Agent" in system:
+            content = json.dumps(self._review(system, user, max_tokens))
+        elif "Moderation Action Agent" in system:
+            content = json.dumps(self._moderation_action(user))
+        elif "Query Response Agent" in system:
+            content = json.dumps({"response": "This is a canned answer from the fake LLM backend.", "type": "query_response", "data_provided": []})
+        elif "Context Understanding Agent" in system:
+            content = json.dumps({"entities": {"post_ids": [], "rule_refs": RULE_REFERENCE.findall(user), "actions": [], "temporal_refs": []},
+                                  "resolved_references": {}, "context_confidence": 0.5})
+        elif request.get("response_format") is None:
+            content = "Understood. (fake LLM backend)"
+        else:
+            content = "{}"
+
+        prompt_tokens = sum(_estimate_tokens(m.get("content") or "") + 4 for m in messages)
+        completion_tokens = 1 if logprobs else _estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-fake-{request_number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+                "logprobs": logprobs
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _violation_index(self) -> Dict[str, int]:
+        if self._known_violations is None:
+            known = {}
+            data_dir = Path(self.config.data_dir)
+            if data_dir.exists():
+                for post_file in data_dir.glob("Viol_*/*/post.json"):
+                    match = VIOLATION_POST_ID.match(post_file.parent.name)
+                    if not match:
+                        continue
+                    try:
+                        with open(post_file, "r") as f:
+                            post = json.load(f)["data"]
+                    except Exception:
+                        continue
+                    title, body = post.get("title", ""), post.get("selftext", "")
+                    known[f"{title}\n\n{body}".strip()] = int(match.group(1))
+                    known[body.strip()] = int(match.group(1))
+            with self._lock:
+                if self._known_violations is None:
+                    self._known_violations = known
+        return self._known_violations
+
+    def _remember_violation(self, content: str, rule_index: int):
+        index = self._violation_index()
+        with self._lock:
+            index[content] = rule_index
+
+    def _review(self, system: str, user: str, max_tokens: int) -> Dict[str, Any]:
+        envelope = _extract_json(user)
+        post = envelope.get("post", {})
+        if envelope.get("review_target") == "comment":
+            comment = envelope.get("target_comment", {})
+            target_id, content = comment.get("id", ""), comment.get("body", "").strip()
+        else:
+            target_id = post.get("id", "")
+            content = f"{post.get('title', '')}\n\n{post.get('body', '')}".strip()
+
+        match = VIOLATION_POST_ID.match(target_id or "")
+        rule_index = int(match.group(1)) if match else self._violation_index().get(content)
+        if match:
+            self._remember_violation(content, rule_index)
+
+        rule_id = f"rule_{rule_index + 1}" if rule_index is not None else None
+        overridden = False
+        if rule_id:
+            for override in envelope.get("override_rules", []):
+                if any(f"rule_{num}" == rule_id for num in RULE_REFERENCE.findall(override.get("rule_content", ""))):
+                    overridden = True
+
+        violation = rule_id is not None and not overridden
+        result = {"violation": violation, "rule_id": rule_id if violation else None}
+        if '"explanation"' in system:
+            if violation:
+                explanation = f"The post breaks {rule_id} of the subreddit rules."
+            elif overridden:
+                explanation = f"A moderator override suspends {rule_id} for this post, so it is allowed."
+            else:
+                explanation = "The post is a genuine historical question and does not break any rule."
+            # Stay inside the output budget the caller asked for, like a truncated model reply would
+            result["explanation"] = explanation[:max(0, (max_tokens - 20) * 4)]
+        return result
+
+    def _confidence(self, user: str, top_logprobs: int) -> Tuple[str, Dict[str, Any]]:
+        match = re.search(r"Target to evaluate: (.*)\n\nDoes the target", user, re.DOTALL)
+        target = (match.group(1) if match else user).strip()
+        fraction = _stable_fraction(target)
+        if target in self._violation_index():
+            p_yes = 0.72 + 0.26 * fraction
+        else:
+            p_yes = 0.03 + 0.25 * fraction
+
+        candidates = sorted([("Y", p_yes), ("N", 1 - p_yes)], key=lambda item: -item[1])
+        # Remaining tokens get a sliver of probability, like real top_logprobs tails
+        for filler in ["Yes", "No", "y", "n", " Y", " N"]:
+            candidates.append((filler, 1e-4))
+        top = [{"token": token, "bytes": list(token.encode("utf-8")), "logprob": math.log(p)} for token, p in candidates[:max(1, top_logprobs)]]
+        chosen = top[0]
+        return chosen["token"], {"content": [{**chosen, "top_logprobs": top}]}
+
+    def _rule_distribution(self, user: str, top_logprobs: int) -> Tuple[str, Dict[str, Any]]:
+        match = re.search(r"Target to evaluate: (.*)\n\nWhich rule", user, re.DOTALL)
+        target = (match.group(1) if match else user).strip()
+        labels = dict((rule_id, label) for label, rule_id in RULE_LABEL_LINE.findall(user))
+        fraction = _stable_fraction(target)
+
+        rule_index = self._violation_index().get(target)
+        violated_label = labels.get(f"rule_{rule_index + 1}") if rule_index is not None else None
+        none_label = labels.get("none", "0")
+        if violated_label:
+            weights = {violated_label: 0.7 + 0.28 * fraction, none_label: 0.05}
+        else:
+            weights = {none_label: 0.75 + 0.23 * fraction}
+        # Spread what's left over the other labels, decreasing, so the tail looks like a real distribution
+        others = [label for label in labels.values() if label not in weights]
+        remaining = max(0.0, 1.0 - sum(weights.values()))
+        for rank, label in enumerate(others):
+            weights[label] = remaining * 0.5 ** (rank + 1)
+
+        candidates = sorted(weights.items(), key=lambda item: -item[1])
+        top = [{"token": token, "bytes": list(token.encode("utf-8")), "logprob": math.log(max(p, 1e-9))}
+               for token, p in candidates[:max(1, top_logprobs)]]
+        chosen = top[0]
+        return chosen["token"], {"content": [{**chosen, "top_logprobs": top}]}
+
+    def _classify_intent(self, user: str) -> Dict[str, Any]:
+        message = user.split("Message: ", 1)[-1].split("\n\nContext:", 1)[0].lower()
+        intent = {"primary_intent": "CONVERSATION", "secondary_intent": None, "confidence": 0.6,
+                  "entities": {"post_ids": [], "rule_refs": RULE_REFERENCE.findall(message), "actions": []},
+                  "requires_review": False, "has_override_rules": False, "tools_needed": []}
+
+        if any(word in message for word in ["ignore", "overlook", "exception", "lenient", "override"]):
+            intent.update(primary_intent="FEEDBACK", requires_review=True, has_override_rules=True, confidence=0.9)
+        elif re.search(r"\b(approve|reject|remove|flag)\b", message):
+            action = re.search(r"\b(approve|reject|remove|flag)\b", message).group(1)
+            secondary = {"approve": "APPROVE_POST", "reject": "REJECT_POST", "remove": "REJECT_POST", "flag": "FLAG_POST"}[action]
+            intent.update(primary_intent="MODERATION_ACTION", secondary_intent=secondary, confidence=0.9)
+            intent["entities"]["actions"] = [action]
+        elif any(word in message for word in ["why", "explain", "what's wrong", "issue"]):
+            intent.update(primary_intent="MODERATION_QUERY", secondary_intent="EXPLAIN_DECISION", confidence=0.85)
+        elif any(word in message for word in ["summarize", "summary", "about"]):
+            intent.update(primary_intent="MODERATION_QUERY", secondary_intent="SUMMARIZE_POST", confidence=0.85)
+        elif "status" in message:
+            intent.update(primary_intent="MODERATION_QUERY", secondary_intent="QUERY_POST_STATUS", confidence=0.85)
+        elif "rule" in message:
+            intent.update(primary_intent="MODERATION_QUERY", secondary_intent="QUERY_RULES", confidence=0.8)
+        elif any(word in message for word in ["auto", "check posts", "review all"]):
+            intent.update(primary_intent="SYSTEM_COMMAND", confidence=0.85)
+        return intent
+
+    def _extract_override_rule(self, user: str) -> Dict[str, Any]:
+        instruction = user.split("User instruction: ", 1)[-1].lower()
+        if not any(word in instruction for word in ["ignore", "override", "exception", "suspend", "don't apply"]):
+            return {"override_rule": None}
+        numbers = RULE_REFERENCE.findall(instruction)
+        if not numbers:
+            return {"override_rule": None}
+        rule_id = f"rule_{numbers[0]}"
+        existing = user.split("Existing override rules", 1)[-1] if "Existing override rules" in user else ""
+        if rule_id in existing:
+            return {"override_rule": None}
+        return {"override_rule": f"ignore {rule_id} for this post"}
+
+    def _moderation_action(self, user: str) -> Dict[str, Any]:
+        request = user.split("Action request: ", 1)[-1].lower()
+        action = "reject" if ("reject" in request or "remove" in request) else "flag" if "flag" in request else "approve"
+        return {"action": action, "post_id": "", "reason": "Requested by moderator", "success": True,
+                "message": f"Post will be {action}d"}
+
+
+class _FakeHTTPResponse:
+    """Just enough of an HTTP response for openai's APIStatusError constructors"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        self.status_code = status_code
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.request = None
+
+
+def to_openai_error(error: FakeLLMError) -> openai.APIStatusError:
+    response = _FakeHTTPResponse(error.status_code, error.retry_after)
+    body = {"message": error.message, "type": "fake_error"}
+    if error.status_code == 429:
+        return openai.RateLimitError(error.message, response=response, body=body)
+    return openai.InternalServerError(error.message, response=response, body=body)
+
+
+class _FakeCompletions:
+    def __init__(self, engine: FakeLLMEngine):
+        self.engine = engine
+
+    def create(self, **kwargs) -> ChatCompletion:
+        timeout = kwargs.pop("timeout", None)
+        delay, error, response = self.engine.handle(kwargs)
+        if timeout is not None and delay > timeout:
+            # Like the real client: give up after the timeout instead of waiting for the response
+            time.sleep(timeout)
+            raise openai.APITimeoutError(request=None)
+        if delay:
+            time.sleep(delay)
+        if error:
+            raise to_openai_error(error)
+        return ChatCompletion.model_validate(response)
+
+
+class FakeLLMClient:
+    """In-process stand-in for openai.OpenAI exposing client.chat.completions.create"""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None, engine: Optional[FakeLLMEngine] = None):
+        self.engine = engine or FakeLLMEngine(config)
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self.engine))
+
+
+class FakeLLMServer:
+    """Localhost HTTP server speaking the chat-completions API. Point OPENAI_BASE_URL at base_url"""
+
+    def __init__(self, engine: Optional[FakeLLMEngine] = None, host: str = "127.0.0.1", port: int = 0):
+        self.engine = engine or FakeLLMEngine()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def _make_handler(self):
+        engine = self.engine
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "fake"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+                    return
+
+                delay, error, response = engine.handle(request)
+                if delay:
+                    time.sleep(delay)
+                if error:
+                    headers = {"Retry-After": str(error.retry_after)} if error.retry_after is not None else {}
+                    self._send_json(error.status_code, {"error": {"message": error.message, "type": "fake_error"}}, headers)
+                else:
+                    self._send_json(200, response)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake chat-completions server for offline runs and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:<ms>, uniform:<low>:<high>, normal:<mean>:<std> or lognormal:<median>:<sigma>")
+    parser.add_argument("--per-token-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        per_token_ms=args.per_token_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        data_dir=args.data_dir
+    )
+    server = FakeLLMServer(FakeLLMEngine(config), host=args.host, port=args.port)
+    print(f"Fake LLM listening on {server.base_url}")
+    print(f"Use it with: OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=fake")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+# Caps for in-memory history and where evicted entries are written for auditing ("" disables spilling)
+HISTORY_LIMIT_ENV = "MOD_AGENT_HISTORY_LIMIT"
+HISTORY_DIR_ENV = "MOD_AGENT_HISTORY_DIR"
+DEFAULT_HISTORY_DIR = "logs"
+
+_session_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+def history_limit(default: int) -> int:
+    return int(os.getenv(HISTORY_LIMIT_ENV, str(default)))
+
+
+def spill_path(name: str, history_dir: Optional[str] = None) -> Optional[str]:
+    """Per-session JSONL file for evicted entries of one history, or None when spilling is disabled.
+    history_dir overrides MOD_AGENT_HISTORY_DIR; "" disables spilling"""
+    if history_dir is None:
+        history_dir = os.getenv(HISTORY_DIR_ENV, DEFAULT_HISTORY_DIR)
+    if not history_dir:
+        return None
+    return os.path.join(history_dir, f"{name}-{_session_id}.jsonl")
+
+
+class BoundedHistory:
+    """Append-only ring buffer. When it grows past maxlen the oldest `compact_batch` entries are folded into
+    `summary` by `summarize` and appended to `spill_path` as JSONL, so memory stays bounded but nothing is lost"""
+
+    def __init__(self, maxlen: int = 500, compact_batch: int = 100,
+                 serialize: Callable[[Any], Dict[str, Any]] = lambda item: item,
+                 summarize: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+                 spill_path: Optional[str] = None):
+        self.maxlen = max(1, maxlen)
+        self.compact_batch = max(1, min(compact_batch, self.maxlen))
+        self.serialize = serialize
+        self.summarize = summarize
+        self.spill_path = spill_path
+
+        self.total = 0
+        self.evicted = 0
+        self.summary: Dict[str, Any] = {}
+        self._items = deque()
+        self._lock = threading.Lock()
+
+    def append(self, item: Any):
+        with self._lock:
+            self._items.append(item)
+            self.total += 1
+            if len(self._items) > self.maxlen:
+                # Compact in batches so spilling costs one file write per batch, not per entry
+                self._compact([self._items.popleft() for _ in range(self.compact_batch)])
+
+    def _compact(self, items: List[Any]):
+        self.evicted += len(items)
+        if self.summarize:
+            for item in items:
+                self.summarize(self.summary, item)
+
+        if self.spill_path:
+            try:
+                os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+                with open(self.spill_path, "a") as f:
+                    for item in items:
+                        f.write(json.dumps(self.serialize(item), default=str) + "\n")
+            except OSError:
+                # Auditing must not take the session down; keep the summary and stop spilling
+                self.spill_path = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            return iter(list(self._items))
+
+    def __getitem__(self, index):
+        with self._lock:
+            if isinstance(index, slice):
+                return list(self._items)[index]
+            return self._items[index]
+
+    def recent(self, n: int) -> List[Any]:
+        with self._lock:
+            if n <= 0:
+                return list(self._items)
+            return list(self._items)[-n:]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_memory": len(self._items),
+                "total": self.total,
+                "evicted": self.evicted,
+                "maxlen": self.maxlen,
+                "spill_path": self.spill_path,
+                "summary": dict(self.summary)
+            }
+
+
+def count_into(summary: Dict[str, Any], key: str, value: Optional[str]):
+    if value:
+        counts = summary.setdefault(key, {})
+        counts[value] = counts.get(value, 0) + 1
+
+
+def extend_span(summary: Dict[str, Any], timestamp: Optional[float]):
+    if timestamp is None:
+        return
+    summary["from"] = min(summary.get("from", timestamp), timestamp)
+    summary["to"] = max(summary.get("to", timestamp), timestamp)
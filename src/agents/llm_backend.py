@@ -0,0 +1,99 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+# Selects the chat-completions client every agent talks to: "openai" (default), "fake", "record" or "replay"
+LLM_BACKEND_ENV = "MOD_AGENT_LLM_BACKEND"
+
+# USD per million (prompt, completion) tokens; models not listed are treated as free (local or fake backends)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+_backends: Dict[str, Callable[[], object]] = {}
+_client_factory: Optional[Callable[[], object]] = None
+_fake_engine = None
+_fake_engine_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[], object]):
+    """Register a client factory. Clients must expose client.chat.completions.create(**kwargs)"""
+    _backends[name] = factory
+
+
+def set_client_factory(factory: Optional[Callable[[], object]]):
+    """Force every agent created afterwards to use this factory, regardless of the environment"""
+    global _client_factory
+    _client_factory = factory
+
+
+def create_client():
+    if _client_factory is not None:
+        return _client_factory()
+    return create_backend_client()
+
+
+def create_backend_client(backend_name: Optional[str] = None):
+    """Client from a registered backend (default from the environment), ignoring any forced factory.
+    Lets wrappers installed with set_client_factory build the client they wrap"""
+    backend_name = backend_name or os.getenv(LLM_BACKEND_ENV, "openai")
+    if backend_name not in _backends:
+        raise ValueError(f"Unknown LLM backend '{backend_name}'. Available: {', '.join(sorted(_backends))}")
+    return _backends[backend_name]()
+
+
+def model_price(model: Optional[str]) -> Tuple[float, float]:
+    """Per-million-token prices; dated snapshots like gpt-4o-mini-2024-07-18 use their base model's price"""
+    if not model:
+        return (0.0, 0.0)
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+    # Longest prefix first so gpt-4o-mini-... doesn't match gpt-4o
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name + "-"):
+            return MODEL_PRICES[name]
+    return (0.0, 0.0)
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = model_price(model)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _create_openai_client():
+    from openai import OpenAI
+    # Retries and timeouts are applied per request by agents.call_policy
+    return OpenAI(max_retries=0)
+
+
+def _create_fake_client():
+    from agents.fake_llm import FakeLLMClient, FakeLLMConfig, FakeLLMEngine
+    global _fake_engine
+    # One engine per process so error/latency draws follow a single seeded sequence; agents are built
+    # concurrently (per-thread agents in batch_review and evaluate), so two must never race to create it
+    with _fake_engine_lock:
+        if _fake_engine is None:
+            _fake_engine = FakeLLMEngine(FakeLLMConfig.from_env())
+        engine = _fake_engine
+    return FakeLLMClient(engine=engine)
+
+
+def _create_recording_client():
+    from agents.cassette import create_recording_client
+    return create_recording_client()
+
+
+def _create_replay_client():
+    from agents.cassette import create_replay_client
+    return create_replay_client()
+
+
+register_backend("openai", _create_openai_client)
+register_backend("fake", _create_fake_client)
+# Cassettes, configured by MOD_AGENT_CASSETTE: "record" wraps another backend, "replay" needs no network
+register_backend("record", _create_recording_client)
+register_backend("replay", _create_replay_client)
@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from agents.conversation_state import Intent
+
+# Filler stripped before matching so "please approve this post." and "approve this post" are the same message
+_POLITE_PREFIX = re.compile(r"^(?:(?:please|pls|ok(?:ay)?|can you|could you|would you|go ahead and|just)\s+)+")
+_POLITE_SUFFIX = re.compile(r"(?:\s+(?:please|pls|thanks|thank you))+$")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!]+$")
+_RULE_REF = re.compile(r"\brule\s*#?\s*(\d+)\b")
+_WORD = re.compile(r"[a-z']+")
+
+_TARGET = r"(?:\s+(?:this|it|that|the|this one|that one)?\s*(?:post)?)?"
+
+# Whole-message forms that are unambiguous on their own: (pattern, primary, secondary, extra intent fields)
+PATTERNS: List[Tuple[str, str, Optional[str], Dict[str, Any]]] = [
+    (rf"(?:approve|accept){_TARGET}", "MODERATION_ACTION", "APPROVE_POST", {}),
+    (rf"(?:reject|remove|delete|decline){_TARGET}", "MODERATION_ACTION", "REJECT_POST", {}),
+    (rf"flag{_TARGET}(?:\s+for\s+(?:human\s+)?review)?", "MODERATION_ACTION", "FLAG_POST", {}),
+    (rf"(?:ignore|overlook|disregard|skip)\s+rule\s*#?\s*\d+(?:\s+for{_TARGET})?", "FEEDBACK", None,
+     {"requires_review": True, "has_new_override_rules": True}),
+    (r"why\s+(?:was|is|did)\s+(?:this|it|that|the)?\s*(?:post\s+)?(?:get\s+)?(?:flagged|removed|rejected)\??",
+     "MODERATION_QUERY", "EXPLAIN_DECISION", {}),
+    (rf"(?:what'?s|what\s+is)\s+(?:the\s+issue|wrong|the\s+problem)(?:\s+with{_TARGET})?\??",
+     "MODERATION_QUERY", "EXPLAIN_DECISION", {}),
+    (rf"explain(?:\s+the)?\s+(?:decision|this|it|the\s+flag)(?:\s+for{_TARGET})?\??", "MODERATION_QUERY", "EXPLAIN_DECISION", {}),
+    (rf"(?:summari[sz]e|tl;?dr){_TARGET}\??", "MODERATION_QUERY", "SUMMARIZE_POST", {}),
+    (r"(?:what'?s|what\s+is)\s+(?:this|it|this\s+post|the\s+post)\s+about\??", "MODERATION_QUERY", "SUMMARIZE_POST", {}),
+    (rf"(?:(?:what'?s|what\s+is)\s+the\s+)?(?:post\s+)?status(?:\s+of{_TARGET})?\??", "MODERATION_QUERY", "QUERY_POST_STATUS", {}),
+    (r"(?:what\s+are|show(?:\s+me)?|list)\s+(?:the\s+)?(?:subreddit\s+)?rules\??", "MODERATION_QUERY", "QUERY_RULES", {}),
+    (r"(?:run\s+)?auto[\s-]?(?:check|review|moderate)(?:\s+(?:all|the))*(?:\s+posts)?", "SYSTEM_COMMAND", None, {}),
+    (r"(?:hi|hello|hey|thanks|thank you|thx|good (?:morning|afternoon|evening))(?:\s+there)?", "CONVERSATION", None, {}),
+]
+
+# Keyword weights per (primary, secondary) for messages that match no whole-message form
+KEYWORDS: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {
+    ("MODERATION_ACTION", "APPROVE_POST"): {"approve": 3.0, "accept": 2.0, "fine": 0.5},
+    ("MODERATION_ACTION", "REJECT_POST"): {"reject": 3.0, "remove": 2.5, "delete": 2.0, "decline": 2.0},
+    ("MODERATION_ACTION", "FLAG_POST"): {"flag": 3.0, "escalate": 2.0},
+    ("MODERATION_QUERY", "EXPLAIN_DECISION"): {"why": 2.0, "explain": 3.0, "flagged": 1.0, "reason": 1.5, "wrong": 1.0, "issue": 1.0},
+    ("MODERATION_QUERY", "SUMMARIZE_POST"): {"summarize": 3.0, "summarise": 3.0, "summary": 3.0, "about": 1.0, "tldr": 3.0},
+    ("MODERATION_QUERY", "QUERY_POST_STATUS"): {"status": 3.0, "approved": 1.0, "happened": 1.5},
+    ("MODERATION_QUERY", "QUERY_RULES"): {"rules": 2.5, "guidelines": 2.5},
+    ("FEEDBACK", None): {"ignore": 3.0, "overlook": 3.0, "lenient": 3.0, "exception": 3.0, "disregard": 3.0, "strict": 2.0},
+    ("SYSTEM_COMMAND", None): {"auto": 3.0, "autoreview": 3.0, "all": 0.5, "batch": 2.0},
+    ("CONVERSATION", None): {"hello": 3.0, "hi": 3.0, "hey": 3.0, "thanks": 3.0, "how": 0.5},
+}
+
+# Words that make an otherwise clear message conditional, negated, hedged, compound or about many posts. A wrong
+# local APPROVE/REJECT can't be taken back, so these always go to the LLM
+AMBIGUITY_MARKERS = {"not", "don't", "dont", "never", "no", "shouldn't", "should", "maybe", "if", "but", "unless", "instead",
+                     "and", "or", "though", "although", "however", "all", "every", "each", "except", "excluding", "without"}
+# Rule or confidence qualifiers ("... it breaks rule 3", "... with confidence < 0.6") change what a keyword match means
+_QUALIFIER = re.compile(r"rule|confiden|[<>=%]|\d")
+
+
+class LocalIntentClassifier:
+    """Resolves short, unambiguous messages without an LLM call; returns None when the LLM should decide"""
+
+    def __init__(self, min_score: float = 2.5, min_margin: float = 1.5, max_words: int = 12):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.max_words = max_words
+        self.patterns = [(re.compile(pattern), primary, secondary, extra) for pattern, primary, secondary, extra in PATTERNS]
+
+        self.stats = {"messages": 0, "local_hits": 0, "pattern_hits": 0, "keyword_hits": 0, "llm_fallbacks": 0,
+                      "local_time_ms": 0.0, "llm_time_ms": 0.0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        text = " ".join(message.lower().split())
+        text = _TRAILING_PUNCTUATION.sub("", text)
+        text = _POLITE_PREFIX.sub("", text)
+        text = _POLITE_SUFFIX.sub("", text)
+        return _TRAILING_PUNCTUATION.sub("", text)
+
+    def classify(self, message: str) -> Optional[Intent]:
+        start = time.perf_counter()
+        intent, source = self._classify(message)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self.stats["messages"] += 1
+            self.stats["local_time_ms"] += elapsed_ms
+            if intent:
+                self.stats["local_hits"] += 1
+                self.stats[f"{source}_hits"] += 1
+        return intent
+
+    def _classify(self, message: str) -> Tuple[Optional[Intent], Optional[str]]:
+        text = self.normalize(message)
+        if not text:
+            return None, None
+
+        rule_refs = _RULE_REF.findall(text)
+        for pattern, primary, secondary, extra in self.patterns:
+            if pattern.fullmatch(text):
+                return self._build_intent(primary, secondary, 0.95, rule_refs, extra), "pattern"
+
+        words = _WORD.findall(text)
+        if len(words) > self.max_words or AMBIGUITY_MARKERS.intersection(words) or _QUALIFIER.search(text):
+            return None, None
+
+        scores = []
+        for (primary, secondary), weights in KEYWORDS.items():
+            score = sum(weights.get(word, 0.0) for word in words)
+            if score:
+                scores.append((score, primary, secondary))
+        if not scores:
+            return None, None
+
+        scores.sort(key=lambda item: item[0], reverse=True)
+        best_score, primary, secondary = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        if best_score < self.min_score or best_score - runner_up < self.min_margin:
+            return None, None
+
+        extra = {"requires_review": True, "has_new_override_rules": True} if primary == "FEEDBACK" else {}
+        return self._build_intent(primary, secondary, 0.8, rule_refs, extra), "keyword"
+
+    @staticmethod
+    def _build_intent(primary: str, secondary: Optional[str], confidence: float, rule_refs: List[str],
+                      extra: Dict[str, Any]) -> Intent:
+        actions = [secondary.split("_")[0].lower()] if primary == "MODERATION_ACTION" and secondary else []
+        return Intent(
+            primary=primary,
+            secondary=secondary,
+            confidence=confidence,
+            entities={"post_ids": [], "rule_refs": rule_refs, "actions": actions},
+            requires_review=extra.get("requires_review", False),
+            has_new_override_rules=extra.get("has_new_override_rules", False)
+        )
+
+    def record_llm_fallback(self, elapsed_s: float):
+        with self._stats_lock:
+            self.stats["llm_fallbacks"] += 1
+            self.stats["llm_time_ms"] += elapsed_s * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        messages = stats["messages"]
+        fallbacks = stats["llm_fallbacks"]
+        avg_llm_ms = stats["llm_time_ms"] / fallbacks if fallbacks else None
+        avg_local_ms = stats["local_time_ms"] / messages if messages else 0.0
+
+        stats["hit_rate"] = round(stats["local_hits"] / messages, 3) if messages else 0.0
+        stats["avg_llm_ms"] = round(avg_llm_ms, 1) if avg_llm_ms is not None else None
+        # Estimated from the LLM latency observed on fallbacks in this session
+        stats["latency_saved_ms"] = round(stats["local_hits"] * (avg_llm_ms - avg_local_ms), 1) if avg_llm_ms is not None else None
+        stats["local_time_ms"] = round(stats["local_time_ms"], 3)
+        stats["llm_time_ms"] = round(stats["llm_time_ms"], 1)
+        return stats
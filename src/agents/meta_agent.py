@@ -2,75 +2,211 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import contextvars
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Callable
 from agents.base_agent import BaseAgent, EventBus, ToolCall
 from agents.post_agent import MCPEnvelope
 from agents.conversation_orchestrator import ConversationOrchestrator
+from agents.conversation_state import ConversationState
+from agents.history import BoundedHistory, history_limit, spill_path, count_into, extend_span
+from agents.post_store import PostStore
+from agents.bulk_actions import BulkQuery
+from agents.calibration import VerdictLog
+from agents.usage import get_usage_tracker
+from agents.call_policy import add_breaker_listener, remove_breaker_listener, any_circuit_open, circuit_stats
+from agents.single_flight import get_single_flight
+from agents.dispatch import dispatch_lane, get_dispatcher
+
+
+def _summarize_tool_call(summary: Dict[str, Any], tool_call: ToolCall):
+    summary["tool_calls"] = summary.get("tool_calls", 0) + 1
+    count_into(summary, "tools", tool_call.tool_name)
+    extend_span(summary, (tool_call.result or {}).get("timestamp"))
+
+
+def _spill_name(name: str, tag: Optional[str]) -> str:
+    return f"{name}-{tag}" if tag else name
+
+
+# Breaker listener per event bus with the number of agents publishing through it: agents sharing a bus register
+# one listener, and it is removed when the last of them closes
+_bus_monitors: Dict[int, List[Any]] = {}
+_bus_monitors_lock = threading.Lock()
+
+
+def _attach_bus_monitors(event_bus: EventBus):
+    with _bus_monitors_lock:
+        entry = _bus_monitors.get(id(event_bus))
+        if entry is None:
+            def listener(model: str, old_state: str, new_state: str):
+                event_bus.publish("llm_circuit_changed", {"model": model, "old_state": old_state, "new_state": new_state})
+            entry = _bus_monitors[id(event_bus)] = [listener, 0]
+            add_breaker_listener(listener)
+            get_usage_tracker().attach_event_bus(event_bus)
+        entry[1] += 1
+
+
+def _detach_bus_monitors(event_bus: EventBus):
+    with _bus_monitors_lock:
+        entry = _bus_monitors.get(id(event_bus))
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _bus_monitors[id(event_bus)]
+            remove_breaker_listener(entry[0])
+            get_usage_tracker().detach_event_bus(event_bus)
+
+
+def _review_error(analysis_result: Dict[str, Any]) -> str:
+    return analysis_result.get("message") or analysis_result.get("explanation") or "review failed"
 
 
 class MetaChatAgent:
-    def __init__(self, post_agent, override_rule_extractor, event_bus: Optional[EventBus] = None):
+    def __init__(self, post_agent, override_rule_extractor, event_bus: Optional[EventBus] = None, review_workers: int = 1,
+                 verdict_log: Optional[VerdictLog] = None, history_dir: Optional[str] = None,
+                 shared: Optional["MetaChatAgent"] = None, spill_tag: Optional[str] = None):
+        """verdict_log and history_dir default to the environment (MOD_AGENT_VERDICT_LOG, MOD_AGENT_HISTORY_DIR);
+        pass VerdictLog(None) and a scratch directory to keep synthetic runs out of the real logs. With `shared`,
+        the verdict store, review rules, verdict log and parked reviews are that agent's instead of new ones;
+        spill_tag is appended to the spill file names so agents sharing a process never append to the same file"""
         self.post_agent = post_agent
         self.override_rule_extractor = override_rule_extractor
         self.event_bus = event_bus or EventBus()
+        self.review_workers = max(1, review_workers)
 
-        self.approved_posts: Dict[str, Dict[str, Any]] = {}
-        self.todo_posts: Dict[str, Dict[str, Any]] = {}
+        # Verdicts live in a copy-on-write store: readers take snapshots without locking, writers commit transactions
+        self.store = shared.store if shared else PostStore()
         self.selected_post_id: Optional[str] = None
         self.selected_post_context: Optional[Dict[str, Any]] = None  # Full post context
 
         self.agent_registry: List[BaseAgent] = [post_agent]
-        self.tool_call_history: List[ToolCall] = []
+        # Bounded so an all-day session doesn't grow without limit; older calls spill to disk
+        self.tool_call_history: BoundedHistory = BoundedHistory(
+            maxlen=history_limit(500),
+            compact_batch=100,
+            serialize=lambda tool_call: tool_call.to_dict(),
+            summarize=_summarize_tool_call,
+            spill_path=spill_path(_spill_name("tool_calls", spill_tag), history_dir)
+        )
 
-        self._lock = threading.Lock()
+        # _lock guards this agent's selection; the store serializes its own writers
+        self._lock = threading.RLock()
+
+        # Rules per subreddit from the last review, so deferred explanations can be generated after the fact
+        self._review_rules: Dict[str, List[Dict[str, Any]]] = shared._review_rules if shared else {}
+        self.explanation_stats = {"deferred": 0, "generated": 0, "failed": 0}
+        # Counted from review workers, the background thread and selections in parallel
+        self._explanation_stats_lock = threading.Lock()
+        # Moderator decisions on scored verdicts, the outcomes confidence calibration is fitted against
+        if shared:
+            verdict_log = shared.verdict_log
+        self.verdict_log = verdict_log if verdict_log is not None else VerdictLog.from_env()
+        # Posts whose review failed (LLM errors, open circuit): queued for the moderator marked review_pending,
+        # never auto-approved, and reviewed again once the LLM recovers. _parked_lock is always the innermost
+        # lock (taken inside store transactions, never around one) so it can't deadlock with the store's
+        self._parked: Dict[str, Dict[str, Any]] = shared._parked if shared else {}
+        self._parked_lock = shared._parked_lock if shared else threading.Lock()
 
         self.conversation_orchestrator = ConversationOrchestrator(
             meta_agent=self,
             post_agent=post_agent,
-            event_bus=self.event_bus
+            event_bus=self.event_bus,
+            conversation_state=ConversationState(history_dir=history_dir, spill_name=_spill_name("conversation", spill_tag))
         )
 
+        self._attach_process_monitors()
         self.event_bus.subscribe("post_selected", self._handle_post_selection)
         self.event_bus.subscribe("background_posts_loaded", self._handle_background_posts)
 
+    @property
+    def approved_posts(self):
+        """Read-only view of the approved posts in the current snapshot"""
+        return self.store.snapshot().approved
+
+    @property
+    def todo_posts(self):
+        """Read-only view of the flagged posts in the current snapshot"""
+        return self.store.snapshot().todo
+
     def add_agent(self, agent: BaseAgent):
         self.agent_registry.append(agent)
 
     def get_selected_post(self) -> Optional[Dict[str, Any]]:
-        if self.selected_post_id:
-            return self.todo_posts.get(self.selected_post_id) or self.approved_posts.get(self.selected_post_id)
+        selected_post_id = self.selected_post_id
+        if selected_post_id:
+            return self.store.snapshot().get(selected_post_id)
         return None
 
+    def ensure_explanation(self, post_id: str) -> Optional[Dict[str, Any]]:
+        """The stored post, with its explanation generated and cached first if the review deferred it"""
+        post = self.store.snapshot().get(post_id)
+        if not post or not post.get("explanation_pending"):
+            return post
+        rules = self._review_rules.get(post.get("subreddit"))
+        if rules is None:
+            return post
+
+        mcp_envelope = MCPEnvelope(post=post, subreddit=post["subreddit"], rules=rules, review_target="post")
+        mcp_envelope.add_override_rules(post.get("override_rules", []))
+        explanation = self.post_agent.explain(mcp_envelope, post)
+        if explanation is None:
+            self._count_explanation("failed")
+            return post
+
+        self._count_explanation("generated")
+        with self.store.transaction() as txn:
+            current = txn.get(post_id)
+            # Don't attach the explanation to a verdict that was replaced while it was being generated
+            if current and current.get("explanation_pending") and current.get("rule_id") == post.get("rule_id") \
+                    and current.get("violation") == post.get("violation"):
+                txn.update_post(post_id, explanation=explanation, explanation_pending=False)
+        return self.store.snapshot().get(post_id)
+
+    def _count_explanation(self, outcome: str):
+        with self._explanation_stats_lock:
+            self.explanation_stats[outcome] += 1
+
     def select_post(self, post_id: str):
+        if post_id != self.selected_post_id:
+            # Explaining can take an LLM round-trip; do it before taking the selection lock
+            self.ensure_explanation(post_id)
+
         with self._lock:
-            if post_id == self.selected_post_id:
-                self.selected_post_id = None
-                self.selected_post_context = None
-                self.event_bus.publish("post_deselected", {"post_id": post_id})
-            else:
-                self.selected_post_id = post_id
-                # Store full post context for use in conversations
-                selected_post = self.todo_posts.get(post_id) or self.approved_posts.get(post_id)
-                if selected_post:
-                    self.selected_post_context = {
-                        "post_id": post_id,
-                        "title": selected_post.get("title", ""),
-                        "body": selected_post.get("body", ""),
-                        "current_status": "flagged" if post_id in self.todo_posts else "approved",
-                        "explanation": selected_post.get("explanation", ""),
-                        "rule_id": selected_post.get("rule_id"),
-                        "violation": selected_post.get("violation", False),
-                        "override_rules": selected_post.get("override_rules", [])
-                    }
-
-                    # Add confidence information if available
-                    if selected_post.get("confidence") is not None:
-                        self.selected_post_context["confidence"] = selected_post.get("confidence")
-                        self.selected_post_context["confidence_level"] = selected_post.get("confidence_level", "unknown")
-
-                self.event_bus.publish("post_selected", {"post_id": post_id})
+            self._toggle_selection(post_id)
+
+    def _toggle_selection(self, post_id: str):
+        """Select post_id, or deselect it if it is already selected; the caller holds _lock"""
+        if post_id == self.selected_post_id:
+            self.selected_post_id = None
+            self.selected_post_context = None
+            self.event_bus.publish("post_deselected", {"post_id": post_id})
+        else:
+            self.selected_post_id = post_id
+            # Store full post context for use in conversations
+            snapshot = self.store.snapshot()
+            selected_post = snapshot.get(post_id)
+            if selected_post:
+                self.selected_post_context = {
+                    "post_id": post_id,
+                    "title": selected_post.get("title", ""),
+                    "body": selected_post.get("body", ""),
+                    "current_status": snapshot.status(post_id),
+                    "explanation": selected_post.get("explanation") or "",
+                    "rule_id": selected_post.get("rule_id"),
+                    "violation": selected_post.get("violation", False),
+                    "override_rules": selected_post.get("override_rules", [])
+                }
+
+                # Add confidence information if available
+                if selected_post.get("confidence") is not None:
+                    self.selected_post_context["confidence"] = selected_post.get("confidence")
+                    self.selected_post_context["confidence_level"] = selected_post.get("confidence_level", "unknown")
+
+            self.event_bus.publish("post_selected", {"post_id": post_id})
 
     def _handle_post_selection(self, data: Dict[str, Any]):
         post_id = data.get("post_id")
@@ -81,11 +217,15 @@ class MetaChatAgent:
         approved_posts = data.get("approved_posts", [])
         flagged_posts = data.get("flagged_posts", [])
 
-        with self._lock:
+        self._store_reviews(approved_posts, flagged_posts)
+
+    def _store_reviews(self, approved_posts: List[Dict[str, Any]], flagged_posts: List[Dict[str, Any]]):
+        # One transaction per batch: one copy and one new snapshot however many posts were reviewed
+        with self.store.transaction() as txn:
             for post in approved_posts:
-                self.approved_posts[post["id"]] = post
+                txn.put_approved(post)
             for post in flagged_posts:
-                self.todo_posts[post["id"]] = post
+                txn.put_flagged(post)
 
     def interact(self, user_instruction: str, data_loader) -> Dict[str, Any]:
         return self.conversation_orchestrator.process_message(user_instruction, data_loader)
@@ -150,22 +290,26 @@ Please process this instruction specifically in the context of the above post.
         if override_rules:
             mcp_envelope.add_override_rules(override_rules)
 
-        analysis_result = self.post_agent.review(mcp_envelope)
-        post_info = self._create_post_info(target_post, analysis_result)
+        # The moderator reads this explanation right away, so never defer it
+        with dispatch_lane("re_review"):
+            analysis_result = self.post_agent.review(mcp_envelope, explain=True)
+        if analysis_result.get("error"):
+            return {"approved_posts": [], "flagged_posts": [], "type": "error",
+                    "message": f"Re-review of post {target_post['id']} failed, its verdict is unchanged: "
+                               f"{_review_error(analysis_result)}"}
+        post_info = self._create_post_info(target_post, analysis_result, data["subreddit_name"])
 
         # Update post status and execute appropriate tool based on new analysis
         actions_taken = []
         tool_result = None
 
-        with self._lock:
+        with self._lock, self.store.transaction() as txn:
             if analysis_result.get("violation"):
-                self.todo_posts[post_info["id"]] = post_info
-                self.approved_posts.pop(post_info["id"], None)
+                txn.put_flagged(post_info)
                 self.selected_post_context["current_status"] = "flagged"
                 message = f"Re-reviewed post {self.selected_post_id}: Still flagged - {analysis_result.get('explanation', 'Analysis completed')}"
             else:
-                self.approved_posts[post_info["id"]] = post_info
-                self.todo_posts.pop(post_info["id"], None)
+                txn.put_approved(post_info)
                 self.selected_post_context["current_status"] = "approved"
 
                 # Execute approve_post tool since re-review shows no violation
@@ -230,12 +374,14 @@ Please process this instruction specifically in the context of the above post.
         result = tool_call.execute()
         self.tool_call_history.append(tool_call)
 
-        with self._lock:
-            if post_id in self.todo_posts:
-                post = self.todo_posts.pop(post_id)
-                self.approved_posts[post_id] = post
+        with self._lock, self.store.transaction() as txn:
+            post = txn.todo.get(post_id)
+            self._unpark(post_id)
+            if txn.approve(post_id):
                 self.selected_post_id = None
                 self.selected_post_context = None
+        if post is not None:
+            self.verdict_log.record(post, final_violation=False, action="approve")
 
         return {
             "approved_posts": [],
@@ -249,11 +395,14 @@ Please process this instruction specifically in the context of the above post.
         result = tool_call.execute()
         self.tool_call_history.append(tool_call)
 
-        with self._lock:
-            if post_id in self.todo_posts:
-                self.todo_posts.pop(post_id)
+        with self._lock, self.store.transaction() as txn:
+            post = txn.remove(post_id) if post_id in txn.todo else None
+            self._unpark(post_id)
+            if post is not None:
                 self.selected_post_id = None
                 self.selected_post_context = None
+        if post is not None:
+            self.verdict_log.record(post, final_violation=True, action="reject")
 
         return {
             "approved_posts": [],
@@ -262,6 +411,80 @@ Please process this instruction specifically in the context of the above post.
             "message": f"Post {post_id} rejected successfully"
         }
 
+    def _bulk_candidates(self, snapshot, query: BulkQuery) -> List[str]:
+        return [post["id"] for post in snapshot.query(
+            status=query.status,
+            rule_id=query.rule_id,
+            min_confidence=query.min_confidence,
+            max_confidence=query.max_confidence,
+            confidence_level=query.confidence_level
+        )]
+
+    def bulk_preview(self, query: BulkQuery) -> List[str]:
+        """Posts a bulk action would touch right now, for the moderator to confirm"""
+        return self._bulk_eligible(self._bulk_candidates(self.store.snapshot(), query))
+
+    def _bulk_moderate(self, query: BulkQuery, reason: str, confirmed_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Approve or reject every flagged post matching query: one batch of tool calls, one transaction, one event.
+        With confirmed_ids, only posts the moderator was shown (and that still match) are touched"""
+        tool_name = "approve_post" if query.action == "approve" else "reject_post"
+        with self._lock, self.store.transaction() as txn:
+            # Resolve against the snapshot the transaction started from so the set can't shift underneath us
+            candidates = self._bulk_candidates(txn.base, query)
+            if confirmed_ids is not None:
+                confirmed = set(confirmed_ids)
+                candidates = [post_id for post_id in candidates if post_id in confirmed]
+            post_ids = self._bulk_eligible(candidates)
+
+            tool_calls = [ToolCall(tool_name, {"post_id": post_id, "reason": reason}) for post_id in post_ids]
+            for tool_call in tool_calls:
+                tool_call.execute()
+            for tool_call in tool_calls:
+                self.tool_call_history.append(tool_call)
+
+            moderated = [txn.todo[post_id] for post_id in post_ids]
+            for post_id in post_ids:
+                if query.action == "approve":
+                    txn.approve(post_id)
+                else:
+                    txn.remove(post_id)
+
+            if self.selected_post_id in post_ids:
+                self.selected_post_id = None
+                self.selected_post_context = None
+
+        for post in moderated:
+            self.verdict_log.record(post, final_violation=query.action == "reject", action=f"bulk_{query.action}", bulk=True)
+
+        skipped = len(candidates) - len(post_ids)
+        self.event_bus.publish("posts_bulk_moderated", {
+            "action": query.action,
+            "query": query.to_dict(),
+            "post_ids": post_ids,
+            "count": len(post_ids),
+            "skipped": skipped,
+            "reason": reason
+        })
+
+        verb = "approved" if query.action == "approve" else "rejected"
+        message = f"Bulk {verb} {len(post_ids)} {query.describe()}"
+        if skipped:
+            message += f" ({skipped} skipped)"
+        return {
+            "approved_posts": [],
+            "flagged_posts": [],
+            "post_ids": post_ids,
+            "skipped": skipped,
+            "tool_results": [tool_call.result for tool_call in tool_calls],
+            "message": message
+        }
+
+    def _bulk_eligible(self, post_ids: List[str]) -> List[str]:
+        """Posts a bulk action may touch: never parked posts, which have no verdict yet; sessions also exclude
+        posts another moderator has leased"""
+        with self._parked_lock:
+            return [post_id for post_id in post_ids if post_id not in self._parked]
+
     def _re_review_selected_post(self, override_rules: List[str], data_loader) -> Dict[str, Any]:
         selected_post = self.get_selected_post()
         if not selected_post:
@@ -280,20 +503,24 @@ Please process this instruction specifically in the context of the above post.
                 if override_rules:
                     mcp_envelope.add_override_rules(override_rules)
 
-                analysis_result = self.post_agent.review(mcp_envelope)
-                post_info = self._create_post_info(post, analysis_result)
+                with dispatch_lane("re_review"):
+                    analysis_result = self.post_agent.review(mcp_envelope, explain=True)
+                if analysis_result.get("error"):
+                    # A failed review is not a "no violation" verdict; leave the post as it is
+                    return {"approved_posts": [], "flagged_posts": [], "type": "error",
+                            "message": f"Re-review of post {self.selected_post_id} failed, its verdict is unchanged: "
+                                       f"{_review_error(analysis_result)}"}
+                post_info = self._create_post_info(post, analysis_result, data["subreddit_name"])
 
                 actions_taken = []
                 tool_result = None
 
-                with self._lock:
+                with self._lock, self.store.transaction() as txn:
                     if analysis_result.get("violation"):
-                        self.todo_posts[post_info["id"]] = post_info
-                        self.approved_posts.pop(post_info["id"], None)
+                        txn.put_flagged(post_info)
                         message = f"Re-reviewed post {self.selected_post_id}: Still flagged - {analysis_result.get('explanation', 'Analysis completed')}"
                     else:
-                        self.approved_posts[post_info["id"]] = post_info
-                        self.todo_posts.pop(post_info["id"], None)
+                        txn.put_approved(post_info)
 
                         # Execute approve_post tool since re-review shows no violation
                         tool_call = ToolCall("approve_post", {
@@ -345,10 +572,12 @@ Please process this instruction specifically in the context of the above post.
 
     def _auto_review_posts(self, data_loader, override_rules: Optional[List[str]] = None) -> Dict[str, Any]:
         data = data_loader.get_formatted_data()
+        self._review_rules[data["subreddit_name"]] = data["rules"]
         approved_posts = []
         flagged_posts = []
+        parked_posts = []
 
-        for post in data["posts"]:
+        def review_post(post):
             mcp_envelope = MCPEnvelope(
                 post=post,
                 subreddit=data["subreddit_name"],
@@ -358,23 +587,109 @@ Please process this instruction specifically in the context of the above post.
             if override_rules:
                 mcp_envelope.add_override_rules(override_rules)
 
-            analysis_result = self.post_agent.review(mcp_envelope)
-            post_info = self._create_post_info(post, analysis_result)
+            return post, self.post_agent.review(mcp_envelope)
 
-            if analysis_result.get("violation"):
+        posts = data["posts"]
+        if self.review_workers > 1 and len(posts) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.review_workers, len(posts))) as executor:
+                # Copy the caller's context per task so review spans nest under the message that triggered them
+                futures = [executor.submit(contextvars.copy_context().run, review_post, post) for post in posts]
+                reviews = [future.result() for future in futures]
+        else:
+            reviews = [review_post(post) for post in posts]
+
+        for post, analysis_result in reviews:
+            post_info = self._create_post_info(post, analysis_result, data["subreddit_name"])
+            if post_info.get("explanation_pending"):
+                self._count_explanation("deferred")
+
+            if analysis_result.get("error"):
+                self._park(post, data["subreddit_name"], data["rules"], override_rules, analysis_result)
+                parked_posts.append(post_info)
+            elif analysis_result.get("violation"):
                 flagged_posts.append(post_info)
             else:
                 approved_posts.append(post_info)
 
-        with self._lock:
-            for post in approved_posts:
-                self.approved_posts[post["id"]] = post
-            for post in flagged_posts:
-                self.todo_posts[post["id"]] = post
-
-        return {"approved_posts": approved_posts, "flagged_posts": flagged_posts}
-
-    def _create_post_info(self, post: Dict[str, Any], analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        self._store_reviews(approved_posts, flagged_posts + parked_posts)
+        if parked_posts:
+            self.event_bus.publish("reviews_parked", {
+                "post_ids": [post_info["id"] for post_info in parked_posts],
+                "circuit_open": any_circuit_open()
+            })
+
+        return {"approved_posts": approved_posts, "flagged_posts": flagged_posts, "parked_posts": parked_posts}
+
+    def _park(self, post: Dict[str, Any], subreddit: str, rules: List[Dict[str, Any]],
+              override_rules: Optional[List[str]], analysis_result: Dict[str, Any]):
+        with self._parked_lock:
+            entry = self._parked.get(post["id"])
+            if entry is None:
+                entry = self._parked[post["id"]] = {"post": post, "subreddit": subreddit, "rules": rules,
+                                                    "override_rules": override_rules, "parked_at": time.time(),
+                                                    "attempts": 0}
+            entry["attempts"] += 1
+            entry["error"] = _review_error(analysis_result)
+
+    def _unpark(self, post_id: str):
+        with self._parked_lock:
+            self._parked.pop(post_id, None)
+
+    def is_parked(self, post_id: str) -> bool:
+        with self._parked_lock:
+            return post_id in self._parked
+
+    def parked_count(self) -> int:
+        with self._parked_lock:
+            return len(self._parked)
+
+    def retry_parked_reviews(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Review parked posts again, oldest first, unless a circuit is open; posts that get a verdict are unparked"""
+        if any_circuit_open():
+            return {"retried": 0, "resolved": 0, "parked": self.parked_count(), "circuit_open": True}
+        with self._parked_lock:
+            entries = list(self._parked.items())[:limit]
+
+        reviewed = []
+        for post_id, entry in entries:
+            mcp_envelope = MCPEnvelope(post=entry["post"], subreddit=entry["subreddit"], rules=entry["rules"],
+                                       review_target="post")
+            if entry["override_rules"]:
+                mcp_envelope.add_override_rules(entry["override_rules"])
+            # Ahead of new background work: these posts already sit in the moderator's queue
+            with dispatch_lane("re_review"):
+                analysis_result = self.post_agent.review(mcp_envelope)
+            if analysis_result.get("error"):
+                self._park(entry["post"], entry["subreddit"], entry["rules"], entry["override_rules"], analysis_result)
+                if any_circuit_open():
+                    break
+                continue
+            reviewed.append((self._create_post_info(entry["post"], analysis_result, entry["subreddit"]), analysis_result))
+
+        approved_posts, flagged_posts = [], []
+        with self.store.transaction() as txn:
+            for post_info, analysis_result in reviewed:
+                with self._parked_lock:
+                    was_parked = self._parked.pop(post_info["id"], None) is not None
+                # Moderated by hand in the meantime: the moderator's decision stands
+                if not was_parked or post_info["id"] not in txn.todo:
+                    continue
+                if analysis_result.get("violation"):
+                    txn.put_flagged(post_info)
+                    flagged_posts.append(post_info)
+                else:
+                    txn.put_approved(post_info)
+                    approved_posts.append(post_info)
+
+        if approved_posts or flagged_posts:
+            self.event_bus.publish("parked_reviews_resolved", {
+                "approved_posts": approved_posts,
+                "flagged_posts": flagged_posts
+            })
+        return {"retried": len(entries), "resolved": len(approved_posts) + len(flagged_posts),
+                "parked": self.parked_count(), "circuit_open": any_circuit_open()}
+
+    def _create_post_info(self, post: Dict[str, Any], analysis_result: Dict[str, Any], subreddit: Optional[str] = None) -> Dict[str, Any]:
         post_info = {
             "id": post.get("id", ""),
             "title": post.get("title", "")[:150],
@@ -383,15 +698,26 @@ Please process this instruction specifically in the context of the above post.
             "violation": analysis_result.get("violation"),
             "explanation": analysis_result.get("explanation")
         }
+        if subreddit:
+            post_info["subreddit"] = subreddit
+        if analysis_result.get("explanation_pending"):
+            post_info["explanation_pending"] = True
+        if analysis_result.get("review_tier"):
+            post_info["review_tier"] = analysis_result["review_tier"]
+        if analysis_result.get("error"):
+            post_info["review_pending"] = True
+            post_info["review_error"] = _review_error(analysis_result)
 
         # Add confidence information if available
         if analysis_result.get("confidence") is not None:
             post_info["confidence"] = analysis_result.get("confidence")
             post_info["confidence_level"] = analysis_result.get("confidence_level", "unknown")
+        if analysis_result.get("raw_confidence") is not None:
+            post_info["raw_confidence"] = analysis_result["raw_confidence"]
 
         # Preserve existing override rules from current post storage
         post_id = post.get("id", "")
-        existing_post = self.todo_posts.get(post_id) or self.approved_posts.get(post_id)
+        existing_post = self.store.snapshot().get(post_id)
         if existing_post and "override_rules" in existing_post:
             post_info["override_rules"] = existing_post["override_rules"]
         elif post.get("override_rules"):
@@ -400,16 +726,44 @@ Please process this instruction specifically in the context of the above post.
         return post_info
 
     def get_posts_summary(self) -> Dict[str, Any]:
-        with self._lock:
-            return {
-                "approved_count": len(self.approved_posts),
-                "todo_count": len(self.todo_posts),
-                "selected_post_id": self.selected_post_id,
-                "selected_post_context": self.selected_post_context,
-                "approved_posts": list(self.approved_posts.values()),
-                "todo_posts": list(self.todo_posts.values()),
-                "tool_call_count": len(self.tool_call_history)
-            }
+        # Hands out the snapshot's shared tuples; nothing is copied and no writer is blocked
+        snapshot = self.store.snapshot()
+        return {
+            "version": snapshot.version,
+            "approved_count": snapshot.approved_count,
+            "todo_count": snapshot.todo_count,
+            "selected_post_id": self.selected_post_id,
+            "selected_post_context": self.selected_post_context,
+            "approved_posts": snapshot.approved_posts,
+            "todo_posts": snapshot.todo_posts,
+            "tool_call_count": self.tool_call_history.total
+        }
+
+    def _attach_process_monitors(self):
+        """Publish usage budget alerts and LLM circuit breaker transitions on this agent's bus"""
+        _attach_bus_monitors(self.event_bus)
+
+    def _detach_process_monitors(self):
+        _detach_bus_monitors(self.event_bus)
+
+    def close(self):
+        """Stop publishing process-wide events on this agent's bus and shut down its conversation workers"""
+        self._detach_process_monitors()
+        self.conversation_orchestrator.shutdown()
+
+    def get_usage_summary(self, top_posts: int = 10) -> Dict[str, Any]:
+        """Tokens and estimated cost of every LLM call in this process, by agent, model, subreddit, hour and post"""
+        return get_usage_tracker().summary(top_posts)
 
     def get_conversation_summary(self) -> Dict[str, Any]:
-        return self.conversation_orchestrator.get_conversation_summary()
+        summary = self.conversation_orchestrator.get_conversation_summary()
+        summary["tool_call_history"] = self.tool_call_history.stats()
+        with self._explanation_stats_lock:
+            summary["explanations"] = dict(self.explanation_stats)
+        summary["usage"] = get_usage_tracker().summary(top_posts=0)["totals"]
+        summary["call_policy"] = {"circuits": circuit_stats(), "parked_reviews": self.parked_count(),
+                                  "single_flight": get_single_flight().get_stats()}
+        summary["dispatch"] = get_dispatcher().get_stats()
+        if hasattr(self.post_agent, "get_tier_stats"):
+            summary["review_cascade"] = self.post_agent.get_tier_stats()
+        return summary
@@ -1,5 +1,7 @@
 from openai import OpenAI
 import json
+import re
+import threading
 from typing import Dict, Any, List, Optional
 from agents.base_agent import BaseAgent, EventBus
 
@@ -39,6 +41,121 @@ OVERRIDE_RULE_EXTRACTION_SYSTEM_PROMPT = (
     "Respond with JSON: {'override_rule': 'ignore rule_X for [condition]' or null}"
 )
 
+OVERRIDE_VERBS = (
+    r"ignore|override|overlook|disregard|suspend|skip|waive|exempt(?:\s+\w+)?\s+from|"
+    r"make\s+an\s+exception\s+(?:to|for)|(?:don'?t|do\s+not)\s+apply"
+)
+# "ignore rule 3", "override rule_3 for AMA posts", "don't apply rule #3 to this type of content"
+EXPLICIT_OVERRIDE = re.compile(
+    rf"\b(?:{OVERRIDE_VERBS})\s+(?:the\s+)?rule[\s_#]*(\d+)\b(?:\s+(?:for|on|to|in|when)\s+(?P<condition>.+))?"
+)
+# "ignore the rule about sources", "ignore the civility rule", "suspend the jokes rule for this post"
+KEYWORD_OVERRIDE = re.compile(
+    rf"\b(?:{OVERRIDE_VERBS})\s+(?:the\s+)?(?:rule\s+(?:about|on|against|regarding)\s+(?P<about>.+?)|(?P<named>[\w\s-]+?)\s+rule)"
+    rf"(?:\s+(?:for|on|to|in|when)\s+(?P<condition>.+))?$"
+)
+OVERRIDE_LANGUAGE = re.compile(rf"\b(?:{OVERRIDE_VERBS}|exception|lenient|allow|exempt)\b")
+RULE_NUMBER = re.compile(r"\brule[\s_#]*(\d+)\b")
+# Negated or conditional requests ("don't ignore rule 3", "should we ignore rule 3 if...") may mean the opposite
+# of the override they contain; like AMBIGUITY_MARKERS in local_intent_classifier, they go to the LLM
+NEGATION_MARKERS = {"not", "don't", "dont", "never", "no", "shouldn't", "should", "won't", "can't", "cannot",
+                    "doesn't", "isn't", "if", "unless", "maybe", "whether"}
+# The "don't apply rule X" override verb is the one negation that is itself an override
+_NEGATED_VERB = re.compile(r"\b(?:don'?t|do\s+not)\s+apply\b")
+EXISTING_RULE_ID = re.compile(r"\brule[\s_]*(\d+)\b", re.IGNORECASE)
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "be", "is", "are", "should", "must", "not", "no",
+    "by", "with", "all", "this", "that", "it", "its", "at", "as", "only", "more", "than", "about", "rule", "users",
+    "comments", "posts", "questions", "answers", "shall", "here", "which", "have", "at"
+}
+
+
+def _tokens(text: str) -> set:
+    words = re.findall(r"[a-z]+", text.lower())
+    # Crude plural folding so "jokes" matches "joke" and "sources" matches "source"
+    return {word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words if word not in STOPWORDS}
+
+
+class LocalOverrideRuleParser:
+    """Resolves the explicit override grammar without an LLM call; returns None from parse() for the fuzzy remainder"""
+
+    def __init__(self, min_keyword_score: int = 1, max_condition_words: int = 10):
+        self.min_keyword_score = min_keyword_score
+        self.max_condition_words = max_condition_words
+
+    def parse(self, user_instruction: str, rules: Optional[List[Dict[str, Any]]] = None,
+              existing_override_rules: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """{"override_rule": str or None, "reason": str} when resolved locally, None when the LLM should decide"""
+        original = " ".join(user_instruction.split()).rstrip(".!?")
+        text = original.lower()
+        # Conditions keep the user's casing ("AMA posts") when lowercasing didn't shift character offsets
+        source = original if len(original) == len(text) else text
+        if not OVERRIDE_LANGUAGE.search(text):
+            return {"override_rule": None, "reason": "no_override_language"}
+        if NEGATION_MARKERS.intersection(re.findall(r"[a-z']+", _NEGATED_VERB.sub(" ", text, count=1))):
+            return None
+
+        rule_numbers = set(RULE_NUMBER.findall(text))
+        if len(rule_numbers) > 1:
+            return None
+
+        explicit = EXPLICIT_OVERRIDE.search(text)
+        if explicit:
+            rule_id = f"rule_{explicit.group(1)}"
+            if rules and rule_id not in {rule.get("id") for rule in rules if isinstance(rule, dict)}:
+                return {"override_rule": None, "reason": "unknown_rule"}
+            return self._resolve(rule_id, self._span(source, explicit, "condition"), existing_override_rules)
+
+        keyword = KEYWORD_OVERRIDE.search(text)
+        if keyword and rules:
+            rule_id = self.match_rule(keyword.group("about") or keyword.group("named"), rules)
+            if rule_id:
+                return self._resolve(rule_id, self._span(source, keyword, "condition"), existing_override_rules)
+        return None
+
+    def match_rule(self, phrase: str, rules: List[Dict[str, Any]]) -> Optional[str]:
+        """Rule id whose name/description shares the most keywords with phrase, if the match is unambiguous"""
+        phrase_tokens = _tokens(phrase)
+        if not phrase_tokens:
+            return None
+
+        scores = []
+        for rule in rules:
+            if not isinstance(rule, dict):
+                continue
+            # Name matches count double; the description only breaks ties between similar names
+            name_tokens = _tokens(rule.get("short_name", "") or rule.get("name", ""))
+            description_tokens = _tokens(rule.get("description", "")[:300])
+            score = 2 * len(phrase_tokens & name_tokens) + len(phrase_tokens & description_tokens)
+            scores.append((score, rule.get("id")))
+
+        scores.sort(key=lambda item: item[0], reverse=True)
+        if not scores or scores[0][0] < self.min_keyword_score:
+            return None
+        if len(scores) > 1 and scores[1][0] == scores[0][0]:
+            return None
+        return scores[0][1]
+
+    @staticmethod
+    def _span(source: str, match, group: str) -> Optional[str]:
+        return source[match.start(group):match.end(group)] if match.group(group) else None
+
+    @staticmethod
+    def existing_rule_ids(existing_override_rules: Optional[List[str]]) -> set:
+        return {f"rule_{number}" for rule in existing_override_rules or [] for number in EXISTING_RULE_ID.findall(rule)}
+
+    def _resolve(self, rule_id: str, condition: Optional[str],
+                 existing_override_rules: Optional[List[str]]) -> Dict[str, Any]:
+        if rule_id in self.existing_rule_ids(existing_override_rules):
+            return {"override_rule": None, "reason": "duplicate"}
+
+        condition = (condition or "this post").strip()
+        condition = re.sub(r"\s*,?\s*(?:please|thanks|thank you)$", "", condition, flags=re.IGNORECASE) or "this post"
+        condition = " ".join(condition.split()[:self.max_condition_words])
+        return {"override_rule": f"ignore {rule_id} for {condition}", "reason": "parsed"}
+
+
 class OverrideRuleExtractionMCP:
     def __init__(self, user_instruction: str, post_context: Optional[Dict[str, Any]] = None,
                  rules: Optional[List[Dict[str, Any]]] = None,
@@ -85,9 +202,13 @@ class OverrideRuleExtractionMCP:
         ]
 
 class OverrideRuleExtractor(BaseAgent):
-    def __init__(self, model="gpt-4o-mini", temperature=0, event_bus: Optional[EventBus] = None):
+    def __init__(self, model="gpt-4o-mini", temperature=0, event_bus: Optional[EventBus] = None,
+                 local_parser: Optional[LocalOverrideRuleParser] = None):
         super().__init__(model, temperature, max_tokens=400)
         self.event_bus = event_bus
+        self.local_parser = local_parser or LocalOverrideRuleParser()
+        self.stats = {"local_resolved": 0, "local_duplicates": 0, "llm_calls": 0}
+        self._stats_lock = threading.Lock()
 
     def get_system_prompt(self) -> str:
         return OVERRIDE_RULE_EXTRACTION_SYSTEM_PROMPT
@@ -108,9 +229,21 @@ class OverrideRuleExtractor(BaseAgent):
         result = self._make_api_call(messages)
         return result
 
+    def needs_llm(self, user_instruction: str, rules: Optional[List[Dict[str, Any]]] = None,
+                  existing_override_rules: Optional[List[str]] = None) -> bool:
+        return self.local_parser.parse(user_instruction, rules, existing_override_rules) is None
+
     def extract(self, user_instruction: str, post_context: Optional[Dict[str, Any]] = None,
                 rules: Optional[List[Dict[str, Any]]] = None,
                 existing_override_rules: Optional[List[str]] = None) -> Optional[str]:
+        extracted_rule = self.extract_rule(user_instruction, post_context, rules, existing_override_rules)
+        self.publish_rule_extracted(extracted_rule, user_instruction, post_context, rules, existing_override_rules)
+        return extracted_rule
+
+    def extract_rule(self, user_instruction: str, post_context: Optional[Dict[str, Any]] = None,
+                     rules: Optional[List[Dict[str, Any]]] = None,
+                     existing_override_rules: Optional[List[str]] = None) -> Optional[str]:
+        """Extract without publishing, so speculative extractions that end up unused stay invisible"""
         data = {
             "user_instruction": user_instruction,
             "post_context": post_context or {},
@@ -118,21 +251,33 @@ class OverrideRuleExtractor(BaseAgent):
             "existing_override_rules": existing_override_rules or []
         }
 
-        result = self.process(data)
+        result = self.local_parser.parse(user_instruction, rules, existing_override_rules)
+        with self._stats_lock:
+            if result is None:
+                self.stats["llm_calls"] += 1
+            else:
+                self.stats["local_resolved"] += 1
+                self.stats["local_duplicates"] += 1 if result["reason"] == "duplicate" else 0
 
-        if "override_rule" in result:
-            extracted_rule = result["override_rule"]
+        if result is None:
+            result = self.process(data)
+            # The prompt asks the model to skip duplicates, but don't rely on it
+            extracted = result.get("override_rule")
+            if extracted and self.local_parser.existing_rule_ids([extracted]) & self.local_parser.existing_rule_ids(existing_override_rules):
+                result["override_rule"] = None
 
-            # Publish event when a rule is extracted
-            if self.event_bus and extracted_rule:
-                event_data = {
-                    "rule": extracted_rule,
-                    "user_instruction": user_instruction,
-                    "post_context": post_context,
-                    "rules": rules,
-                    "existing_override_rules": existing_override_rules
-                }
-                self.event_bus.publish("rule_extracted", event_data)
+        return result.get("override_rule")
 
-            return extracted_rule
-        return None
\ No newline at end of file
+    def publish_rule_extracted(self, extracted_rule: Optional[str], user_instruction: str,
+                               post_context: Optional[Dict[str, Any]] = None,
+                               rules: Optional[List[Dict[str, Any]]] = None,
+                               existing_override_rules: Optional[List[str]] = None):
+        if self.event_bus and extracted_rule:
+            event_data = {
+                "rule": extracted_rule,
+                "user_instruction": user_instruction,
+                "post_context": post_context,
+                "rules": rules,
+                "existing_override_rules": existing_override_rules
+            }
+            self.event_bus.publish("rule_extracted", event_data)
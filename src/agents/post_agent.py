@@ -1,12 +1,16 @@
 import json
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from dotenv import load_dotenv
 from openai import OpenAI
 from data import DataLoader
 from agents.base_agent import BaseAgent
-from agents.confidence_rule_agent import ConfidenceRuleAgent
+from agents.calibration import calibrator_from_env
+from agents.confidence_rule_agent import ConfidenceRuleAgent, MultiRuleConfidenceAgent
+from agents.usage import usage_context
+from tracing import span
 
 load_dotenv()
 
@@ -40,6 +44,70 @@ Respond with ONLY a JSON object containing:
 Be concise and decisive in your analysis. Do not mention override rules unless they were actually used in your decision.
 """
 
+# Verdict-only prompts for the two-tier hot path: no prose, so the output budget can be a handful of tokens
+POST_VERDICT_SYSTEM_PROMPT = """
+You are a Reddit Post Review Agent.
+You will be given post data including the post content and subreddit rules.
+
+Analyze the post against the applicable rules to determine if there are any violations.
+IMPORTANT: Pay attention to any override_rules provided. These take ABSOLUTE PRECEDENCE over regular subreddit rules. Do not make exceptions, the moderator had something on his mind adding the rule.
+
+Respond with ONLY a JSON object containing:
+- "violation": boolean indicating if any rules were violated
+- "rule_id": string ID of the violated rule (null if no violation, use override rule ID if applicable)
+
+Do not explain your decision.
+"""
+
+COMMENT_VERDICT_SYSTEM_PROMPT = """
+You are a Reddit Comment Review Agent.
+You will be given a comment along with the original post content and subreddit rules for context.
+
+Analyze the comment against the applicable rules to determine if there are any violations.
+IMPORTANT: Pay attention to any override_rules provided. These take ABSOLUTE PRECEDENCE over regular subreddit rules. Do not make exceptions, the moderator had something on his mind adding the rule.
+
+Respond with ONLY a JSON object containing:
+- "violation": boolean indicating if any rules were violated
+- "rule_id": string ID of the violated rule (null if no violation, use override rule ID if applicable)
+
+Do not explain your decision.
+"""
+
+EXPLANATION_SYSTEM_PROMPT = """
+You are a Reddit {target} Review Agent explaining a moderation decision that has already been made.
+You will be given the decision, the subreddit rules and the {target_lower} data.
+
+Do not change the decision. Respond with ONLY a JSON object containing:
+- "explanation": string explaining the violation or why no violation was found (only mention override rules if they were actually applied)
+
+Be concise.
+"""
+
+# "two_tier" reviews return only the verdict and explain on demand; "full" asks for the explanation on every review.
+# Agents default to full so batch and CLI output keeps its explanations; the moderation UI opts into two_tier
+REVIEW_MODE_ENV = "MOD_AGENT_REVIEW_MODE"
+REVIEW_MODES = ("two_tier", "full")
+
+
+def moderation_review_mode() -> str:
+    """Review mode for the moderation UI's background and auto reviews, whose explanations are generated when a
+    moderator looks at the post: two_tier unless MOD_AGENT_REVIEW_MODE says otherwise"""
+    return os.getenv(REVIEW_MODE_ENV, "two_tier")
+
+# "rule" scores a violation with one Y/N call for the violated rule; "distribution" reads the violated rule's
+# probability from one call that scores every rule at once
+CONFIDENCE_MODE_ENV = "MOD_AGENT_CONFIDENCE_MODE"
+CONFIDENCE_MODES = ("rule", "distribution")
+
+
+def confidence_level_for(confidence: float) -> str:
+    if confidence >= 0.8:
+        return "high"
+    elif confidence >= 0.6:
+        return "medium"
+    return "low"
+
+
 class MCPEnvelope:
     def __init__(self, post, subreddit, rules, review_target="post", target_comment=None, comments=None, override_rules=None):
         self.data = {
@@ -93,14 +161,29 @@ class MCPEnvelope:
         return self.data
 
 class BaseReviewAgent(BaseAgent):
-    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500):
+    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500, review_mode: Optional[str] = None,
+                 verdict_max_tokens: int = 24, confidence_mode: Optional[str] = None):
         super().__init__(model, temperature, max_tokens)
         self.confidence_agent = ConfidenceRuleAgent()
+        self.review_mode = review_mode or os.getenv(REVIEW_MODE_ENV, "full")
+        if self.review_mode not in REVIEW_MODES:
+            raise ValueError(f"Unknown review mode '{self.review_mode}', expected one of {REVIEW_MODES}")
+        self.verdict_max_tokens = verdict_max_tokens
+        self.confidence_mode = confidence_mode or os.getenv(CONFIDENCE_MODE_ENV, "rule")
+        if self.confidence_mode not in CONFIDENCE_MODES:
+            raise ValueError(f"Unknown confidence mode '{self.confidence_mode}', expected one of {CONFIDENCE_MODES}")
+        self.rule_distribution_agent = MultiRuleConfidenceAgent() if self.confidence_mode == "distribution" else None
+        # Fitted against moderator decisions (see calibrate.py); None keeps the raw score and fixed cutoffs
+        self.calibrator = calibrator_from_env()
 
     @abstractmethod
     def get_analysis_type(self) -> str:
         pass
 
+    @abstractmethod
+    def get_verdict_prompt(self) -> str:
+        pass
+
     def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         if isinstance(data, MCPEnvelope):
             return self.review(data)
@@ -136,16 +219,37 @@ class BaseReviewAgent(BaseAgent):
             "error": True
         }
 
+    @staticmethod
+    def _target_content(mcp_envelope: MCPEnvelope) -> str:
+        # Extract the target content based on review type
+        if mcp_envelope.data.get("review_target") == "comment":
+            return mcp_envelope.data.get("target_comment", {}).get("body", "")
+        # For posts, combine title and body
+        post_title = mcp_envelope.data.get("post", {}).get("title", "")
+        post_body = mcp_envelope.data.get("post", {}).get("body", "")
+        return f"{post_title}\n\n{post_body}".strip()
+
+    def rule_distribution(self, mcp_envelope: MCPEnvelope, agent: Optional[MultiRuleConfidenceAgent] = None) -> Optional[Dict[str, Any]]:
+        """Probability of each subreddit rule (and "none") for the target from one 1-token call, None on failure"""
+        if agent is None:
+            if self.rule_distribution_agent is None:
+                self.rule_distribution_agent = MultiRuleConfidenceAgent(model=self.confidence_agent.model)
+            agent = self.rule_distribution_agent
+        target_content = self._target_content(mcp_envelope)
+        if not target_content:
+            return None
+        result = agent.process({"rules": mcp_envelope.data.get("rules", []), "target": target_content})
+        return None if result.get("error") else result
+
     def _calculate_confidence_score(self, mcp_envelope: MCPEnvelope, rule_id: str) -> float:
         try:
-            # Extract the target content based on review type
-            if mcp_envelope.data.get("review_target") == "comment":
-                target_content = mcp_envelope.data.get("target_comment", {}).get("body", "")
-            else:
-                # For posts, combine title and body
-                post_title = mcp_envelope.data.get("post", {}).get("title", "")
-                post_body = mcp_envelope.data.get("post", {}).get("body", "")
-                target_content = f"{post_title}\n\n{post_body}".strip()
+            target_content = self._target_content(mcp_envelope)
+
+            if self.confidence_mode == "distribution":
+                distribution = self.rule_distribution(mcp_envelope)
+                # Override rules aren't in the distribution; those fall through to the Y/N question
+                if distribution and rule_id in distribution["distribution"]:
+                    return distribution["distribution"][rule_id]
 
             # Find the specific rule that was violated
             rule_text = self._get_rule_text(mcp_envelope.data.get("rules", []), rule_id)
@@ -192,49 +296,93 @@ class BaseReviewAgent(BaseAgent):
                 return rule.get("rule_content", "")
         return ""
 
-    def review(self, mcp_envelope: MCPEnvelope) -> dict:
+    def review(self, mcp_envelope: MCPEnvelope, explain: Optional[bool] = None) -> dict:
+        """Review the envelope; explain=None follows review_mode, False returns the verdict with explanation pending"""
+        if explain is None:
+            explain = self.review_mode == "full"
+        post_id = mcp_envelope.data["post"].get("id", "")
+        with span("review", agent=type(self).__name__, post_id=post_id, explain=explain) as review_span, \
+                usage_context(subreddit=mcp_envelope.data.get("subreddit"), post_id=post_id):
+            result = self._review(mcp_envelope, explain)
+            review_span.set(violation=bool(result.get("violation")), error=bool(result.get("error")))
+            return result
+
+    def _review(self, mcp_envelope: MCPEnvelope, explain: bool = True) -> dict:
         try:
             messages = [
-                {"role": "system", "content": self.get_system_prompt()},
+                {"role": "system", "content": self.get_system_prompt() if explain else self.get_verdict_prompt()},
                 {"role": "user", "content": f"Analyze this {self.get_analysis_type()} data:\n\n{mcp_envelope.to_json()}"}
             ]
-            result = self._make_api_call(messages)
+            if explain:
+                result = self._make_api_call(messages)
+            else:
+                result = self._make_api_call(messages, max_tokens=self.verdict_max_tokens)
+                if not result.get("error"):
+                    result["explanation"] = None
+                    result["explanation_pending"] = True
 
             # Add confidence score if there's a violation
             if result.get("violation") and result.get("rule_id"):
                 confidence_score = self._calculate_confidence_score(mcp_envelope, result["rule_id"])
-                result["confidence"] = confidence_score
-
-                # Add confidence interpretation
-                if confidence_score >= 0.8:
-                    result["confidence_level"] = "high"
-                elif confidence_score >= 0.6:
-                    result["confidence_level"] = "medium"
+                if self.calibrator is not None:
+                    result["raw_confidence"] = confidence_score
+                    result["confidence"] = self.calibrator.calibrate(result["rule_id"], confidence_score)
+                    result["confidence_level"] = self.calibrator.level(result["rule_id"], result["confidence"])
                 else:
-                    result["confidence_level"] = "low"
+                    result["confidence"] = confidence_score
+                    # Add confidence interpretation
+                    result["confidence_level"] = confidence_level_for(confidence_score)
 
             return result
 
         except Exception as e:
             return self._handle_error(e)
 
+    def explain(self, mcp_envelope: MCPEnvelope, verdict: Dict[str, Any]) -> Optional[str]:
+        """Prose explanation for a verdict made earlier by a verdict-only review; None if the call fails"""
+        post_id = mcp_envelope.data["post"].get("id", "")
+        with span("review.explain", agent=type(self).__name__, post_id=post_id), \
+                usage_context(subreddit=mcp_envelope.data.get("subreddit"), post_id=post_id):
+            target = self.get_analysis_type()
+            if verdict.get("violation"):
+                decision = f"violation of {verdict.get('rule_id')}"
+            else:
+                decision = "no violation"
+            messages = [
+                {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT.format(target=target.title(), target_lower=target)},
+                # The envelope goes last so the data block is the only JSON in the message
+                {"role": "user", "content": f"Decision: {decision}\n\nExplain this decision for the {target} data:\n\n{mcp_envelope.to_json()}"}
+            ]
+            result = self._make_api_call(messages)
+            if result.get("error"):
+                return None
+            return result.get("explanation")
+
 class PostSpecificAgent(BaseReviewAgent):
-    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500):
-        super().__init__(model, temperature, max_tokens)
+    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500, review_mode: Optional[str] = None,
+                 confidence_mode: Optional[str] = None):
+        super().__init__(model, temperature, max_tokens, review_mode, confidence_mode=confidence_mode)
 
     def get_system_prompt(self) -> str:
         return POST_SYSTEM_PROMPT
 
+    def get_verdict_prompt(self) -> str:
+        return POST_VERDICT_SYSTEM_PROMPT
+
     def get_analysis_type(self) -> str:
         return "post"
 
 class CommentSpecificAgent(BaseReviewAgent):
-    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500):
-        super().__init__(model, temperature, max_tokens)
+    def __init__(self, model="gpt-4o-mini", temperature=0, max_tokens=500, review_mode: Optional[str] = None,
+                 confidence_mode: Optional[str] = None):
+        super().__init__(model, temperature, max_tokens, review_mode, confidence_mode=confidence_mode)
 
     def get_system_prompt(self) -> str:
         return COMMENT_SYSTEM_PROMPT
 
+    def get_verdict_prompt(self) -> str:
+        return COMMENT_VERDICT_SYSTEM_PROMPT
+
     def get_analysis_type(self) -> str:
         return "comment"
 
@@ -0,0 +1,204 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+
+class PostSnapshot:
+    """Immutable view of the verdict store at one version. Readers hold on to it without any lock;
+    post dicts inside are never mutated after they are committed"""
+
+    __slots__ = ("version", "approved", "todo", "_approved_list", "_todo_list", "_index")
+
+    def __init__(self, version: int, approved: Dict[str, Dict[str, Any]], todo: Dict[str, Dict[str, Any]]):
+        self.version = version
+        self.approved = MappingProxyType(approved)
+        self.todo = MappingProxyType(todo)
+        self._approved_list: Optional[Tuple[Dict[str, Any], ...]] = None
+        self._todo_list: Optional[Tuple[Dict[str, Any], ...]] = None
+        self._index: Optional[Dict[Tuple[str, Optional[str]], Tuple[List[float], List[Dict[str, Any]]]]] = None
+
+    @property
+    def approved_count(self) -> int:
+        return len(self.approved)
+
+    @property
+    def todo_count(self) -> int:
+        return len(self.todo)
+
+    @property
+    def approved_posts(self) -> Tuple[Dict[str, Any], ...]:
+        # Built once per version and shared by every reader of that version
+        if self._approved_list is None:
+            self._approved_list = tuple(self.approved.values())
+        return self._approved_list
+
+    @property
+    def todo_posts(self) -> Tuple[Dict[str, Any], ...]:
+        if self._todo_list is None:
+            self._todo_list = tuple(self.todo.values())
+        return self._todo_list
+
+    def get(self, post_id: str) -> Optional[Dict[str, Any]]:
+        return self.todo.get(post_id) or self.approved.get(post_id)
+
+    def status(self, post_id: str) -> Optional[str]:
+        if post_id in self.todo:
+            return "flagged"
+        if post_id in self.approved:
+            return "approved"
+        return None
+
+    def _rule_index(self) -> Dict[Tuple[str, Optional[str]], Tuple[List[float], List[Dict[str, Any]]]]:
+        # (status, rule_id) -> posts sorted by confidence, with the confidences alongside for bisecting.
+        # rule_id None holds every post of that status. Built once per version, like the post tuples
+        if self._index is None:
+            buckets: Dict[Tuple[str, Optional[str]], List[Tuple[float, int, Dict[str, Any]]]] = {}
+            for status, posts in (("flagged", self.todo), ("approved", self.approved)):
+                for position, post in enumerate(posts.values()):
+                    confidence = post.get("confidence")
+                    entry = (float(confidence) if confidence is not None else -1.0, position, post)
+                    buckets.setdefault((status, None), []).append(entry)
+                    if post.get("rule_id"):
+                        buckets.setdefault((status, post["rule_id"]), []).append(entry)
+            index = {}
+            for key, entries in buckets.items():
+                entries.sort(key=lambda entry: entry[:2])
+                index[key] = ([entry[0] for entry in entries], [entry[2] for entry in entries])
+            self._index = index
+        return self._index
+
+    def query(self, status: str = "flagged", rule_id: Optional[str] = None,
+              min_confidence: Optional[float] = None, max_confidence: Optional[float] = None,
+              confidence_level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Posts of one status, optionally narrowed to a rule and a confidence range (min inclusive, max exclusive).
+        Posts without a confidence score never match a confidence filter"""
+        confidences, posts = self._rule_index().get((status, rule_id), ([], []))
+        scored = min_confidence is not None or max_confidence is not None
+        start = bisect.bisect_left(confidences, min_confidence if min_confidence is not None else (0.0 if scored else -1.0))
+        end = bisect.bisect_left(confidences, max_confidence) if max_confidence is not None else len(posts)
+        matches = posts[start:end]
+        if confidence_level:
+            matches = [post for post in matches if post.get("confidence_level") == confidence_level]
+        return matches
+
+
+class PostTransaction:
+    """Mutations staged against a snapshot; each side is copied at most once, on its first write"""
+
+    def __init__(self, base: PostSnapshot):
+        self.base = base
+        self._approved: Optional[Dict[str, Dict[str, Any]]] = None
+        self._todo: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def approved(self):
+        return self._approved if self._approved is not None else self.base.approved
+
+    @property
+    def todo(self):
+        return self._todo if self._todo is not None else self.base.todo
+
+    @property
+    def changed(self) -> bool:
+        return self._approved is not None or self._todo is not None
+
+    def _writable_approved(self) -> Dict[str, Dict[str, Any]]:
+        if self._approved is None:
+            self._approved = dict(self.base.approved)
+        return self._approved
+
+    def _writable_todo(self) -> Dict[str, Dict[str, Any]]:
+        if self._todo is None:
+            self._todo = dict(self.base.todo)
+        return self._todo
+
+    def get(self, post_id: str) -> Optional[Dict[str, Any]]:
+        return self.todo.get(post_id) or self.approved.get(post_id)
+
+    def put_approved(self, post: Dict[str, Any]):
+        """Store a post as approved, removing it from todo"""
+        if post["id"] in self.todo:
+            self._writable_todo().pop(post["id"])
+        self._writable_approved()[post["id"]] = post
+
+    def put_flagged(self, post: Dict[str, Any]):
+        """Store a post as needing attention, removing it from approved"""
+        if post["id"] in self.approved:
+            self._writable_approved().pop(post["id"])
+        self._writable_todo()[post["id"]] = post
+
+    def approve(self, post_id: str) -> bool:
+        """Move a todo post to approved as-is"""
+        if post_id not in self.todo:
+            return False
+        self._writable_approved()[post_id] = self._writable_todo().pop(post_id)
+        return True
+
+    def remove(self, post_id: str) -> Optional[Dict[str, Any]]:
+        if post_id in self.todo:
+            return self._writable_todo().pop(post_id)
+        if post_id in self.approved:
+            return self._writable_approved().pop(post_id)
+        return None
+
+    def update_post(self, post_id: str, **fields) -> bool:
+        """Replace a post with a copy carrying `fields`; committed post dicts are never edited in place"""
+        if post_id in self.todo:
+            self._writable_todo()[post_id] = {**self.todo[post_id], **fields}
+            return True
+        if post_id in self.approved:
+            self._writable_approved()[post_id] = {**self.approved[post_id], **fields}
+            return True
+        return False
+
+
+class PostStore:
+    """Copy-on-write verdict store. Writers serialize on one lock and publish a new snapshot per transaction;
+    readers take the current snapshot with a plain attribute read and never block"""
+
+    def __init__(self):
+        self._snapshot = PostSnapshot(0, {}, {})
+        self._write_lock = threading.RLock()
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def snapshot(self) -> PostSnapshot:
+        return self._snapshot
+
+    @contextmanager
+    def transaction(self) -> Iterator[PostTransaction]:
+        """Group several writes into one copy and one new version"""
+        with self._write_lock:
+            txn = PostTransaction(self._snapshot)
+            yield txn
+            if txn.changed:
+                base = self._snapshot
+                self._snapshot = PostSnapshot(
+                    base.version + 1,
+                    txn._approved if txn._approved is not None else dict(base.approved),
+                    txn._todo if txn._todo is not None else dict(base.todo)
+                )
+
+    def put_approved(self, post: Dict[str, Any]):
+        with self.transaction() as txn:
+            txn.put_approved(post)
+
+    def put_flagged(self, post: Dict[str, Any]):
+        with self.transaction() as txn:
+            txn.put_flagged(post)
+
+    def approve(self, post_id: str) -> bool:
+        with self.transaction() as txn:
+            return txn.approve(post_id)
+
+    def remove(self, post_id: str) -> Optional[Dict[str, Any]]:
+        with self.transaction() as txn:
+            return txn.remove(post_id)
+
+    def update_post(self, post_id: str, **fields) -> bool:
+        with self.transaction() as txn:
+            return txn.update_post(post_id, **fields)
@@ -0,0 +1,100 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Any, Optional
+
+from openai.types.chat import ChatCompletion
+
+_cache_scope: contextvars.ContextVar = contextvars.ContextVar("cache_scope", default=None)
+
+# Client-side request options that never change the response
+REQUEST_OPTIONS = ("timeout",)
+
+
+def request_fingerprint(kwargs: Dict[str, Any]) -> str:
+    """Stable key for a chat completion request: every argument that can change the response"""
+    request = {key: value for key, value in kwargs.items() if key not in REQUEST_OPTIONS}
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def cache_scope():
+    """Cache hits and misses of requests made in this context inside the block"""
+    counts = {"hits": 0, "misses": 0}
+    token = _cache_scope.set(counts)
+    try:
+        yield counts
+    finally:
+        _cache_scope.reset(token)
+
+
+class ResponseCache:
+    """Chat completion responses by request fingerprint, optionally persisted as JSONL so later runs reuse them"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry["response"]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            response = self.entries.get(key)
+            self.stats["hits" if response is not None else "misses"] += 1
+        counts = _cache_scope.get()
+        if counts is not None:
+            counts["hits" if response is not None else "misses"] += 1
+        return response
+
+    def put(self, key: str, response: Dict[str, Any]):
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = response
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"key": key, "response": response}) + "\n")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+class _CachingCompletions:
+    def __init__(self, inner, cache: ResponseCache):
+        self.inner = inner
+        self.cache = cache
+
+    def create(self, **kwargs) -> ChatCompletion:
+        key = request_fingerprint(kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate(cached)
+        # Errors propagate uncached so a retry can still succeed
+        response = self.inner.chat.completions.create(**kwargs)
+        self.cache.put(key, response.model_dump(mode="json"))
+        return response
+
+
+class CachingClient:
+    """Wraps any chat-completions client; identical requests are answered from the cache"""
+
+    def __init__(self, inner, cache: ResponseCache):
+        self.inner = inner
+        self.chat = SimpleNamespace(completions=_CachingCompletions(inner, cache))
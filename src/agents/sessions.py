@@ -0,0 +1,200 @@
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from agents.base_agent import EventBus
+from agents.meta_agent import MetaChatAgent
+
+# Events about one moderator's selection and conversation; everything else concerns the shared verdict store
+SESSION_EVENTS = {"post_selected", "post_deselected", "conversation_turn", "rule_extracted", "post_claim_denied"}
+
+
+class PostLeaseTable:
+    """Per-post claims with expiry so two sessions never work the same todo item"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._leases: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, post_id: str, session_id: str, ttl: Optional[float] = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(post_id)
+            if lease and lease["session_id"] != session_id and lease["expires_at"] > now:
+                return False
+            self._leases[post_id] = {"session_id": session_id, "expires_at": now + (ttl or self.ttl)}
+            return True
+
+    def renew(self, post_id: str, session_id: str, ttl: Optional[float] = None) -> bool:
+        """Extend a lease this session still holds; an expired lease nobody else took can be renewed"""
+        return self.claim(post_id, session_id, ttl)
+
+    def release(self, post_id: str, session_id: str) -> bool:
+        with self._lock:
+            lease = self._leases.get(post_id)
+            if lease and lease["session_id"] == session_id:
+                del self._leases[post_id]
+                return True
+            return False
+
+    def release_all(self, session_id: str) -> List[str]:
+        with self._lock:
+            released = [post_id for post_id, lease in self._leases.items() if lease["session_id"] == session_id]
+            for post_id in released:
+                del self._leases[post_id]
+            return released
+
+    def holder(self, post_id: str) -> Optional[str]:
+        with self._lock:
+            lease = self._leases.get(post_id)
+            if lease and lease["expires_at"] > time.monotonic():
+                return lease["session_id"]
+            return None
+
+    def active(self) -> Dict[str, str]:
+        now = time.monotonic()
+        with self._lock:
+            return {post_id: lease["session_id"] for post_id, lease in self._leases.items() if lease["expires_at"] > now}
+
+
+class SessionEventBus(EventBus):
+    """Delivers session events to this session's subscribers only and forwards the rest to the shared bus"""
+
+    def __init__(self, session_id: str, shared_bus: EventBus):
+        super().__init__()
+        self.session_id = session_id
+        self.shared_bus = shared_bus
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        super().publish(event_type, data)
+        if event_type not in SESSION_EVENTS:
+            self.shared_bus.publish(event_type, dict(data, session_id=self.session_id))
+
+
+class ModeratorSession(MetaChatAgent):
+    """One moderator's selection, conversation and override rules over the hub's shared verdict store"""
+
+    def __init__(self, session_id: str, hub: MetaChatAgent, leases: PostLeaseTable):
+        # Share the hub's verdict store; selection, _lock and the audit spill files stay per session
+        super().__init__(
+            hub.post_agent,
+            hub.override_rule_extractor,
+            event_bus=SessionEventBus(session_id, hub.event_bus),
+            review_workers=hub.review_workers,
+            shared=hub,
+            spill_tag=session_id
+        )
+        self.session_id = session_id
+        self.hub = hub
+        self.leases = leases
+        self.created_at = time.time()
+        self.last_active = self.created_at
+
+    def _attach_process_monitors(self):
+        # Usage and circuits are process-wide; their events go to the hub's bus once, not once per session
+        pass
+
+    def _detach_process_monitors(self):
+        pass
+
+    def _needs_lease(self, post_id: str) -> bool:
+        return post_id in self.store.snapshot().todo
+
+    def select_post(self, post_id: str) -> bool:
+        """Select (or deselect) a post; returns False when another session holds the todo item"""
+        if post_id != self.selected_post_id:
+            if self._needs_lease(post_id) and not self.leases.claim(post_id, self.session_id):
+                self.event_bus.publish("post_claim_denied", {
+                    "post_id": post_id,
+                    "holder": self.leases.holder(post_id)
+                })
+                return False
+            # Explaining can take an LLM round-trip; claim first so it is never spent on another session's
+            # post, and do it before taking the selection lock
+            self.ensure_explanation(post_id)
+
+        with self._lock:
+            previous = self.selected_post_id
+            self._toggle_selection(post_id)
+            if previous and previous != self.selected_post_id:
+                self.leases.release(previous, self.session_id)
+        return True
+
+    def _bulk_eligible(self, post_ids: List[str]) -> List[str]:
+        holders = self.leases.active()
+        return [post_id for post_id in super()._bulk_eligible(post_ids)
+                if holders.get(post_id, self.session_id) == self.session_id]
+
+    def interact(self, user_instruction: str, data_loader) -> Dict[str, Any]:
+        self.last_active = time.time()
+        selected = self.selected_post_id
+        if selected and self._needs_lease(selected) and not self.leases.renew(selected, self.session_id):
+            # The lease expired while idle and another moderator claimed the post
+            with self._lock:
+                self.selected_post_id = None
+                self.selected_post_context = None
+            self.event_bus.publish("post_deselected", {"post_id": selected})
+            return {"message": f"Post {selected} is now being handled by another moderator.", "type": "error"}
+
+        result = super().interact(user_instruction, data_loader)
+
+        # Approve/reject/re-review can clear the selection; free the post for other sessions
+        if selected and self.selected_post_id != selected:
+            self.leases.release(selected, self.session_id)
+        return result
+
+    def close(self):
+        self.leases.release_all(self.session_id)
+        super().close()
+
+
+class SessionManager:
+    """Creates moderator sessions that share one MetaChatAgent's verdict store"""
+
+    def __init__(self, hub: MetaChatAgent, lease_ttl: float = 300.0, idle_timeout: float = 3600.0):
+        self.hub = hub
+        self.leases = PostLeaseTable(ttl=lease_ttl)
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, ModeratorSession] = {}
+        self._lock = threading.Lock()
+
+    def create_session(self, session_id: Optional[str] = None) -> ModeratorSession:
+        session_id = session_id or uuid.uuid4().hex[:12]
+        with self._lock:
+            if session_id in self._sessions:
+                raise ValueError(f"Session '{session_id}' already exists")
+            session = ModeratorSession(session_id, self.hub, self.leases)
+            self._sessions[session_id] = session
+        self.hub.event_bus.publish("session_opened", {"session_id": session_id})
+        return session
+
+    def get(self, session_id: str) -> Optional[ModeratorSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close_session(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session:
+            session.close()
+            self.hub.event_bus.publish("session_closed", {"session_id": session_id})
+
+    def close_idle(self) -> List[str]:
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            idle = [session_id for session_id, session in self._sessions.items() if session.last_active < cutoff]
+        for session_id in idle:
+            self.close_session(session_id)
+        return idle
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [{
+            "session_id": session.session_id,
+            "selected_post_id": session.selected_post_id,
+            "created_at": session.created_at,
+            "last_active": session.last_active
+        } for session in sessions]
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Tuple
+
+# Set to "0" to send identical concurrent chat completions separately
+SINGLE_FLIGHT_ENV = "MOD_AGENT_SINGLE_FLIGHT"
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: the first caller runs the call, callers arriving while it
+    is in flight wait for it and get the same result (or exception). Nothing is kept once the call finishes.
+
+    rank orders callers by priority (lower is more urgent, e.g. a dispatch lane's index). A caller only joins a
+    flight led at its own rank or a more urgent one; a more urgent caller leads a flight of its own instead of
+    queueing behind a background request, and later callers join that one"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[str, Tuple[Future, int]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0, "shared_errors": 0, "outranked": 0}
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        return cls(enabled=os.getenv(SINGLE_FLIGHT_ENV, "1") != "0")
+
+    def _join(self, key: str, rank: int) -> Tuple[Future, bool]:
+        """The flight for key and whether the caller leads it"""
+        with self._lock:
+            self.stats["calls"] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                future, flight_rank = flight
+                if flight_rank <= rank:
+                    self.stats["coalesced"] += 1
+                    return future, False
+                self.stats["outranked"] += 1
+            future = Future()
+            self._flights[key] = (future, rank)
+            self.stats["executed"] += 1
+            return future, True
+
+    def _land(self, key: str, future: Future, call: Callable[[], Any]):
+        try:
+            result = call()
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+            raise
+        self._finish(key, future)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: str, future: Future):
+        # Removed before waiters are released so a call starting after this one lands gets a fresh request. A more
+        # urgent flight may have replaced this one under the same key; that one stays
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight[0] is future:
+                del self._flights[key]
+
+    def _shared(self, future: Future) -> Any:
+        try:
+            return future.result()
+        except BaseException:
+            with self._lock:
+                self.stats["shared_errors"] += 1
+            raise
+
+    def do(self, key: str, call: Callable[[], Any], rank: int = 0) -> Tuple[Any, bool]:
+        """(result, shared): shared is True when the result came from another caller's request"""
+        if not self.enabled:
+            return call(), False
+        future, leader = self._join(key, rank)
+        if leader:
+            return self._land(key, future, call), False
+        return self._shared(future), True
+
+    async def do_async(self, key: str, call: Callable[[], Any], rank: int = 0) -> Tuple[Any, bool]:
+        """do() for coroutines: the blocking call runs on the loop's executor and shares flights with threads"""
+        loop = asyncio.get_running_loop()
+        if not self.enabled:
+            return await loop.run_in_executor(None, call), False
+        future, leader = self._join(key, rank)
+        if leader:
+            return await loop.run_in_executor(None, self._land, key, future, call), False
+        try:
+            return await asyncio.wrap_future(future), True
+        except BaseException:
+            with self._lock:
+                self.stats["shared_errors"] += 1
+            raise
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, in_flight=len(self._flights))
+        stats["coalesced_rate"] = round(stats["coalesced"] / stats["calls"], 3) if stats["calls"] else 0.0
+        return stats
+
+
+_single_flight = SingleFlight.from_env()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
+
+
+def set_single_flight(single_flight: SingleFlight):
+    global _single_flight
+    _single_flight = single_flight
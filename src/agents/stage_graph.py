@@ -0,0 +1,172 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterable, Optional
+
+from tracing import span
+
+
+class StageCancelled(Exception):
+    pass
+
+
+class StageContext:
+    """Handed to every stage so long-running work can check for cancellation and read upstream results"""
+
+    def __init__(self, graph: "StageGraph", name: str):
+        self.graph = graph
+        self.name = name
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def dependency(self, name: str) -> Any:
+        return self.graph.result(name)
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[[StageContext], Any], depends_on: Iterable[str] = (),
+                 speculative: bool = False):
+        self.name = name
+        self.fn = fn
+        self.depends_on = list(depends_on)
+        self.speculative = speculative
+        self.future: Optional[Future] = None
+        self.context: Optional[StageContext] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.status = "pending"
+        self.consumed = False
+
+
+class StageGraph:
+    """Runs independent stages of one message concurrently; dependents start as soon as their inputs finish"""
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+        self.stages: Dict[str, Stage] = {}
+        self.created_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.stages
+
+    def add_stage(self, name: str, fn: Callable[[StageContext], Any], depends_on: Iterable[str] = (),
+                  speculative: bool = False) -> "StageGraph":
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists")
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = Stage(name, fn, depends_on, speculative)
+        if self._started:
+            self._submit_ready()
+        return self
+
+    def start(self) -> "StageGraph":
+        self._started = True
+        self._submit_ready()
+        return self
+
+    def _submit_ready(self):
+        with self._lock:
+            for stage in self.stages.values():
+                if stage.status != "pending":
+                    continue
+                dependencies = [self.stages[name] for name in stage.depends_on]
+                if any(dep.status == "cancelled" for dep in dependencies):
+                    stage.status = "cancelled"
+                    continue
+                if all(dep.status == "done" for dep in dependencies):
+                    self._submit(stage)
+
+    def _submit(self, stage: Stage):
+        stage.status = "running"
+        stage.context = StageContext(self, stage.name)
+        # Each stage runs in a copy of the submitting context so context-local state (e.g. tracing) follows it
+        context = contextvars.copy_context()
+        stage.future = self.executor.submit(context.run, self._run_stage, stage)
+
+    def _run_stage(self, stage: Stage) -> Any:
+        stage.started_at = time.perf_counter()
+        try:
+            if stage.context.cancelled:
+                raise StageCancelled(stage.name)
+            with span(f"stage.{stage.name}", speculative=stage.speculative):
+                return stage.fn(stage.context)
+        finally:
+            stage.finished_at = time.perf_counter()
+            with self._lock:
+                if stage.status == "running":
+                    stage.status = "done"
+            self._submit_ready()
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        stage = self.stages[name]
+        if stage.status == "pending" and not self._started:
+            self.start()
+
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        while stage.future is None:
+            # Dependencies of this stage are still running; wait on them first
+            if stage.status == "cancelled":
+                raise StageCancelled(name)
+            for dependency in stage.depends_on:
+                remaining = deadline - time.perf_counter() if deadline is not None else None
+                self.result(dependency, remaining)
+            self._submit_ready()
+
+        if stage.status == "cancelled":
+            raise StageCancelled(name)
+        remaining = max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+        return stage.future.result(remaining)
+
+    def take(self, name: str, timeout: Optional[float] = None) -> Any:
+        """result() for a speculative stage, marking it as used"""
+        value = self.result(name, timeout)
+        self.stages[name].consumed = True
+        return value
+
+    def overlap_ms(self, first: str, second: str) -> float:
+        a, b = self.stages[first], self.stages[second]
+        if None in (a.started_at, a.finished_at, b.started_at, b.finished_at):
+            return 0.0
+        return max(0.0, min(a.finished_at, b.finished_at) - max(a.started_at, b.started_at)) * 1000
+
+    def cancel(self, name: str):
+        """Drop a stage whose result is no longer needed; work already in flight finishes but is discarded"""
+        stage = self.stages.get(name)
+        if stage is None:
+            return
+        with self._lock:
+            if stage.status in ("done", "cancelled"):
+                return
+            stage.status = "cancelled"
+            if stage.context:
+                stage.context.cancel_event.set()
+            if stage.future:
+                stage.future.cancel()
+        for other in self.stages.values():
+            if name in other.depends_on:
+                self.cancel(other.name)
+
+    def cancel_all(self):
+        for name in list(self.stages):
+            self.cancel(name)
+
+    def timings(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage offsets in ms from graph creation, for comparing the critical path against the sum of stages"""
+        timings = {}
+        for stage in self.stages.values():
+            entry = {"status": stage.status, "speculative": stage.speculative, "consumed": stage.consumed}
+            if stage.started_at is not None:
+                entry["start_ms"] = round((stage.started_at - self.created_at) * 1000, 2)
+            if stage.finished_at is not None:
+                entry["end_ms"] = round((stage.finished_at - self.created_at) * 1000, 2)
+                entry["duration_ms"] = round((stage.finished_at - stage.started_at) * 1000, 2)
+            timings[stage.name] = entry
+        return timings
@@ -0,0 +1,10 @@
+import math
+from typing import List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list; 0.0 when it is empty"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(len(sorted_values) - 1, rank)]
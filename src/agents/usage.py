@@ -0,0 +1,278 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Dict, Any, List, Optional
+
+from checkpoint import save_checkpoint
+
+# Comma separated limits, e.g. "hourly_usd=0.5,daily_usd=5,hourly_tokens=200000"; 0 disables a limit
+USAGE_BUDGET_ENV = "MOD_AGENT_USAGE_BUDGET"
+# JSON file rewritten with the usage summary every MOD_AGENT_USAGE_DUMP_INTERVAL seconds (default 60)
+USAGE_DUMP_ENV = "MOD_AGENT_USAGE_DUMP"
+USAGE_DUMP_INTERVAL_ENV = "MOD_AGENT_USAGE_DUMP_INTERVAL"
+
+DIMENSIONS = ("agent", "model", "subreddit", "hour")
+
+_usage_context: contextvars.ContextVar = contextvars.ContextVar("usage_context", default={})
+
+
+@contextmanager
+def usage_context(**attrs):
+    """Attribute chat completions made inside the block to a subreddit and/or post; nests over the outer context"""
+    token = _usage_context.set({**_usage_context.get(), **{k: v for k, v in attrs.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _usage_context.reset(token)
+
+
+def _bucket() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+
+def _add(bucket: Dict[str, Any], prompt_tokens: int, completion_tokens: int, cost_usd: float):
+    bucket["calls"] += 1
+    bucket["prompt_tokens"] += prompt_tokens
+    bucket["completion_tokens"] += completion_tokens
+    bucket["cost_usd"] += cost_usd
+
+
+def _rounded(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(bucket, cost_usd=round(bucket["cost_usd"], 6))
+
+
+def _compact(count: float) -> str:
+    return f"{count / 1000:.1f}k" if count >= 1000 else str(int(count))
+
+
+@dataclass
+class UsageBudget:
+    hourly_usd: float = 0.0
+    daily_usd: float = 0.0
+    hourly_tokens: int = 0
+    daily_tokens: int = 0
+    warn_at: float = 0.8  # fraction of a limit at which a warning is published before it is exceeded
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "UsageBudget":
+        budget = cls()
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in types:
+                raise ValueError(f"Unknown usage budget option '{key}'")
+            setattr(budget, key, types[key](value.strip()))
+        return budget
+
+    @classmethod
+    def from_env(cls) -> "UsageBudget":
+        return cls.from_spec(os.getenv(USAGE_BUDGET_ENV, ""))
+
+    def limits(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in ("hourly_usd", "daily_usd", "hourly_tokens", "daily_tokens")
+                if getattr(self, name) > 0}
+
+
+class UsageTracker:
+    """In-memory token and cost totals by agent, model, subreddit, hour and post, with budget alerts"""
+
+    def __init__(self, budget: Optional[UsageBudget] = None, max_posts: int = 1000, max_hours: int = 48):
+        self.budget = budget or UsageBudget()
+        self.max_posts = max_posts
+        self.max_hours = max_hours
+        self._lock = threading.Lock()
+        self._event_buses: List[Any] = []
+        self._dump_thread: Optional[threading.Thread] = None
+        self._dump_stop = threading.Event()
+        self.reset()
+
+    @classmethod
+    def from_env(cls) -> "UsageTracker":
+        tracker = cls(UsageBudget.from_env())
+        dump_path = os.getenv(USAGE_DUMP_ENV)
+        if dump_path:
+            tracker.start_dump(dump_path, float(os.getenv(USAGE_DUMP_INTERVAL_ENV, "60")))
+        return tracker
+
+    def reset(self):
+        with self._lock:
+            self._started = time.time()
+            self._totals = _bucket()
+            self._by: Dict[str, Dict[str, Dict[str, Any]]] = {dimension: {} for dimension in DIMENSIONS}
+            # Most recently used posts only, so a long session doesn't keep one entry per post forever
+            self._posts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+            self._messages = _bucket()
+            self._messages["messages"] = 0
+            self._alerted = set()
+
+    def attach_event_bus(self, event_bus):
+        with self._lock:
+            if event_bus not in self._event_buses:
+                self._event_buses.append(event_bus)
+
+    def detach_event_bus(self, event_bus):
+        with self._lock:
+            if event_bus in self._event_buses:
+                self._event_buses.remove(event_bus)
+
+    def record(self, agent: str, model: Optional[str], prompt_tokens: int, completion_tokens: int, cost_usd: float,
+               timestamp: Optional[float] = None):
+        context = _usage_context.get()
+        timestamp = timestamp or time.time()
+        keys = {
+            "agent": agent,
+            "model": model or "unknown",
+            "subreddit": context.get("subreddit", "-"),
+            "hour": time.strftime("%Y-%m-%d %H:00", time.localtime(timestamp))
+        }
+        post_id = context.get("post_id")
+
+        with self._lock:
+            _add(self._totals, prompt_tokens, completion_tokens, cost_usd)
+            for dimension, key in keys.items():
+                bucket = self._by[dimension].get(key)
+                if bucket is None:
+                    bucket = self._by[dimension][key] = _bucket()
+                _add(bucket, prompt_tokens, completion_tokens, cost_usd)
+            hours = self._by["hour"]
+            if len(hours) > self.max_hours:
+                for hour in sorted(hours)[:len(hours) - self.max_hours]:
+                    del hours[hour]
+
+            if post_id:
+                post = self._posts.pop(post_id, None) or dict(_bucket(), subreddit=keys["subreddit"])
+                _add(post, prompt_tokens, completion_tokens, cost_usd)
+                self._posts[post_id] = post
+                if len(self._posts) > self.max_posts:
+                    self._posts.popitem(last=False)
+
+            alerts = self._check_budget(keys["hour"])
+            event_buses = list(self._event_buses)
+
+        for alert in alerts:
+            for event_bus in event_buses:
+                event_bus.publish("usage_budget_alert", alert)
+
+    def record_message(self, usage: Dict[str, Any]):
+        """Totals of one chat message, as collected by usage_scope() around it"""
+        with self._lock:
+            self._messages["messages"] += 1
+            self._messages["calls"] += usage["calls"]
+            self._messages["prompt_tokens"] += usage["prompt_tokens"]
+            self._messages["completion_tokens"] += usage["completion_tokens"]
+            self._messages["cost_usd"] += usage["cost_usd"]
+
+    def _window_usage(self, hour: str) -> Dict[str, Dict[str, Any]]:
+        day = hour[:10]
+        daily = _bucket()
+        for key, bucket in self._by["hour"].items():
+            if key.startswith(day):
+                for field, value in bucket.items():
+                    daily[field] += value
+        return {"hourly": self._by["hour"].get(hour, _bucket()), "daily": daily}
+
+    def _check_budget(self, hour: str) -> List[Dict[str, Any]]:
+        limits = self.budget.limits()
+        if not limits:
+            return []
+        windows = self._window_usage(hour)
+        alerts = []
+        for name, limit in limits.items():
+            period, _, unit = name.partition("_")
+            bucket = windows[period]
+            value = bucket["cost_usd"] if unit == "usd" else bucket["prompt_tokens"] + bucket["completion_tokens"]
+            window = hour if period == "hourly" else hour[:10]
+            for level, threshold in (("exceeded", limit), ("warning", limit * self.budget.warn_at)):
+                if value >= threshold:
+                    # One alert per budget, window and level; an exceeded budget has already passed its warning
+                    if (name, window, level) not in self._alerted:
+                        self._alerted.add((name, window, level))
+                        self._alerted.add((name, window, "warning"))
+                        alerts.append({"budget": name, "level": level, "limit": limit,
+                                       "value": round(value, 6), "window": window})
+                    break
+        return alerts
+
+    def post_usage(self, post_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            post = self._posts.get(post_id)
+            return _rounded(post) if post else None
+
+    def summary(self, top_posts: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            totals = _rounded(self._totals)
+            by = {f"by_{dimension}": {key: _rounded(bucket) for key, bucket in buckets.items()}
+                  for dimension, buckets in self._by.items()}
+            posts = [(post_id, _rounded(post)) for post_id, post in self._posts.items()]
+            messages = _rounded(self._messages)
+            current_hour = time.strftime("%Y-%m-%d %H:00")
+            windows = {period: _rounded(bucket) for period, bucket in self._window_usage(current_hour).items()}
+            started = self._started
+
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        post_tokens = [post["prompt_tokens"] + post["completion_tokens"] for _, post in posts]
+        message_tokens = messages["prompt_tokens"] + messages["completion_tokens"]
+        return {
+            "since": started,
+            "totals": totals,
+            **by,
+            "posts": {
+                "tracked": len(posts),
+                "avg_tokens": round(sum(post_tokens) / len(posts), 1) if posts else 0.0,
+                "top_by_cost": dict(sorted(posts, key=lambda item: -item[1]["cost_usd"])[:top_posts])
+            },
+            "messages": dict(messages, avg_tokens=round(message_tokens / messages["messages"], 1) if messages["messages"] else 0.0),
+            "budget": {"limits": self.budget.limits(), "current_hour": windows["hourly"], "today": windows["daily"]}
+        }
+
+    def status_line(self) -> str:
+        with self._lock:
+            totals = dict(self._totals)
+            hour = self._by["hour"].get(time.strftime("%Y-%m-%d %H:00"), _bucket())["cost_usd"]
+        line = (f"LLM: {totals['calls']} calls, {_compact(totals['prompt_tokens'])} in / "
+                f"{_compact(totals['completion_tokens'])} out, ${totals['cost_usd']:.4f}")
+        if self.budget.hourly_usd > 0:
+            line += f" | this hour ${hour:.4f} of ${self.budget.hourly_usd:g}"
+        return line
+
+    def dump(self, path: str):
+        save_checkpoint(path, self.summary())
+
+    def start_dump(self, path: str, interval: float = 60.0):
+        """Rewrite path with the summary every interval seconds on a daemon thread"""
+        self.stop_dump()
+        self._dump_stop = threading.Event()
+
+        def run(stop: threading.Event):
+            while not stop.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError:
+                    pass
+            self.dump(path)
+
+        self._dump_thread = threading.Thread(target=run, args=(self._dump_stop,), name="usage-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join(timeout=5)
+            self._dump_thread = None
+
+
+_tracker = UsageTracker.from_env()
+
+
+def get_usage_tracker() -> UsageTracker:
+    return _tracker
+
+
+def set_usage_tracker(tracker: UsageTracker):
+    global _tracker
+    _tracker = tracker
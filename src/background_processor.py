@@ -3,53 +3,191 @@ import time
 import random
 import os
 from pathlib import Path
-from typing import Dict, Any, List, Callable, Optional
+from collections import deque
+from typing import Dict, Any, Deque, List, Callable, Optional, Tuple
 from agents.base_agent import EventBus
+from agents.call_policy import any_circuit_open
+from agents.dispatch import dispatch_lane
+from agents.history import HISTORY_DIR_ENV, DEFAULT_HISTORY_DIR
 from agents.meta_agent import MetaChatAgent
+from checkpoint import load_checkpoint, save_checkpoint
 from data import DataLoader
 
+# Where stop() saves the queue and completed verdicts for the next start; "" disables.
+# Defaults to <MOD_AGENT_HISTORY_DIR>/background_checkpoint.json
+BACKGROUND_CHECKPOINT_ENV = "MOD_AGENT_BACKGROUND_CHECKPOINT"
+
+
+def default_checkpoint_path() -> str:
+    path = os.getenv(BACKGROUND_CHECKPOINT_ENV)
+    if path is None:
+        history_dir = os.getenv(HISTORY_DIR_ENV, DEFAULT_HISTORY_DIR)
+        path = os.path.join(history_dir, "background_checkpoint.json") if history_dir else ""
+    return path
+
 
 class BackgroundProcessor:
-    def __init__(self, meta_agent: MetaChatAgent, subreddits: List[str], event_bus: Optional[EventBus] = None, interval: int = 10, data_dir: str = "data"):
+    """Reviews newly discovered posts on a background thread. Runs batches back-to-back while the work queue
+    has posts, backs off exponentially (interval .. max_interval) while idle or throttled, and wakes at once
+    on a new-post signal. stop() drains the batch in flight and checkpoints; start() resumes from it"""
+
+    def __init__(self, meta_agent: MetaChatAgent, subreddits: List[str], event_bus: Optional[EventBus] = None, interval: float = 10,
+                 data_dir: str = "data", max_interval: Optional[float] = None, batch_size: int = 4,
+                 checkpoint_path: Optional[str] = None, drain_timeout: float = 30.0):
         self.meta_agent = meta_agent
         self.subreddits = subreddits
         self.event_bus = event_bus or EventBus()
         self.interval = interval
+        self.max_interval = max_interval if max_interval is not None else interval * 12
+        self.batch_size = max(1, batch_size)
         self.running = False
         self._thread = None
         self.data_dir = Path(data_dir)
 
         self.processed_posts = set()  # Track processed posts to avoid duplicates
-
-    def start(self):
+        # (subreddit, post_id) pairs discovered or announced but not reviewed yet
+        self.queue: Deque[Tuple[str, str]] = deque()
+        self._queue_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._backoff_level = 0
+        self.checkpoint_path = checkpoint_path if checkpoint_path is not None else default_checkpoint_path()
+        self.drain_timeout = drain_timeout
+        # Posts of the batch being reviewed, by subreddit; back to the queue if the batch doesn't finish
+        self._in_flight: Dict[str, List[str]] = {}
+        # post_id -> subreddit of every post this processor reviewed, for the checkpoint's verdicts
+        self._completed: Dict[str, str] = {}
+        self._checkpoint_on_land = False
+        self.schedule_stats = {"batches": 0, "posts": 0, "idle_waits": 0, "throttled_waits": 0, "error_waits": 0,
+                               "wakeups": 0, "last_delay_s": 0.0}
+
+        self.event_bus.subscribe("new_posts_available", self._handle_new_posts)
+
+    def start(self, timeout: Optional[float] = None) -> bool:
+        """Resume from the checkpoint and start the loop. False when a batch abandoned by the last stop() is
+        still landing after the drain deadline (default drain_timeout); call start() again later"""
         if not self.running:
+            if self._thread is not None:
+                # Its verdicts go into this run; a second loop alongside it would review the same queue
+                self._thread.join(self.drain_timeout if timeout is None else timeout)
+                if self._thread.is_alive():
+                    self.event_bus.publish("background_processor_started", {"status": "still_stopping"})
+                    return False
+                self._thread = None
+            self.resume()
             self.running = True
-            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._stop.clear()
+            self._checkpoint_on_land = False
+            self._thread = threading.Thread(target=self._run, name="background-processor", daemon=True)
             self._thread.start()
             self.event_bus.publish("background_processor_started", {"status": "started"})
+        return True
 
-    def stop(self):
+    def stop(self, timeout: Optional[float] = None):
+        """Start no new batch, give the one in flight until the drain deadline (default drain_timeout) to
+        finish, then checkpoint. Posts of a batch still running are checkpointed as queued"""
+        if not self.running and self._thread is None:
+            return
         self.running = False
+        self._stop.set()
+        self._wake.set()
+        drained = True
         if self._thread:
-            self._thread.join(timeout=2)
-        self.event_bus.publish("background_processor_stopped", {"status": "stopped"})
+            # The loop only waits on _wake, so this returns as soon as the current batch is done
+            self._thread.join(self.drain_timeout if timeout is None else timeout)
+            drained = not self._thread.is_alive()
+            if drained:
+                self._thread = None
+            else:
+                # Its reviews are already paid for: checkpoint again when they land
+                self._checkpoint_on_land = True
+        self.save_checkpoint("stop")
+        self.event_bus.publish("background_processor_stopped", {"status": "stopped", "drained": drained})
+
+    def notify_new_posts(self, subreddit: str, post_ids: Optional[List[str]] = None):
+        """New-post signal: queue post_ids (or, without them, look for new posts) and wake the loop now"""
+        if post_ids:
+            self._enqueue({subreddit: post_ids})
+        self._backoff_level = 0
+        self.schedule_stats["wakeups"] += 1
+        self._wake.set()
+
+    def _handle_new_posts(self, data: Dict[str, Any]):
+        self.notify_new_posts(data.get("subreddit"), data.get("post_ids"))
+
+    def _enqueue(self, posts: Dict[str, List[str]]):
+        with self._queue_lock:
+            for subreddit_name, post_ids in posts.items():
+                for post_id in post_ids:
+                    key = f"{subreddit_name}:{post_id}"
+                    if key not in self.processed_posts:
+                        self.processed_posts.add(key)
+                        self.queue.append((subreddit_name, post_id))
+
+    def _next_batch(self) -> Dict[str, List[str]]:
+        batch: Dict[str, List[str]] = {}
+        with self._queue_lock:
+            for _ in range(min(self.batch_size, len(self.queue))):
+                subreddit_name, post_id = self.queue.popleft()
+                batch.setdefault(subreddit_name, []).append(post_id)
+        return batch
 
     def _run(self):
-        while self.running:
-            try:
-                self._process_batch()
-                time.sleep(self.interval)
-            except Exception as e:
-                self.event_bus.publish("background_processor_error", {"error": str(e)})
-                time.sleep(self.interval)
-
-    def _process_batch(self):
+        while not self._stop.is_set():
+            # Cleared before the tick so a signal arriving during a batch skips the next wait
+            self._wake.clear()
+            # Lowest priority: a moderator's requests get LLM slots before any of this batch's
+            with dispatch_lane("background"):
+                delay = self._tick()
+            self.schedule_stats["last_delay_s"] = delay
+            if delay > 0:
+                self._wake.wait(delay)
+
+    def _tick(self) -> float:
+        """Run one step and return how long to wait before the next"""
+        try:
+            if any_circuit_open():
+                # The LLM is failing; new posts would only be parked
+                self.event_bus.publish("background_processor_paused", {"reason": "circuit_open",
+                                                                       "parked_reviews": self.meta_agent.parked_count()})
+                return self._backoff("throttled_waits")
+
+            if not self.queue:
+                if self.meta_agent.parked_count():
+                    self.meta_agent.retry_parked_reviews()
+                self._enqueue(self._get_random_posts())
+
+            # Stopping: no new batch starts, whatever is queued goes into the checkpoint
+            if self._stop.is_set():
+                return 0.0
+            batch = self._next_batch()
+            if not batch:
+                return self._backoff("idle_waits")
+            if self._process_batch(batch):
+                return self._backoff("throttled_waits")
+
+            self._backoff_level = 0
+            return 0.0 if self.queue else self.interval
+        except Exception as e:
+            self.event_bus.publish("background_processor_error", {"error": str(e)})
+            return self._backoff("error_waits")
+
+    def _backoff(self, reason: str) -> float:
+        self.schedule_stats[reason] += 1
+        delay = min(self.max_interval, self.interval * (2 ** self._backoff_level))
+        self._backoff_level += 1
+        return delay
+
+    def _process_batch(self, selected_posts: Dict[str, List[str]]) -> bool:
+        """Review the batch; True when the LLM layer pushed back (reviews parked or a circuit opened)"""
+        throttled = False
+        with self._queue_lock:
+            self._in_flight = {subreddit_name: list(post_ids) for subreddit_name, post_ids in selected_posts.items()}
         try:
-            selected_posts = self._get_random_posts()
-            if not selected_posts:
-                return
-
             for subreddit_name, post_ids in selected_posts.items():
+                if self._stop.is_set():
+                    # Draining: the rest of the batch goes back to the queue unreviewed
+                    break
                 if post_ids:
                     data_loader = DataLoader(
                         data_dir=str(self.data_dir),
@@ -58,6 +196,13 @@ class BackgroundProcessor:
                     )
 
                     result = self.meta_agent.interact("Auto check posts", data_loader)
+                    throttled = throttled or bool(result.get("parked_posts"))
+                    with self._queue_lock:
+                        self._in_flight.pop(subreddit_name, None)
+                        for post in result.get("approved_posts", []) + result.get("flagged_posts", []) + result.get("parked_posts", []):
+                            self._completed[post["id"]] = subreddit_name
+                    self.schedule_stats["batches"] += 1
+                    self.schedule_stats["posts"] += len(post_ids)
 
                     self.event_bus.publish("background_posts_loaded", {
                         "approved_posts": result.get("approved_posts", []),
@@ -69,6 +214,106 @@ class BackgroundProcessor:
 
         except Exception as e:
             self.event_bus.publish("background_processing_error", {"error": str(e)})
+        finally:
+            with self._queue_lock:
+                for subreddit_name, post_ids in reversed(list(self._in_flight.items())):
+                    self.queue.extendleft((subreddit_name, post_id) for post_id in reversed(post_ids))
+                self._in_flight = {}
+            if self._checkpoint_on_land:
+                self.save_checkpoint("late_batch")
+        return throttled or any_circuit_open()
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Queue cursor and completed verdicts; parked posts (no verdict yet) are saved as queued"""
+        snapshot = self.meta_agent.store.snapshot()
+        with self._queue_lock:
+            queue = [[subreddit_name, post_id] for subreddit_name, post_ids in self._in_flight.items() for post_id in post_ids]
+            queue += [[subreddit_name, post_id] for subreddit_name, post_id in self.queue]
+            # Posts a moderator rejected have left the store and need nothing on resume
+            self._completed = {post_id: subreddit_name for post_id, subreddit_name in self._completed.items()
+                               if snapshot.get(post_id) is not None}
+            completed = dict(self._completed)
+            processed = sorted(self.processed_posts)
+
+        approved, flagged = [], []
+        for post_id, subreddit_name in completed.items():
+            post = snapshot.get(post_id)
+            if post.get("review_pending"):
+                queue.append([subreddit_name, post_id])
+            elif snapshot.status(post_id) == "approved":
+                approved.append(post)
+            else:
+                flagged.append(post)
+        return {
+            "subreddits": self.subreddits,
+            "queue": queue,
+            "processed": processed,
+            "verdicts": {"approved": approved, "flagged": flagged},
+            "saved_at": time.time()
+        }
+
+    def save_checkpoint(self, reason: str = "manual"):
+        if not self.checkpoint_path:
+            return
+        state = self.checkpoint_state()
+        save_checkpoint(self.checkpoint_path, state)
+        self.event_bus.publish("background_processor_checkpoint", {
+            "path": self.checkpoint_path,
+            "reason": reason,
+            "queued": len(state["queue"]),
+            "approved": len(state["verdicts"]["approved"]),
+            "flagged": len(state["verdicts"]["flagged"])
+        })
+
+    def resume(self) -> bool:
+        """Restore the checkpoint's verdicts into the store and its queue into this processor. Verdicts never go
+        back to the LLM, so nothing reviewed before the stop is paid for twice"""
+        state = load_checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        if not state:
+            return False
+
+        verdicts = state.get("verdicts", {})
+        restored = 0
+        with self.meta_agent.store.transaction() as txn:
+            for status, put in (("approved", txn.put_approved), ("flagged", txn.put_flagged)):
+                for post in verdicts.get(status, []):
+                    # Whatever is in the store already is newer than the checkpoint
+                    if txn.get(post["id"]) is None:
+                        put(post)
+                        restored += 1
+
+        snapshot = self.meta_agent.store.snapshot()
+        with self._queue_lock:
+            self.processed_posts.update(state.get("processed", []))
+            queued = set(self.queue)
+            for subreddit_name, post_id in state.get("queue", []):
+                post = snapshot.get(post_id)
+                # Reviewed since the checkpoint, or parked and retried by the agent itself
+                if post is not None and (not post.get("review_pending") or self.meta_agent.is_parked(post_id)):
+                    continue
+                if (subreddit_name, post_id) not in queued:
+                    queued.add((subreddit_name, post_id))
+                    self.queue.append((subreddit_name, post_id))
+                    self.processed_posts.add(f"{subreddit_name}:{post_id}")
+            for status in ("approved", "flagged"):
+                for post in verdicts.get(status, []):
+                    self._completed[post["id"]] = post.get("subreddit", "")
+            queued_count = len(self.queue)
+
+        self.event_bus.publish("background_processor_resumed", {
+            "path": self.checkpoint_path,
+            "restored": restored,
+            "queued": queued_count
+        })
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._queue_lock:
+            queued = len(self.queue)
+            in_flight = sum(len(post_ids) for post_ids in self._in_flight.values())
+            completed = len(self._completed)
+        return dict(self.schedule_stats, queued=queued, in_flight=in_flight, completed=completed,
+                    backoff_level=self._backoff_level, running=self.running)
 
     def _get_available_posts(self, subreddit_name: str) -> List[str]:
         """Get all available post IDs from a subreddit directory"""
@@ -76,12 +321,7 @@ class BackgroundProcessor:
         if not subreddit_path.exists():
             return []
 
-        post_ids = []
-        for item in subreddit_path.iterdir():
-            if item.is_dir() and item.name not in ['__pycache__']:
-                post_ids.append(item.name)
-
-        return post_ids
+        return DataLoader(data_dir=str(self.data_dir), subreddit_name=subreddit_name).list_post_ids()
 
     def _get_random_posts(self) -> Dict[str, List[str]]:
         """Get random posts from both regular and violation subreddits"""
@@ -97,29 +337,24 @@ class BackgroundProcessor:
                 num_regular = random.randint(0, min(2, len(regular_posts)))
                 if num_regular > 0:
                     selected_regular = random.sample(regular_posts, num_regular)
-                    # Filter out already processed posts
+                    # Filter out already processed posts; _enqueue marks the rest
                     new_regular = [p for p in selected_regular if f"{subreddit}:{p}" not in self.processed_posts]
                     if new_regular:
                         selected_posts[subreddit] = new_regular
-                        # Mark as processed
-                        for post_id in new_regular:
-                            self.processed_posts.add(f"{subreddit}:{post_id}")
 
             if violation_posts:
                 num_violation = random.randint(0, min(2, len(violation_posts)))
                 if num_violation > 0:
                     selected_violation = random.sample(violation_posts, num_violation)
-                    # Filter out already processed posts
+                    # Filter out already processed posts; _enqueue marks the rest
                     new_violation = [p for p in selected_violation if f"Viol_{subreddit}:{p}" not in self.processed_posts]
                     if new_violation:
                         selected_posts[f"Viol_{subreddit}"] = new_violation
-                        # Mark as processed
-                        for post_id in new_violation:
-                            self.processed_posts.add(f"Viol_{subreddit}:{post_id}")
 
-        # Clear processed posts periodically to allow re-processing
-        if len(self.processed_posts) > 100:
-            self.processed_posts.clear()
+        # Clear processed posts periodically to allow re-processing; queued posts stay marked
+        with self._queue_lock:
+            if len(self.processed_posts) > 100:
+                self.processed_posts = {f"{subreddit_name}:{post_id}" for subreddit_name, post_id in self.queue}
 
         return selected_posts
 
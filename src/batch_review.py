@@ -0,0 +1,335 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+
+from dotenv import load_dotenv
+from data import DataLoader
+from agents.post_agent import MCPEnvelope, CommentSpecificAgent, REVIEW_MODES
+from agents.cascade import create_review_agent
+from agents.stats import percentile
+from checkpoint import load_checkpoint, save_checkpoint
+
+load_dotenv()
+
+
+class BatchReviewer:
+    def __init__(self, subreddits: List[str], data_dir: str = "data", workers: int = 4,
+                 review_comments: bool = False, model: str = "gpt-4o-mini",
+                 checkpoint_path: Optional[str] = None, checkpoint_every: int = 25,
+                 limit: Optional[int] = None, review_mode: Optional[str] = None):
+        self.subreddits = subreddits
+        self.data_dir = data_dir
+        self.workers = max(1, workers)
+        self.review_comments = review_comments
+        self.model = model
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.limit = limit
+        self.review_mode = review_mode
+
+        self.completed_keys = set()
+        self.latencies: List[float] = []
+        self.reviewed = 0
+        self.violations = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+        # Agents are not shared between workers so each keeps its own usage counters
+        self._local = threading.local()
+        self._agents = []
+        self._agents_lock = threading.Lock()
+
+        if self.checkpoint_path:
+            checkpoint = load_checkpoint(self.checkpoint_path)
+            if checkpoint:
+                self.completed_keys = set(checkpoint.get("completed", []))
+
+    def _get_agent(self, target: str):
+        if not hasattr(self._local, "agents"):
+            self._local.agents = {
+                "post": create_review_agent(model=self.model, review_mode=self.review_mode),
+                "comment": CommentSpecificAgent(model=self.model, review_mode=self.review_mode) if self.review_comments else None
+            }
+            with self._agents_lock:
+                self._agents.extend(agent for agent in self._local.agents.values() if agent)
+        return self._local.agents[target]
+
+    def iter_tasks(self) -> Iterator[Dict[str, Any]]:
+        emitted = 0
+        for subreddit in self.subreddits:
+            data = DataLoader(data_dir=self.data_dir, subreddit_name=subreddit).get_formatted_data()
+            for post in data["posts"]:
+                tasks = [{
+                    "key": f"{subreddit}:{post['id']}",
+                    "target": "post",
+                    "subreddit": data["subreddit_name"],
+                    "rules": data["rules"],
+                    "post": post
+                }]
+                if self.review_comments:
+                    for comment in data.get("post_comments", {}).get(post["id"], []):
+                        tasks.append({
+                            "key": f"{subreddit}:{post['id']}:{comment['id']}",
+                            "target": "comment",
+                            "subreddit": data["subreddit_name"],
+                            "rules": data["rules"],
+                            "post": post,
+                            "comment": comment
+                        })
+
+                for task in tasks:
+                    if task["key"] in self.completed_keys:
+                        continue
+                    if self.limit is not None and emitted >= self.limit:
+                        return
+                    emitted += 1
+                    yield task
+
+    def review_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            mcp_envelope = MCPEnvelope(
+                post=task["post"],
+                subreddit=task["subreddit"],
+                rules=task["rules"],
+                review_target=task["target"],
+                target_comment=task.get("comment")
+            )
+            result = self._get_agent(task["target"]).review(mcp_envelope)
+        except Exception as e:
+            # One failing item must not abort the run; it is recorded as an error and retried on resume
+            result = {"error": f"{type(e).__name__}: {e}"}
+        latency = time.perf_counter() - start
+
+        record = {
+            "key": task["key"],
+            "subreddit": task["subreddit"],
+            "target": task["target"],
+            "post_id": task["post"].get("id", ""),
+            "comment_id": task["comment"].get("id") if task.get("comment") else None,
+            "violation": bool(result.get("violation")),
+            "rule_id": result.get("rule_id"),
+            "explanation": result.get("explanation"),
+            "confidence": result.get("confidence"),
+            "confidence_level": result.get("confidence_level"),
+            "error": bool(result.get("error")),
+            "latency_ms": round(latency * 1000, 1),
+            "reviewed_at": datetime.now().isoformat()
+        }
+        return record
+
+    def save_checkpoint(self):
+        if self.checkpoint_path:
+            save_checkpoint(self.checkpoint_path, {
+                "subreddits": self.subreddits,
+                "completed": sorted(self.completed_keys),
+                "updated_at": datetime.now().isoformat()
+            })
+
+    def run(self, output) -> Dict[str, Any]:
+        start = time.perf_counter()
+        since_checkpoint = 0
+        max_in_flight = self.workers * 4
+        tasks = self.iter_tasks()
+        in_flight = set()
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            exhausted = False
+            while True:
+                # Keep a bounded window of submitted work so huge corpora don't queue millions of futures
+                while not exhausted and len(in_flight) < max_in_flight:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    in_flight.add(executor.submit(self.review_task, task))
+
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+
+                    # Errored reviews stay out of the checkpoint so a resumed run retries them
+                    if not record["error"]:
+                        self.completed_keys.add(record["key"])
+                    self.latencies.append(record["latency_ms"])
+                    self.reviewed += 1
+                    self.violations += 1 if record["violation"] else 0
+                    self.errors += 1 if record["error"] else 0
+
+                    since_checkpoint += 1
+                    if since_checkpoint >= self.checkpoint_every:
+                        self.save_checkpoint()
+                        since_checkpoint = 0
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+            self.elapsed = time.perf_counter() - start
+            self.save_checkpoint()
+
+        return self.summary()
+
+    def token_totals(self) -> Dict[str, int]:
+        totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        with self._agents_lock:
+            agents = list(self._agents)
+        for agent in agents:
+            for usage in self._usage_sources(agent):
+                for key in totals:
+                    totals[key] += usage.get(key, 0)
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        return totals
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "reviewed": self.reviewed,
+            "violations": self.violations,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_per_s": round(self.reviewed / self.elapsed, 3) if self.elapsed > 0 else 0.0,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else 0.0
+            },
+            "tokens": self.token_totals(),
+            "review_cascade": self.cascade_totals()
+        }
+
+    @staticmethod
+    def _usage_sources(agent) -> List[Dict[str, int]]:
+        # Confidence scoring runs through separate agents owned by the reviewer, as do cascade tiers
+        reviewers = [agent] + [tier for tier in (getattr(agent, "screener_agent", None), getattr(agent, "escalation_agent", None)) if tier]
+        sources = []
+        for reviewer in reviewers:
+            sources.extend([reviewer.token_usage, reviewer.confidence_agent.token_usage])
+            if reviewer.rule_distribution_agent is not None:
+                sources.append(reviewer.rule_distribution_agent.token_usage)
+        if getattr(agent, "distribution_agent", None) is not None:
+            sources.append(agent.distribution_agent.token_usage)
+        return sources
+
+    def cascade_totals(self) -> Optional[Dict[str, Dict[str, float]]]:
+        with self._agents_lock:
+            agents = [agent for agent in self._agents if hasattr(agent, "get_tier_stats")]
+        if not agents:
+            return None
+        totals: Dict[str, Dict[str, float]] = {}
+        for agent in agents:
+            for tier, stats in agent.get_tier_stats().items():
+                if not isinstance(stats, dict):
+                    continue
+                tier_totals = totals.setdefault(tier, {})
+                for key in ("calls", "decided", "latency_ms", "prompt_tokens", "completion_tokens", "cost_usd"):
+                    tier_totals[key] = tier_totals.get(key, 0) + stats[key]
+        return totals
+
+
+def prune_output(path: str, completed_keys) -> int:
+    """Drop records a resumed run will review again (errored, or written after the last checkpoint) from the
+    output so every key ends up in it once; returns how many were dropped"""
+    if not os.path.exists(path):
+        return 0
+    kept, dropped = [], 0
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by the interruption
+                dropped += 1
+                continue
+            if record.get("key") in completed_keys:
+                kept.append(line if line.endswith("\n") else line + "\n")
+            else:
+                dropped += 1
+    if dropped:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, path)
+    return dropped
+
+
+def print_summary(summary: Dict[str, Any], stream=sys.stderr):
+    latency = summary["latency_ms"]
+    tokens = summary["tokens"]
+    print(f"Reviewed: {summary['reviewed']} ({summary['violations']} violations, {summary['errors']} errors)", file=stream)
+    print(f"Elapsed: {summary['elapsed_s']:.1f}s, throughput: {summary['throughput_per_s']:.2f} reviews/s", file=stream)
+    print(f"Latency ms: p50={latency['p50']:.0f} p90={latency['p90']:.0f} p99={latency['p99']:.0f} max={latency['max']:.0f}", file=stream)
+    print(f"Tokens: {tokens['prompt_tokens']} prompt + {tokens['completion_tokens']} completion = {tokens['total_tokens']} over {tokens['calls']} calls", file=stream)
+    for tier, stats in (summary.get("review_cascade") or {}).items():
+        print(f"Tier {tier}: decided {stats['decided']}/{stats['calls']}, {stats['latency_ms']:.0f} ms, ${stats['cost_usd']:.4f}", file=stream)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Review whole subreddits without the TUI and stream verdicts as JSONL")
+    parser.add_argument("subreddits", nargs="+", help="Subreddit directories under --data-dir, e.g. AskHistorians Viol_AskHistorians")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--workers", type=int, default=4, help="Number of reviews run concurrently")
+    parser.add_argument("--comments", action="store_true", help="Also review every comment")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--output", "-o", help="JSONL output file (default: stdout)")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume an interrupted run")
+    parser.add_argument("--checkpoint-every", type=int, default=25, help="Save the checkpoint after this many verdicts")
+    parser.add_argument("--limit", type=int, help="Review at most this many items in this run")
+    parser.add_argument("--review-mode", choices=REVIEW_MODES, help="two_tier skips explanations (explanation is null); default from MOD_AGENT_REVIEW_MODE, else full")
+    parser.add_argument("--summary-json", help="Also write the end-of-run summary to this file")
+    args = parser.parse_args(argv)
+
+    reviewer = BatchReviewer(
+        subreddits=args.subreddits,
+        data_dir=args.data_dir,
+        workers=args.workers,
+        review_comments=args.comments,
+        model=args.model,
+        checkpoint_path=args.checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        limit=args.limit,
+        review_mode=args.review_mode
+    )
+
+    if reviewer.completed_keys:
+        print(f"Resuming: {len(reviewer.completed_keys)} items already reviewed", file=sys.stderr)
+        if args.output:
+            dropped = prune_output(args.output, reviewer.completed_keys)
+            if dropped:
+                print(f"Dropped {dropped} records that will be reviewed again from {args.output}", file=sys.stderr)
+
+    # Append when resuming so verdicts from the interrupted run are kept
+    output = open(args.output, "a" if reviewer.completed_keys else "w") if args.output else sys.stdout
+    try:
+        summary = reviewer.run(output)
+    except KeyboardInterrupt:
+        print("Interrupted, checkpoint saved", file=sys.stderr)
+        summary = reviewer.summary()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print_summary(summary)
+    if args.summary_json:
+        with open(args.summary_json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
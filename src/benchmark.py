@@ -0,0 +1,334 @@
+import sys
+import os
+# generate_corpus lives at the repository root, next to src/
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(REPO_ROOT)
+
+import argparse
+import json
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+from agents import llm_backend
+from agents.fake_llm import FakeLLMClient, FakeLLMConfig, FakeLLMEngine
+from agents.cassette import CassetteConfig, TIMINGS, create_recording_client, create_replay_client
+from agents.base_agent import EventBus
+from agents.post_agent import MCPEnvelope, PostSpecificAgent, moderation_review_mode
+from agents.override_rules_extraction import OverrideRuleExtractor
+from agents.meta_agent import MetaChatAgent
+from agents.calibration import VerdictLog
+from data import DataLoader
+from agents.stats import percentile
+from generate_corpus import generate_corpus
+
+# Resolved against the repository so the benchmark runs from any working directory
+DEFAULT_DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+# Orchestrator messages grouped by the intent they are expected to route to
+INTENT_MESSAGES = {
+    "MODERATION_ACTION": "approve this post",
+    "MODERATION_QUERY": "why was this flagged?",
+    "FEEDBACK": "ignore rule {rule_number} for this post",
+    "SYSTEM_COMMAND": "auto check posts",
+    "CONVERSATION": "hello, how are you today?"
+}
+
+
+def latency_stats(samples_s: List[float]) -> Dict[str, Any]:
+    samples_ms = sorted(sample * 1000 for sample in samples_s)
+    return {
+        "n": len(samples_ms),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 4) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "primary": "p50_ms",
+        "higher_is_better": False
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+class BenchmarkSuite:
+    def __init__(self, data_dir: str = DEFAULT_DATA_DIR, sizes: List[int] = None, concurrency: List[int] = None,
+                 review_posts: int = 64, repeat: int = 5, fake_config: Optional[FakeLLMConfig] = None,
+                 corpus_layout: str = "dir", seed: int = 0, cassette: Optional[CassetteConfig] = None,
+                 cassette_mode: Optional[str] = None):
+        self.data_dir = Path(data_dir)
+        self.sizes = sizes or [100, 1000]
+        self.concurrency = concurrency or [1, 4, 16]
+        self.review_posts = review_posts
+        self.repeat = repeat
+        self.corpus_layout = corpus_layout
+        self.seed = seed
+        self.fake_config = fake_config or FakeLLMConfig(latency="lognormal:20:0.25", data_dir=data_dir)
+        # "record" saves the fake LLM's traffic to the cassette, "replay" serves it back instead of the fake LLM
+        self.cassette = cassette
+        self.cassette_mode = cassette_mode
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._tmp_dir = None
+
+    def run(self, only: Optional[List[str]] = None) -> Dict[str, Any]:
+        engine = FakeLLMEngine(self.fake_config)
+        if self.cassette_mode == "replay":
+            llm_backend.set_client_factory(lambda: create_replay_client(self.cassette))
+        elif self.cassette_mode == "record":
+            llm_backend.set_client_factory(lambda: create_recording_client(self.cassette, inner=FakeLLMClient(engine=engine)))
+        else:
+            llm_backend.set_client_factory(lambda: FakeLLMClient(engine=engine))
+        self._tmp_dir = Path(tempfile.mkdtemp(prefix="mod_agent_bench_"))
+        benchmarks = {
+            "data_loader": self.bench_data_loader,
+            "envelope": self.bench_envelope_serialization,
+            "event_bus": self.bench_event_bus,
+            "auto_review": self.bench_auto_review,
+            "orchestrator": self.bench_orchestrator
+        }
+        try:
+            for name, bench in benchmarks.items():
+                if only and name not in only:
+                    continue
+                print(f"Running {name} ...", file=sys.stderr)
+                bench()
+        finally:
+            llm_backend.set_client_factory(None)
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sizes": self.sizes,
+                "concurrency": self.concurrency,
+                "corpus_layout": self.corpus_layout,
+                "fake_llm": vars(self.fake_config),
+                "cassette": dict(vars(self.cassette), mode=self.cassette_mode) if self.cassette_mode else None
+            },
+            "results": self.results
+        }
+
+    def _corpus(self, size: int) -> Path:
+        corpus_dir = self._tmp_dir / f"Bench{size}"
+        if not corpus_dir.exists():
+            generate_corpus(str(self.data_dir / "AskHistorians"), str(corpus_dir), size,
+                            layout=self.corpus_layout, seed=self.seed)
+        return corpus_dir
+
+    def bench_data_loader(self):
+        for size in self.sizes:
+            corpus_dir = self._corpus(size)
+            loader_args = {"data_dir": str(corpus_dir.parent), "subreddit_name": corpus_dir.name}
+
+            cold = measure(lambda: DataLoader(**loader_args).get_formatted_data(), self.repeat)
+            self.results[f"data_loader.cold[n={size}]"] = latency_stats(cold)
+
+            warm_loader = DataLoader(**loader_args)
+            warm_loader.load_raw_data()
+            warm = measure(warm_loader.get_formatted_data, self.repeat * 20)
+            self.results[f"data_loader.warm[n={size}]"] = latency_stats(warm)
+
+    def bench_envelope_serialization(self):
+        size = self.sizes[-1]
+        corpus_dir = self._corpus(size)
+        data = DataLoader(data_dir=str(corpus_dir.parent), subreddit_name=corpus_dir.name).get_formatted_data()
+        envelopes = [MCPEnvelope(post, data["subreddit_name"], data["rules"], review_target="post") for post in data["posts"]]
+
+        samples = []
+        total_bytes = 0
+        for envelope in envelopes:
+            start = time.perf_counter()
+            serialized = envelope.to_json()
+            samples.append(time.perf_counter() - start)
+            total_bytes += len(serialized)
+
+        stats = latency_stats(samples)
+        stats["bytes_per_envelope"] = total_bytes // len(envelopes)
+        self.results[f"envelope.to_json[n={size}]"] = stats
+
+    def bench_event_bus(self, events: int = 10000):
+        for subscribers in (1, 10, 100):
+            event_bus = EventBus()
+            received = [0]
+
+            def callback(data):
+                received[0] += 1
+
+            for _ in range(subscribers):
+                event_bus.subscribe("bench_event", callback)
+
+            payload = {"post_id": "bench", "timestamp": time.time()}
+            start = time.perf_counter()
+            for _ in range(events):
+                event_bus.publish("bench_event", payload)
+            elapsed = time.perf_counter() - start
+
+            self.results[f"event_bus.publish[subscribers={subscribers}]"] = {
+                "n": events,
+                "events_per_s": round(events / elapsed, 1),
+                "us_per_publish": round(elapsed / events * 1e6, 3),
+                "primary": "us_per_publish",
+                "higher_is_better": False
+            }
+
+    def _make_meta_agent(self, review_workers: int = 1) -> MetaChatAgent:
+        # Synthetic approvals must never reach the verdict log calibration is fitted on, and spilled
+        # histories go to the run's scratch directory instead of logs/
+        event_bus = EventBus()
+        return MetaChatAgent(
+            post_agent=PostSpecificAgent(review_mode=moderation_review_mode()),
+            override_rule_extractor=OverrideRuleExtractor(event_bus=event_bus),
+            event_bus=event_bus,
+            review_workers=review_workers,
+            verdict_log=VerdictLog(None),
+            history_dir=str(self._tmp_dir / "history")
+        )
+
+    def bench_auto_review(self):
+        corpus_dir = self._corpus(self.review_posts)
+        loader = DataLoader(data_dir=str(corpus_dir.parent), subreddit_name=corpus_dir.name)
+        loader.load_raw_data()
+
+        for workers in self.concurrency:
+            meta_agent = self._make_meta_agent(review_workers=workers)
+            start = time.perf_counter()
+            result = meta_agent._auto_review_posts(loader)
+            elapsed = time.perf_counter() - start
+            meta_agent.close()
+            reviewed = len(result["approved_posts"]) + len(result["flagged_posts"])
+            self.results[f"auto_review[workers={workers}]"] = {
+                "n": reviewed,
+                "elapsed_s": round(elapsed, 4),
+                "posts_per_s": round(reviewed / elapsed, 2),
+                "primary": "posts_per_s",
+                "higher_is_better": True
+            }
+
+    def bench_orchestrator(self):
+        loader = DataLoader(data_dir=str(self.data_dir), subreddit_name="Viol_AskHistorians")
+        loader.load_raw_data()
+        meta_agent = self._make_meta_agent()
+        try:
+            self._bench_orchestrator(meta_agent, loader)
+        finally:
+            meta_agent.close()
+
+    def _bench_orchestrator(self, meta_agent: MetaChatAgent, loader: DataLoader):
+        meta_agent._auto_review_posts(loader)
+        flagged = {post_id: dict(post) for post_id, post in meta_agent.todo_posts.items()}
+        if not flagged:
+            return
+        post_id, post = next(iter(flagged.items()))
+        rule_number = (post.get("rule_id") or "rule_1").split("_")[-1]
+
+        def reset_selection():
+            # Every sample starts from the same flagged, selected post without override rules
+            post_copy = dict(flagged[post_id])
+            post_copy.pop("override_rules", None)
+            meta_agent.store.put_flagged(post_copy)
+            if meta_agent.selected_post_id == post_id:
+                meta_agent.select_post(post_id)
+            meta_agent.select_post(post_id)
+
+        orchestrator = meta_agent.conversation_orchestrator
+        for intent, template in INTENT_MESSAGES.items():
+            message = template.format(rule_number=rule_number)
+            samples = measure(lambda: orchestrator.process_message(message, loader), self.repeat, setup=reset_selection)
+            stats = latency_stats(samples)
+            stats["routed_intent"] = orchestrator.conversation_state.current_intent.primary
+            self.results[f"orchestrator.process_message[{intent}]"] = stats
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return a line per shared benchmark; lines starting with REGRESSION exceeded the threshold"""
+    lines = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or current.get("primary") not in previous:
+            continue
+        metric = current["primary"]
+        old, new = previous[metric], current[metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if current.get("higher_is_better") else change
+        status = "REGRESSION" if worse > threshold else "ok"
+        lines.append(f"{status:<10} {name:<55} {metric:>14}: {old:>12.3f} -> {new:>12.3f} ({change:+.1%})")
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmarks against the fake LLM backend")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Synthetic corpus sizes (posts)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Review worker counts for auto_review")
+    parser.add_argument("--review-posts", type=int, default=64, help="Posts reviewed per auto_review run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=["data_loader", "envelope", "event_bus", "auto_review", "orchestrator"])
+    parser.add_argument("--latency", default="lognormal:20:0.25", help="Fake LLM latency distribution")
+    parser.add_argument("--per-token-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-layout", choices=["dir", "packed"], default="dir", help="On-disk layout of the generated corpora")
+    parser.add_argument("--cassette", help="Cassette file (gzip JSONL) to record the LLM traffic to or replay it from")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--cassette-timing", choices=TIMINGS, default="original", help="Replay latency: as recorded, divided by --cassette-speed, or none")
+    parser.add_argument("--cassette-speed", type=float, default=10.0)
+    parser.add_argument("--output", "-o", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against a previously saved results JSON")
+    parser.add_argument("--save-baseline", help="Also save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(
+        data_dir=args.data_dir,
+        sizes=args.sizes,
+        concurrency=args.concurrency,
+        review_posts=args.review_posts,
+        repeat=args.repeat,
+        fake_config=FakeLLMConfig(latency=args.latency, per_token_ms=args.per_token_ms, seed=args.seed, data_dir=args.data_dir),
+        corpus_layout=args.corpus_layout,
+        seed=args.seed,
+        cassette=CassetteConfig(path=args.cassette, timing=args.cassette_timing, speed=args.cassette_speed) if args.cassette else None,
+        cassette_mode=args.cassette_mode if args.cassette else None
+    )
+    results = suite.run(only=args.only)
+
+    serialized = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(serialized)
+    else:
+        print(serialized)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(serialized)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        lines = compare_to_baseline(results, baseline, args.threshold)
+        for line in lines:
+            print(line, file=sys.stderr)
+        if any(line.startswith("REGRESSION") for line in lines):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
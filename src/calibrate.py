@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+from typing import Dict
+
+from agents.calibration import (VerdictLog, Calibrator, fit_calibration, reliability, format_reliability,
+                                METHODS, DEFAULT_TARGET_PRECISION)
+
+
+def parse_targets(spec: str) -> Dict[str, float]:
+    """"high=0.95,medium=0.8" -> {"high": 0.95, "medium": 0.8}"""
+    targets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        level, _, value = item.partition("=")
+        if level.strip() not in ("high", "medium"):
+            raise argparse.ArgumentTypeError(f"Unknown confidence level '{level.strip()}'")
+        targets[level.strip()] = float(value)
+    return targets
+
+
+def print_report(title: str, report):
+    print(title)
+    for line in format_reliability(report):
+        print(f"  {line}")
+
+
+def cmd_fit(args) -> int:
+    records = VerdictLog.load(args.log, include_bulk=args.include_bulk)
+    model = fit_calibration(records, method=args.method, min_samples=args.min_samples,
+                            target_precision=args.target_precision)
+    calibrator = Calibrator(model)
+    calibrator.save(args.output)
+
+    print(f"Fitted {args.method} calibration on {model['global']['samples']} verdicts -> {args.output}")
+    for rule_id, entry in [("global", model["global"])] + sorted(model["rules"].items()):
+        print(f"  {rule_id:<10} n={entry['samples']:<5} base_rate={entry['base_rate']:.2f} thresholds={entry['thresholds']}")
+    print_report("Raw scores:", reliability(records))
+    print_report("Calibrated:", reliability(records, calibrator))
+    return 0
+
+
+def cmd_report(args) -> int:
+    records = VerdictLog.load(args.log, include_bulk=args.include_bulk)
+    calibrator = Calibrator.load(args.calibration) if args.calibration else None
+    report = reliability(records, calibrator, bins=args.bins)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report("Calibrated:" if calibrator else "Raw scores:", report)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fit and inspect confidence calibration from moderator decisions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit = subparsers.add_parser("fit", help="Fit per-rule calibrators from a verdict log")
+    fit.add_argument("--log", default="logs/verdicts.jsonl", help="Verdict log written by the moderation UI")
+    fit.add_argument("--output", "-o", default="calibration.json", help="Where to save the fitted calibration")
+    fit.add_argument("--method", choices=METHODS, default="isotonic")
+    fit.add_argument("--min-samples", type=int, default=30, help="Rules with fewer verdicts use the global calibrator")
+    fit.add_argument("--target-precision", type=parse_targets, default=dict(DEFAULT_TARGET_PRECISION),
+                     help="Precision each confidence level must reach, e.g. high=0.95,medium=0.8")
+    fit.add_argument("--include-bulk", action="store_true", help="Also fit on decisions made by bulk actions")
+    fit.set_defaults(func=cmd_fit)
+
+    report = subparsers.add_parser("report", help="Reliability diagram of raw or calibrated scores")
+    report.add_argument("--log", default="logs/verdicts.jsonl")
+    report.add_argument("--calibration", help="Calibration file to apply; raw scores when omitted")
+    report.add_argument("--bins", type=int, default=10)
+    report.add_argument("--json", action="store_true", help="Print the report as JSON")
+    report.add_argument("--include-bulk", action="store_true", help="Also include decisions made by bulk actions")
+    report.set_defaults(func=cmd_report)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+def save_checkpoint(path, state: Dict[str, Any]):
+    """Write the checkpoint atomically so a crash never leaves a half-written file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
@@ -3,6 +3,11 @@ import json
 
 from pathlib import Path
 
+from tracing import span
+
+PACKED_POSTS_FILE = "posts.jsonl"
+PACKED_INDEX_FILE = "posts.index.json"
+
 class DataLoader:
     def __init__(self, data_dir="data", subreddit_name=None, post_ids=None):
         self.data_dir = Path(data_dir)
@@ -11,6 +16,12 @@ class DataLoader:
         self.raw_data = None
 
     def load_raw_data(self):
+        with span("data.load_raw_data", subreddit=self.subreddit_name, post_ids=len(self.post_ids or [])) as load_span:
+            raw_data = self._load_raw_data()
+            load_span.set(posts=len(raw_data["posts"]))
+            return raw_data
+
+    def _load_raw_data(self):
         if self.subreddit_name:
             subreddit_dir = self.data_dir / self.subreddit_name
             if not subreddit_dir.exists() or not subreddit_dir.is_dir():
@@ -28,38 +39,11 @@ class DataLoader:
         with open(subreddit_dir / "rules.json", "r") as f:
             rules = json.load(f)
 
-        post_dirs = [d for d in subreddit_dir.iterdir() if d.is_dir()]
-        if not post_dirs:
-            raise FileNotFoundError(f"No post directories found in {subreddit_dir}")
-
-        if self.post_ids:
-            filtered_post_dirs = []
-            for post_dir in post_dirs:
-                post_file = post_dir / "post.json"
-                if post_file.exists():
-                    try:
-                        with open(post_file, "r") as f:
-                            post_data = json.load(f)
-
-                        post_id = post_data["data"].get("id", "")
-
-                        if post_id in self.post_ids:
-                            filtered_post_dirs.append(post_dir)
-                    except Exception as e:
-                        # print(f"Warning: Could not read post data from {post_file}: {e}")
-                        continue
-
-            if not filtered_post_dirs:
-                raise FileNotFoundError(f"No posts found with IDs {self.post_ids} in subreddit {self.subreddit_name}")
-            post_dirs = filtered_post_dirs
-
         posts = []
         all_comments = []
+        post_comments = {}
 
-        for post_dir in post_dirs:
-            with open(post_dir / "post.json", "r") as f:
-                post_data = json.load(f)
-
+        for post_data, comments_data in self._iter_post_records(subreddit_dir):
             post = {
                 "id": post_data["data"].get("id", ""),
                 "title": post_data["data"].get("title", ""),
@@ -67,11 +51,16 @@ class DataLoader:
             }
 
             comments = []
-            comments_file = post_dir / "comments.json"
-            if comments_file.exists():
-                with open(comments_file, "r") as f:
-                    comments_data = json.load(f)
-                    comments = [comment.get("body", "") for comment in comments_data if comment.get("body")]
+            if comments_data is not None:
+                comments = [comment.get("body", "") for comment in comments_data if comment.get("body")]
+                post_comments[post["id"]] = [
+                    {
+                        "id": comment.get("id", ""),
+                        "body": comment.get("body", ""),
+                        "author": comment.get("author", "")
+                    }
+                    for comment in comments_data if comment.get("body")
+                ]
 
             posts.append(post)
             all_comments.extend(comments)
@@ -81,12 +70,100 @@ class DataLoader:
             "subreddit_info": subreddit_info,
             "rules": rules,
             "posts": posts,
-            "comments": all_comments
+            "comments": all_comments,
+            "post_comments": post_comments
         }
 
         return self.raw_data
 
+    def _iter_post_records(self, subreddit_dir):
+        """Yield (post_data, comments_data) from either the packed file or one directory per post"""
+        packed_file = subreddit_dir / PACKED_POSTS_FILE
+        if packed_file.exists():
+            yield from self._iter_packed_records(subreddit_dir)
+            return
+
+        post_dirs = [d for d in subreddit_dir.iterdir() if d.is_dir()]
+        if not post_dirs:
+            raise FileNotFoundError(f"No post directories found in {subreddit_dir}")
+
+        records = []
+        for post_dir in post_dirs:
+            post_file = post_dir / "post.json"
+            try:
+                with open(post_file, "r") as f:
+                    post_data = json.load(f)
+            except Exception as e:
+                if self.post_ids:
+                    # print(f"Warning: Could not read post data from {post_file}: {e}")
+                    continue
+                raise
+
+            if self.post_ids and post_data["data"].get("id", "") not in self.post_ids:
+                continue
+            records.append((post_dir, post_data))
+
+        if self.post_ids and not records:
+            raise FileNotFoundError(f"No posts found with IDs {self.post_ids} in subreddit {self.subreddit_name}")
+
+        for post_dir, post_data in records:
+            comments_data = None
+            comments_file = post_dir / "comments.json"
+            if comments_file.exists():
+                with open(comments_file, "r") as f:
+                    comments_data = json.load(f)
+            yield post_data, comments_data
+
+    def _iter_packed_records(self, subreddit_dir):
+        # Packed layout: one JSON line per post, {"id", "post", "comments"}, plus an optional offset index
+        packed_file = subreddit_dir / PACKED_POSTS_FILE
+        index_file = subreddit_dir / PACKED_INDEX_FILE
+        found = 0
+
+        # Binary mode so the byte offsets from the index can be passed straight to seek()
+        with open(packed_file, "rb") as f:
+            if self.post_ids and index_file.exists():
+                with open(index_file, "r") as index_f:
+                    offsets = json.load(index_f)
+                lines = []
+                for post_id in self.post_ids:
+                    if post_id in offsets:
+                        f.seek(offsets[post_id])
+                        lines.append(f.readline())
+            else:
+                lines = f
+
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if self.post_ids and record["id"] not in self.post_ids:
+                    continue
+                found += 1
+                yield record["post"], record.get("comments")
+
+        if found == 0:
+            if self.post_ids:
+                raise FileNotFoundError(f"No posts found with IDs {self.post_ids} in subreddit {self.subreddit_name}")
+            raise FileNotFoundError(f"No posts found in {packed_file}")
+
+    def list_post_ids(self):
+        """Post ids available for the subreddit without loading post bodies where the layout allows it"""
+        subreddit_dir = self.data_dir / self.subreddit_name
+        index_file = subreddit_dir / PACKED_INDEX_FILE
+        if index_file.exists():
+            with open(index_file, "r") as f:
+                return list(json.load(f).keys())
+        if (subreddit_dir / PACKED_POSTS_FILE).exists():
+            with open(subreddit_dir / PACKED_POSTS_FILE, "r", encoding="utf-8") as f:
+                return [json.loads(line)["id"] for line in f if line.strip()]
+        return [d.name for d in subreddit_dir.iterdir() if d.is_dir() and d.name not in ['__pycache__']]
+
     def get_formatted_data(self):
+        with span("data.get_formatted_data", subreddit=self.subreddit_name, cached=self.raw_data is not None):
+            return self._format_data()
+
+    def _format_data(self):
         if self.raw_data is None:
             self.load_raw_data()
 
@@ -121,7 +198,8 @@ class DataLoader:
             "subreddit_info": self.raw_data["subreddit_info"],
             "rules": formatted_rules,
             "posts": self.raw_data["posts"],
-            "comments": self.raw_data["comments"]
+            "comments": self.raw_data["comments"],
+            "post_comments": self.raw_data["post_comments"]
         }
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+from data import DataLoader
+from agents.base_agent import usage_scope
+from agents.post_agent import MCPEnvelope, PostSpecificAgent, REVIEW_MODES, CONFIDENCE_MODES
+from agents.cascade import CascadeReviewAgent, CascadeConfig
+from agents.llm_backend import set_client_factory, create_backend_client
+from agents.response_cache import ResponseCache, CachingClient, cache_scope
+from agents.stats import percentile
+
+load_dotenv()
+
+# Posts in the Viol_ corpora are named after the zero-based index of the rule they break
+VIOLATION_POST_ID = re.compile(r"^violation_rule_(\d+)_")
+NONE = "none"
+# Resolved against the repository so evaluation runs from any working directory
+DEFAULT_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+
+def default_label(post_id: str) -> str:
+    """Expected rule_id for a post: rule_{N+1} for violation_rule_N_* posts, "none" for everything else"""
+    match = VIOLATION_POST_ID.match(post_id)
+    return f"rule_{int(match.group(1)) + 1}" if match else NONE
+
+
+class Evaluator:
+    """Runs labeled corpora through one reviewer configuration concurrently and scores the verdicts"""
+
+    def __init__(self, corpora: List[str], data_dir: str = DEFAULT_DATA_DIR, workers: int = 8, model: str = "gpt-4o-mini",
+                 review_mode: Optional[str] = None, confidence_mode: Optional[str] = None,
+                 cascade: Optional[str] = None, labels: Optional[Dict[str, Optional[str]]] = None,
+                 limit: Optional[int] = None):
+        self.corpora = corpora
+        self.data_dir = data_dir
+        self.workers = max(1, workers)
+        self.model = model
+        self.review_mode = review_mode
+        self.confidence_mode = confidence_mode
+        self.cascade = CascadeConfig.from_spec(cascade) if cascade is not None else None
+        self.labels = labels or {}
+        self.limit = limit
+        self.rule_ids: List[str] = []
+        self._local = threading.local()
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "review_mode": self.review_mode,
+            "confidence_mode": self.confidence_mode,
+            "cascade": vars(self.cascade) if self.cascade else None,
+            "corpora": self.corpora
+        }
+
+    def _get_agent(self) -> PostSpecificAgent:
+        if not hasattr(self._local, "agent"):
+            if self.cascade is not None:
+                self._local.agent = CascadeReviewAgent(model=self.model, review_mode=self.review_mode,
+                                                       config=self.cascade, confidence_mode=self.confidence_mode)
+            else:
+                self._local.agent = PostSpecificAgent(model=self.model, review_mode=self.review_mode,
+                                                      confidence_mode=self.confidence_mode)
+        return self._local.agent
+
+    def load_cases(self) -> List[Dict[str, Any]]:
+        cases = []
+        rule_ids = set()
+        for corpus in self.corpora:
+            data = DataLoader(data_dir=self.data_dir, subreddit_name=corpus).get_formatted_data()
+            rule_ids.update(rule["id"] for rule in data["rules"])
+            for post in data["posts"]:
+                expected = self.labels.get(post["id"], default_label(post["id"])) or NONE
+                cases.append({
+                    "key": f"{corpus}:{post['id']}",
+                    "subreddit": data["subreddit_name"],
+                    "rules": data["rules"],
+                    "post": post,
+                    "expected": expected
+                })
+        self.rule_ids = sorted(rule_ids, key=lambda rule_id: int(rule_id.rsplit("_", 1)[1]))
+        return cases[:self.limit] if self.limit is not None else cases
+
+    def evaluate_case(self, case: Dict[str, Any]) -> Dict[str, Any]:
+        mcp_envelope = MCPEnvelope(post=case["post"], subreddit=case["subreddit"], rules=case["rules"])
+        start = time.perf_counter()
+        with usage_scope() as usage, cache_scope() as cache:
+            result = self._get_agent().review(mcp_envelope)
+        latency = time.perf_counter() - start
+
+        if result.get("error"):
+            predicted = "error"
+        elif result.get("violation"):
+            predicted = result.get("rule_id") or "unknown"
+        else:
+            predicted = NONE
+        return {
+            "key": case["key"],
+            "expected": case["expected"],
+            "predicted": predicted,
+            "correct": predicted == case["expected"],
+            "confidence": result.get("confidence"),
+            "confidence_level": result.get("confidence_level"),
+            "review_tier": result.get("review_tier"),
+            "latency_ms": round(latency * 1000, 1),
+            "calls": usage["calls"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "cost_usd": usage["cost_usd"],
+            "cache_hits": cache["hits"]
+        }
+
+    def run(self) -> Dict[str, Any]:
+        cases = self.load_cases()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            records = list(executor.map(self.evaluate_case, cases))
+        elapsed = time.perf_counter() - start
+        return build_report(records, self.rule_ids, elapsed, self.config())
+
+
+def score(records: List[Dict[str, Any]], rule_ids: List[str]) -> Dict[str, Any]:
+    """Per-rule precision/recall/F1, violation detection, accuracy and the expected -> predicted confusion"""
+    confusion: Dict[str, Dict[str, int]] = {}
+    for record in records:
+        row = confusion.setdefault(record["expected"], {})
+        row[record["predicted"]] = row.get(record["predicted"], 0) + 1
+
+    labels = list(rule_ids) + sorted({r["expected"] for r in records} - set(rule_ids) - {NONE})
+    per_rule = {}
+    for label in labels + [NONE]:
+        tp = sum(1 for r in records if r["expected"] == label and r["predicted"] == label)
+        fp = sum(1 for r in records if r["expected"] != label and r["predicted"] == label)
+        fn = sum(1 for r in records if r["expected"] == label and r["predicted"] != label)
+        if tp + fp + fn == 0:
+            continue
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        per_rule[label] = {
+            "support": tp + fn,
+            "tp": tp, "fp": fp, "fn": fn,
+            "precision": round(precision, 3),
+            "recall": round(recall, 3),
+            "f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0
+        }
+
+    # Violation detection regardless of which rule was named
+    flagged = [r for r in records if r["predicted"] not in (NONE, "error")]
+    violating = [r for r in records if r["expected"] != NONE]
+    detected = sum(1 for r in flagged if r["expected"] != NONE)
+    rule_f1 = [stats["f1"] for label, stats in per_rule.items() if label != NONE]
+    return {
+        "accuracy": round(sum(1 for r in records if r["correct"]) / len(records), 3) if records else 0.0,
+        "detection": {
+            "precision": round(detected / len(flagged), 3) if flagged else 0.0,
+            "recall": round(detected / len(violating), 3) if violating else 0.0,
+            "false_positives": len(flagged) - detected
+        },
+        "macro_f1": round(sum(rule_f1) / len(rule_f1), 3) if rule_f1 else 0.0,
+        "per_rule": per_rule,
+        "confusion": confusion
+    }
+
+
+def build_report(records: List[Dict[str, Any]], rule_ids: List[str], elapsed: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = sorted(r["latency_ms"] for r in records)
+    uncached = sorted(r["latency_ms"] for r in records if not r["cache_hits"])
+    tokens = {key: sum(r[key] for r in records) for key in ("calls", "prompt_tokens", "completion_tokens")}
+    cost = sum(r["cost_usd"] for r in records)
+    return {
+        "config": config,
+        "cases": len(records),
+        "errors": sum(1 for r in records if r["predicted"] == "error"),
+        "quality": score(records, rule_ids),
+        "performance": {
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(records) / elapsed, 3) if elapsed > 0 else 0.0,
+            # Cache hits return instantly, so uncached percentiles are the ones to compare across configurations
+            "latency_ms": {"p50": percentile(latencies, 50), "p90": percentile(latencies, 90), "max": latencies[-1] if latencies else 0.0},
+            "uncached_latency_ms": {"p50": percentile(uncached, 50), "p90": percentile(uncached, 90), "cases": len(uncached)},
+            "tokens": tokens,
+            "tokens_per_case": round((tokens["prompt_tokens"] + tokens["completion_tokens"]) / len(records), 1) if records else 0.0,
+            "cost_usd": round(cost, 6),
+            "cost_per_1k_cases_usd": round(cost / len(records) * 1000, 4) if records else 0.0
+        },
+        "records": records
+    }
+
+
+def print_report(report: Dict[str, Any], stream=sys.stdout):
+    quality, performance = report["quality"], report["performance"]
+    detection = quality["detection"]
+    print(f"Cases: {report['cases']} ({report['errors']} errors), accuracy {quality['accuracy']:.3f}, macro F1 {quality['macro_f1']:.3f}", file=stream)
+    print(f"Detection: precision {detection['precision']:.3f} recall {detection['recall']:.3f} "
+          f"false positives {detection['false_positives']}", file=stream)
+    print(f"{'label':<10} {'n':>4} {'prec':>6} {'rec':>6} {'f1':>6}  confused with", file=stream)
+    for label, stats in quality["per_rule"].items():
+        row = quality["confusion"].get(label, {})
+        confused = ", ".join(f"{predicted}×{count}" for predicted, count in sorted(row.items(), key=lambda item: -item[1]) if predicted != label)
+        print(f"{label:<10} {stats['support']:>4} {stats['precision']:>6.3f} {stats['recall']:>6.3f} {stats['f1']:>6.3f}  {confused}", file=stream)
+    latency, uncached, tokens = performance["latency_ms"], performance["uncached_latency_ms"], performance["tokens"]
+    print(f"Elapsed {performance['elapsed_s']:.1f}s, {performance['throughput_per_s']:.2f} cases/s; latency ms p50={latency['p50']:.0f} "
+          f"p90={latency['p90']:.0f}, uncached p50={uncached['p50']:.0f} p90={uncached['p90']:.0f} ({uncached['cases']} cases)", file=stream)
+    print(f"Tokens: {tokens['prompt_tokens']} prompt + {tokens['completion_tokens']} completion over {tokens['calls']} calls "
+          f"({performance['tokens_per_case']:.0f}/case), ${performance['cost_usd']:.4f} (${performance['cost_per_1k_cases_usd']:.3f} per 1k cases)", file=stream)
+    if report.get("cache"):
+        cache = report["cache"]
+        print(f"Response cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%})", file=stream)
+
+
+def print_comparison(reports: List[Dict[str, Any]], names: List[str], stream=sys.stdout):
+    print(f"{'report':<28} {'acc':>6} {'macroF1':>8} {'det.P':>6} {'det.R':>6} {'p50ms':>7} {'tok/case':>9} {'$/1k':>8}", file=stream)
+    for name, report in zip(names, reports):
+        quality, performance = report["quality"], report["performance"]
+        print(f"{name[-28:]:<28} {quality['accuracy']:>6.3f} {quality['macro_f1']:>8.3f} {quality['detection']['precision']:>6.3f} "
+              f"{quality['detection']['recall']:>6.3f} {performance['uncached_latency_ms']['p50']:>7.0f} "
+              f"{performance['tokens_per_case']:>9.0f} {performance['cost_per_1k_cases_usd']:>8.3f}", file=stream)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score a reviewer configuration on labeled corpora: per-rule quality, latency and cost")
+    parser.add_argument("corpora", nargs="*", default=["Viol_AskHistorians", "AskHistorians"],
+                        help="Subreddit directories; violation_rule_N_* posts are labeled rule_{N+1}, the rest clean")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--review-mode", choices=REVIEW_MODES)
+    parser.add_argument("--confidence-mode", choices=CONFIDENCE_MODES)
+    parser.add_argument("--cascade", help="Review through the cascade with these options (\"\" for defaults)")
+    parser.add_argument("--labels", help="JSON object of post_id -> expected rule_id (null for clean) overriding the defaults")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--cache", default=".eval_cache.jsonl", help="Response cache shared across runs")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--output", "-o", help="Write the full report, including per-case records, as JSON")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT", help="Compare saved reports instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r") as f:
+                reports.append(json.load(f))
+        print_comparison(reports, args.compare)
+        return 0
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache)
+        set_client_factory(lambda: CachingClient(create_backend_client(), cache))
+
+    labels = None
+    if args.labels:
+        with open(args.labels, "r") as f:
+            labels = json.load(f)
+
+    evaluator = Evaluator(
+        corpora=args.corpora,
+        data_dir=args.data_dir,
+        workers=args.workers,
+        model=args.model,
+        review_mode=args.review_mode,
+        confidence_mode=args.confidence_mode,
+        cascade=args.cascade,
+        labels=labels,
+        limit=args.limit
+    )
+    try:
+        report = evaluator.run()
+    finally:
+        set_client_factory(None)
+    if cache is not None:
+        report["cache"] = cache.get_stats()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
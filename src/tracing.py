@@ -0,0 +1,178 @@
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable
+
+# Set to "0" to turn tracing off; MOD_AGENT_TRACE_FILE appends every finished span to a JSONL file
+TRACE_ENV = "MOD_AGENT_TRACE"
+TRACE_FILE_ENV = "MOD_AGENT_TRACE_FILE"
+TRACE_BUFFER_ENV = "MOD_AGENT_TRACE_BUFFER"
+
+MESSAGE_SPANS = ("tui.message", "orchestrator.process_message")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "start_perf", "duration_ms",
+                 "thread", "error", "_token", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.span_id = next(_ids)
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.start_perf = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.error: Optional[str] = None
+        self._tracer = tracer
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self.start_perf) * 1000
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self._tracer.record(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "thread": self.thread,
+            "error": self.error,
+            "attrs": self.attrs
+        }
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self, capacity: int = 5000, export_path: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.spans = deque(maxlen=capacity)
+        self.export_path = export_path
+        self._export_file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        return cls(
+            capacity=int(os.getenv(TRACE_BUFFER_ENV, "5000")),
+            export_path=os.getenv(TRACE_FILE_ENV) or None,
+            enabled=os.getenv(TRACE_ENV, "1") != "0"
+        )
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, _current_span.get(), attrs)
+
+    def record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            if self.export_path:
+                try:
+                    if self._export_file is None:
+                        self._export_file = open(self.export_path, "a")
+                    self._export_file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                    self._export_file.flush()
+                except OSError:
+                    # Tracing must never break the app; stop exporting if the file becomes unwritable
+                    self.export_path = None
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def recent_traces(self, n: int = 1, roots: Iterable[str] = MESSAGE_SPANS) -> List[List[Span]]:
+        """Spans of the last n traces whose root span is one of `roots`, oldest first"""
+        roots = set(roots)
+        with self._lock:
+            spans = list(self.spans)
+
+        root_ids = [span.span_id for span in spans if span.parent_id is None and span.name in roots][-n:]
+        by_trace = {trace_id: [] for trace_id in root_ids}
+        for span in spans:
+            if span.trace_id in by_trace:
+                by_trace[span.trace_id].append(span)
+        return [sorted(by_trace[trace_id], key=lambda span: span.start_perf) for trace_id in root_ids]
+
+
+def format_waterfall(trace: List[Span], width: int = 28, label_width: int = 36) -> List[str]:
+    """Text waterfall: one line per span, indented by depth, with a bar placed on the root's timeline"""
+    if not trace:
+        return []
+    root = next((span for span in trace if span.parent_id is None), trace[0])
+    total_ms = max(root.duration_ms or 0.0, 0.001)
+    depths = {root.span_id: 0}
+
+    lines = [f"{root.name} {root.attrs.get('message', '')!s:.40} — {total_ms:.0f} ms"]
+    for span in trace:
+        depth = depths.get(span.parent_id, -1) + 1 if span.span_id != root.span_id else 0
+        depths[span.span_id] = depth
+        offset_ms = (span.start_perf - root.start_perf) * 1000
+        duration_ms = span.duration_ms or 0.0
+
+        start_col = min(width - 1, int(offset_ms / total_ms * width))
+        bar_len = max(1, min(width - start_col, int(round(duration_ms / total_ms * width))))
+        bar = " " * start_col + "█" * bar_len + " " * (width - start_col - bar_len)
+
+        detail = span.attrs.get("agent") or span.attrs.get("event") or span.attrs.get("intent") or ""
+        label = ("  " * depth + span.name + (f" [{detail}]" if detail else ""))[:label_width]
+        error = " !" if span.error else ""
+        lines.append(f"{label:<{label_width}} |{bar}| {offset_ms:6.0f} +{duration_ms:5.0f} ms{error}")
+    return lines
+
+
+_tracer = Tracer.from_env()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, **attrs):
+    """Context manager recording a span as a child of the current one, e.g. `with span("review", post_id=pid):`"""
+    return _tracer.span(name, **attrs)
+
+
+def current_span():
+    return _current_span.get()
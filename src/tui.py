@@ -1,13 +1,20 @@
 import npyscreen
 import threading
 import time
+import curses
 import curses.ascii
+from typing import Dict, Any, List, Optional
 from agents.meta_agent import MetaChatAgent
-from agents.post_agent import PostSpecificAgent
+from agents.sessions import SessionManager
+from agents.cascade import create_review_agent
+from agents.post_agent import moderation_review_mode
 from agents.override_rules_extraction import OverrideRuleExtractor
 from agents.base_agent import EventBus
+from agents.usage import get_usage_tracker
+from agents.dispatch import get_dispatcher
 from background_processor import BackgroundProcessor, EventProcessor
 from data import DataLoader
+from tracing import span, get_tracer, format_waterfall
 
 class ChatInput(npyscreen.Textfield):
     def __init__(self, screen, parent_form, *args, **kwargs):
@@ -27,19 +34,141 @@ class ChatInput(npyscreen.Textfield):
         self.parent_form.handle_message_send()
         return True
 
-class SelectablePostList(npyscreen.BoxTitle):
-    _contained_widget = npyscreen.MultiLineAction
+class PostListStore:
+    """Indexed backing store for a post panel. Rows are only formatted for the visible window."""
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._posts: Dict[str, Dict[str, Any]] = {}
+        self.version: Optional[int] = None
+
+    def sync(self, posts: List[Dict[str, Any]], version: Optional[int] = None):
+        # Store snapshots are immutable, so an unchanged version means there is nothing to re-index
+        if version is not None and version == self.version:
+            return
+        self.version = version
+        self._posts = {post["id"]: post for post in posts}
+        self._ids = list(self._posts.keys())
+        self._positions = {post_id: idx for idx, post_id in enumerate(self._ids)}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self._positions
+
+    def index_of(self, post_id: str) -> Optional[int]:
+        return self._positions.get(post_id)
+
+    def window(self, start: int, count: int) -> List[Dict[str, Any]]:
+        return [self._posts[post_id] for post_id in self._ids[start:start + count]]
+
+
+class VirtualPostLines(npyscreen.MultiLineAction):
+    def set_up_handlers(self):
+        super().set_up_handlers()
+        self.handlers.update({
+            curses.KEY_UP: self.h_virtual_line_up,
+            ord('k'): self.h_virtual_line_up,
+            curses.KEY_DOWN: self.h_virtual_line_down,
+            ord('j'): self.h_virtual_line_down,
+            curses.KEY_NPAGE: self.h_virtual_page_down,
+            curses.KEY_PPAGE: self.h_virtual_page_up,
+            curses.KEY_HOME: self.h_virtual_first,
+            ord('g'): self.h_virtual_first,
+            curses.KEY_END: self.h_virtual_last,
+            ord('G'): self.h_virtual_last,
+        })
+
+    def h_virtual_line_up(self, ch):
+        if self.cursor_line > 0:
+            self.cursor_line -= 1
+        elif self.post_list.offset > 0:
+            self.post_list.scroll_to(self.post_list.offset - 1, cursor_line=0)
+        elif self.scroll_exit:
+            self.h_exit_up(ch)
+
+    def h_virtual_line_down(self, ch):
+        if self.cursor_line < len(self.values) - 1:
+            self.cursor_line += 1
+        elif self.post_list.offset + len(self.values) < len(self.post_list.store):
+            self.post_list.scroll_to(self.post_list.offset + 1, cursor_line=self.cursor_line)
+        elif self.scroll_exit:
+            self.h_exit_down(ch)
+
+    def h_virtual_page_down(self, ch):
+        self.post_list.scroll_to(self.post_list.offset + self.post_list.page_size, cursor_line=0)
+
+    def h_virtual_page_up(self, ch):
+        self.post_list.scroll_to(self.post_list.offset - self.post_list.page_size, cursor_line=0)
+
+    def h_virtual_first(self, ch):
+        self.post_list.scroll_to(0, cursor_line=0)
+
+    def h_virtual_last(self, ch):
+        self.post_list.scroll_to(len(self.post_list.store), cursor_line=self.post_list.page_size - 1)
+
+
+class VirtualPostList(npyscreen.BoxTitle):
+    _contained_widget = VirtualPostLines
 
     def __init__(self, screen, parent_form, *args, **kwargs):
         self.parent_form = parent_form
+        self.store = PostListStore()
+        self.offset = 0
+        self.selected_post_id: Optional[str] = None
+        self._visible_ids: List[str] = []
         super().__init__(screen, *args, **kwargs)
         self.entry_widget.parent_form = parent_form
+        self.entry_widget.post_list = self
         self.entry_widget.actionHighlighted = self.actionHighlighted
 
+    @property
+    def page_size(self) -> int:
+        return max(1, self.entry_widget.height)
+
+    def set_posts(self, posts: List[Dict[str, Any]], selected_post_id: Optional[str], version: Optional[int] = None):
+        self.store.sync(posts, version)
+        self.selected_post_id = selected_post_id
+        self.scroll_to(self.offset, cursor_line=self.entry_widget.cursor_line)
+
+    def scroll_to(self, offset: int, cursor_line: int = 0):
+        # Clamp so the last page is always full when there are enough posts
+        self.offset = max(0, min(offset, len(self.store) - self.page_size))
+        self._render_window()
+        self.entry_widget.start_display_at = 0
+        self.entry_widget.cursor_line = max(0, min(cursor_line, len(self._visible_ids) - 1))
+
+    def jump_to(self, post_id: str) -> bool:
+        index = self.store.index_of(post_id)
+        if index is None:
+            return False
+        self.scroll_to(index - index % self.page_size)
+        self.entry_widget.cursor_line = index - self.offset
+        return True
+
+    def _render_window(self):
+        visible_posts = self.store.window(self.offset, self.page_size)
+        self._visible_ids = [post["id"] for post in visible_posts]
+        rows = []
+        for post in visible_posts:
+            icon = "► " if post["id"] == self.selected_post_id else "  "
+            # Parked: the review failed and will be retried; there is no verdict to act on yet
+            pending = "[retry] " if post.get("review_pending") else ""
+            rows.append(f"{icon}{post['id']} | {pending}{post.get('title', '')[:35]}")
+        self.values = rows
+
+        total = len(self.store)
+        if total > self.page_size:
+            self.footer = f"{self.offset + 1}-{self.offset + len(rows)} of {total}"
+        else:
+            self.footer = None
+
     def actionHighlighted(self, act_on_this, key_press):
-        if act_on_this and len(act_on_this) > 0:
-            post_id = act_on_this.split(' | ')[0].replace('► ', '').replace('  ', '')
-            self.parent_form.select_post(post_id)
+        cursor_line = self.entry_widget.cursor_line
+        if 0 <= cursor_line < len(self._visible_ids):
+            self.parent_form.select_post(self._visible_ids[cursor_line])
 
 class MainForm(npyscreen.FormBaseNew):
     def __init__(self, *args, **kwargs):
@@ -55,7 +184,15 @@ class MainForm(npyscreen.FormBaseNew):
             self.event_bus.subscribe("tool_executed", self._handle_tool_executed)
             self.event_bus.subscribe("post_approved", self._handle_post_action)
             self.event_bus.subscribe("post_rejected", self._handle_post_action)
-            self.event_bus.subscribe("rule_extracted", self._handle_rule_extracted)
+            self.event_bus.subscribe("posts_bulk_moderated", self._handle_post_action)
+            self.event_bus.subscribe("usage_budget_alert", self._handle_usage_alert)
+            self.event_bus.subscribe("llm_circuit_changed", self._handle_circuit_changed)
+            self.event_bus.subscribe("parked_reviews_resolved", self._handle_post_action)
+            self.event_bus.subscribe("background_processor_resumed", self._handle_background_resumed)
+        if self.meta_agent:
+            # Session events stay on the moderator session's own bus (the hub's bus for a plain MetaChatAgent)
+            self.meta_agent.event_bus.subscribe("rule_extracted", self._handle_rule_extracted)
+            self.meta_agent.event_bus.subscribe("post_claim_denied", self._handle_post_claim_denied)
 
     def create(self):
         self.name = "Reddit Moderation Agent"
@@ -67,15 +204,16 @@ class MainForm(npyscreen.FormBaseNew):
         self.add(npyscreen.FixedText, value="Message (ENTER to send):", relx=2, rely=43, editable=False)
         self.add(npyscreen.FixedText, value=">", relx=2, rely=44, editable=False)
         self.input_field = self.add(ChatInput, parent_form=self, relx=4, rely=44, max_width=98)
+        self.usage_status = self.add(npyscreen.FixedText, value=get_usage_tracker().status_line(), relx=2, rely=46, max_width=148, editable=False)
 
         # Store reference for setting focus
         self.input_field_index = len(self._widgets__) - 1
 
         # Todo list - right pane, 45 columns wide (now selectable)
-        self.todo_box = self.add(SelectablePostList, parent_form=self, name="Posts Requiring Attention (ENTER to select)", relx=105, rely=2, max_width=45, max_height=20, scroll_exit=True)
+        self.todo_box = self.add(VirtualPostList, parent_form=self, name="Posts Requiring Attention (ENTER to select)", relx=105, rely=2, max_width=45, max_height=20, scroll_exit=True)
 
         # Approved list - right pane, 45 columns wide (now also selectable)
-        self.approved_box = self.add(SelectablePostList, parent_form=self, name="Auto Approved Posts (ENTER to select)", relx=105, rely=23, max_width=45, max_height=20, scroll_exit=True)
+        self.approved_box = self.add(VirtualPostList, parent_form=self, name="Auto Approved Posts (ENTER to select)", relx=105, rely=23, max_width=45, max_height=20, scroll_exit=True)
 
         self.add_chat_message("Hello, these posts require your attention.")
         self.update_post_panels()
@@ -89,7 +227,9 @@ class MainForm(npyscreen.FormBaseNew):
 
     def select_post(self, post_id):
         if self.meta_agent:
-            self.meta_agent.select_post(post_id)
+            if self.meta_agent.select_post(post_id) is False:
+                # Claimed by another session; _handle_post_claim_denied reports it
+                return
             if self.meta_agent.selected_post_id == post_id:
                 self.add_chat_message(f"Selected post: {post_id}")
             else:
@@ -107,19 +247,45 @@ class MainForm(npyscreen.FormBaseNew):
                 self.parentApp.setNextForm(None)
                 return
 
+            if user_input.startswith("/goto"):
+                parts = user_input.split(maxsplit=1)
+                if len(parts) == 2:
+                    self.jump_to_post(parts[1].strip())
+                else:
+                    self.add_chat_message("Usage: /goto <post_id>")
+                self.input_field.value = ""
+                self.input_field.display()
+                return
+
+            if user_input == "/usage":
+                self.show_usage()
+                self.input_field.value = ""
+                self.input_field.display()
+                return
+
+            if user_input.startswith("/trace"):
+                parts = user_input.split()
+                count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+                self.show_traces(count)
+                self.input_field.value = ""
+                self.input_field.display()
+                return
+
             self.add_chat_message(f"You: {user_input}")
 
-            try:
-                loader = self.data_loader_factory()
-                result = self.meta_agent.interact(user_input, loader)
+            with span("tui.message", message=user_input[:80]):
+                try:
+                    loader = self.data_loader_factory()
+                    result = self.meta_agent.interact(user_input, loader)
 
-                self.update_post_panels()
+                    self.update_post_panels()
 
-                # Format and display agent response
-                self._display_agent_response(result, user_input)
+                    # Format and display agent response
+                    with span("tui.display_response"):
+                        self._display_agent_response(result, user_input)
 
-            except Exception as e:
-                self.add_chat_message(f"Agent: Error processing request: {str(e)}")
+                except Exception as e:
+                    self.add_chat_message(f"Agent: Error processing request: {str(e)}")
 
             self.input_field.value = ""
             self.input_field.display()
@@ -131,7 +297,21 @@ class MainForm(npyscreen.FormBaseNew):
         message = result.get("message", "")
 
         # Handle different response types
-        if response_type == "moderation_action":
+        if response_type == "moderation_action" and result.get("bulk"):
+            self.add_chat_message(f"✓ {message}")
+            post_ids = result.get("post_ids", [])
+            if post_ids:
+                shown = ", ".join(post_ids[:5])
+                self.add_chat_message(f"  {shown}" + (f" and {len(post_ids) - 5} more" if len(post_ids) > 5 else ""))
+
+        elif response_type == "confirmation":
+            self.add_chat_message(f"? {message}")
+            post_ids = result.get("post_ids", [])
+            if post_ids:
+                shown = ", ".join(post_ids[:5])
+                self.add_chat_message(f"  {shown}" + (f" and {len(post_ids) - 5} more" if len(post_ids) > 5 else ""))
+
+        elif response_type == "moderation_action":
             action = result.get("action", "unknown")
             post_id = result.get("post_id", "")
             self.add_chat_message(f"✓ Action: {action.title()} post {post_id}")
@@ -227,34 +407,73 @@ class MainForm(npyscreen.FormBaseNew):
             except:
                 pass
 
+    def show_traces(self, count):
+        traces = get_tracer().recent_traces(count)
+        if not traces:
+            self.add_chat_message("Trace: no traced messages yet")
+            return
+        for trace in traces:
+            lines = format_waterfall(trace)
+            # Auto-review traces have a span per post; keep the chat window readable
+            if len(lines) > 40:
+                lines = lines[:40] + [f"... {len(lines) - 40} more spans"]
+            self.add_chat_message("\n".join(lines))
+
+    def show_usage(self):
+        summary = self.meta_agent.get_usage_summary(top_posts=5)
+        lines = [get_usage_tracker().status_line()]
+        for dimension in ("agent", "model", "subreddit"):
+            for key, bucket in sorted(summary[f"by_{dimension}"].items(), key=lambda item: -item[1]["cost_usd"]):
+                lines.append(f"  {dimension} {key}: {bucket['calls']} calls, {bucket['prompt_tokens']}+{bucket['completion_tokens']} tokens, ${bucket['cost_usd']:.4f}")
+        messages = summary["messages"]
+        lines.append(f"  chat: {messages['messages']} messages, {messages['avg_tokens']:.0f} tokens/message")
+        lines.append(f"  posts: {summary['posts']['tracked']} tracked, {summary['posts']['avg_tokens']:.0f} tokens/post")
+        for lane, stats in get_dispatcher().get_stats()["lanes"].items():
+            if stats["requests"]:
+                lines.append(f"  {lane} lane: {stats['requests']} requests, wait p50 {stats['p50_wait_ms']:.0f}ms / p95 {stats['p95_wait_ms']:.0f}ms")
+        self.add_chat_message("\n".join(lines))
+
+    def update_usage_status(self):
+        try:
+            self.usage_status.value = get_usage_tracker().status_line()
+            self.usage_status.display()
+        except (IndexError, AttributeError):
+            pass
+
     def update_post_panels(self):
         if not self.meta_agent:
             return
 
+        with span("tui.update_post_panels"):
+            self._update_post_panels()
+        self.update_usage_status()
+
+    def _update_post_panels(self):
         summary = self.meta_agent.get_posts_summary()
 
         try:
-            todo_values = []
-            for post in summary['todo_posts']:
-                icon = "► " if post['id'] == summary['selected_post_id'] else "  "
-                todo_values.append(f"{icon}{post['id']} | {post['title'][:35]}")
-            self.todo_box.values = todo_values
+            self.todo_box.set_posts(summary['todo_posts'], summary['selected_post_id'], summary.get('version'))
             self.todo_box.display()
         except (IndexError, AttributeError):
             # Skip update if display fails
             pass
 
         try:
-            approved_values = []
-            for post in summary['approved_posts']:
-                icon = "► " if post['id'] == summary['selected_post_id'] else "  "
-                approved_values.append(f"{icon}{post['id']} | {post['title'][:35]}")
-            self.approved_box.values = approved_values
+            self.approved_box.set_posts(summary['approved_posts'], summary['selected_post_id'], summary.get('version'))
             self.approved_box.display()
         except (IndexError, AttributeError):
             # Skip update if display fails
             pass
 
+    def jump_to_post(self, post_id):
+        for post_box in (self.todo_box, self.approved_box):
+            if post_box.jump_to(post_id):
+                post_box.display()
+                self.select_post(post_id)
+                return True
+        self.add_chat_message(f"Post {post_id} not found in the post panels")
+        return False
+
     def force_ui_refresh(self):
         try:
             self.update_post_panels()
@@ -285,8 +504,27 @@ class MainForm(npyscreen.FormBaseNew):
         if rule:
             self.add_chat_message(f"🔧 Override: {rule}")
 
+    def _handle_post_claim_denied(self, data):
+        holder = data.get("holder")
+        by = f" (session {holder})" if holder else ""
+        self.add_chat_message(f"⛔ Post {data.get('post_id')} is being handled by another moderator{by}")
+
+    def _handle_usage_alert(self, data):
+        verb = "exceeded" if data.get("level") == "exceeded" else "nearly reached"
+        self.add_chat_message(f"⚠ Usage budget {data.get('budget')} {verb}: {data.get('value')} of {data.get('limit')} ({data.get('window')})")
+
+    def _handle_background_resumed(self, data):
+        self.update_post_panels()
+        self.add_chat_message(f"Resumed background review: {data.get('restored', 0)} verdicts restored, {data.get('queued', 0)} posts queued")
+
+    def _handle_circuit_changed(self, data):
+        if data.get("new_state") == "open":
+            self.add_chat_message(f"⚠ LLM {data.get('model')} is failing; new reviews are parked until it recovers")
+        elif data.get("new_state") == "closed":
+            self.add_chat_message(f"✅ LLM {data.get('model')} recovered; parked reviews will be retried")
+
     def while_waiting(self):
-        pass
+        self.update_usage_status()
 
 
 class MetaChatTUI(npyscreen.NPSAppManaged):
@@ -312,17 +550,21 @@ def mock_data_loader_factory():
 def main():
     event_bus = EventBus()
 
-    post_agent = PostSpecificAgent()
+    post_agent = create_review_agent(review_mode=moderation_review_mode())
     override_rule_extractor = OverrideRuleExtractor(event_bus=event_bus)
 
-    meta_agent = MetaChatAgent(
+    hub = MetaChatAgent(
         post_agent=post_agent,
         override_rule_extractor=override_rule_extractor,
         event_bus=event_bus
     )
+    # The moderator works in a session over the hub's verdict store, so "Auto check posts" from the
+    # background processor never shares a conversation or selection with them
+    sessions = SessionManager(hub)
+    session = sessions.create_session()
 
     background_processor = BackgroundProcessor(
-        meta_agent=meta_agent,
+        meta_agent=hub,
         subreddits=["AskHistorians"],
         event_bus=event_bus,
         interval=5,
@@ -330,12 +572,14 @@ def main():
     )
 
     event_processor = EventProcessor(event_bus)
-    app = MetaChatTUI(meta_agent, mock_data_loader_factory, event_bus, background_processor)
+    app = MetaChatTUI(session, mock_data_loader_factory, event_bus, background_processor)
 
     try:
         app.run()
     finally:
         background_processor.stop()
+        sessions.close_session(session.session_id)
+        hub.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+import os
+
+# Never reach a real LLM or write history files from tests
+os.environ.setdefault("MOD_AGENT_LLM_BACKEND", "fake")
+os.environ.setdefault("MOD_AGENT_HISTORY_DIR", "")
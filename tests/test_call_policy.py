@@ -0,0 +1,158 @@
+import openai
+import pytest
+
+from agents import call_policy
+from agents.call_policy import (CLOSED, OPEN, HALF_OPEN, CallPolicy, CircuitBreaker, CircuitOpenError,
+                                add_breaker_listener, remove_breaker_listener, call_with_policy)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def transitions():
+    seen = []
+    listener = lambda name, old_state, new_state: seen.append((name, old_state, new_state))
+    add_breaker_listener(listener)
+    yield seen
+    remove_breaker_listener(listener)
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(window=4, min_calls=4, error_rate=0.5, cooldown=10.0)
+    options.update(kwargs)
+    return CircuitBreaker("test-model", clock=clock, **options)
+
+
+def test_breaker_stays_closed_below_min_calls():
+    breaker = make_breaker(FakeClock())
+    for _ in range(3):
+        breaker.allow()
+        breaker.record(False)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_on_error_rate_and_short_circuits(transitions):
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for success in (True, True, False, False):
+        breaker.allow()
+        breaker.record(success)
+    assert breaker.state == OPEN
+    assert transitions == [("test-model", CLOSED, OPEN)]
+
+    clock.now = 5.0
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.allow()
+    assert error.value.retry_in == pytest.approx(5.0)
+    assert breaker.is_open()
+    assert breaker.get_stats()["short_circuited"] == 1
+
+
+def test_breaker_half_open_lets_one_probe_through(transitions):
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(False)
+    clock.now = 10.0
+
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert transitions[-2:] == [("test-model", OPEN, HALF_OPEN), ("test-model", HALF_OPEN, CLOSED)]
+    breaker.allow()
+
+
+def test_failed_probe_reopens_for_a_full_cooldown():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(False)
+    clock.now = 10.0
+    breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.opened_at == 10.0
+    clock.now = 19.0
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.get_stats()["opened"] == 2
+
+
+def test_call_with_policy_retries_transient_errors():
+    breaker = make_breaker(FakeClock(), min_calls=100)
+    sleeps = []
+    attempts = []
+
+    def call(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    policy = CallPolicy(timeout=5.0, deadline=60.0, max_retries=3, backoff_base=0.01, backoff_max=0.01)
+    assert call_with_policy(call, policy, breaker, sleep=sleeps.append) == "ok"
+    assert len(attempts) == 3 and len(sleeps) == 2
+    assert all(timeout <= 5.0 for timeout in attempts)
+    stats = breaker.get_stats()
+    assert (stats["calls"], stats["failures"], stats["retries"]) == (3, 2, 2)
+
+
+def test_call_with_policy_gives_up_after_max_retries():
+    breaker = make_breaker(FakeClock(), min_calls=100)
+    sleeps = []
+
+    def call(timeout):
+        raise TimeoutError("slow")
+
+    policy = CallPolicy(max_retries=2, backoff_base=0.01, backoff_max=0.01)
+    with pytest.raises(TimeoutError):
+        call_with_policy(call, policy, breaker, sleep=sleeps.append)
+    assert len(sleeps) == 2
+
+
+def test_call_with_policy_does_not_retry_or_count_client_errors():
+    breaker = make_breaker(FakeClock(), min_calls=1)
+    calls = []
+
+    def call(timeout):
+        calls.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_policy(call, CallPolicy(), breaker, sleep=lambda delay: None)
+    assert len(calls) == 1
+    assert breaker.state == CLOSED
+
+
+def test_call_with_policy_fails_fast_while_open():
+    breaker = make_breaker(FakeClock())
+    for _ in range(4):
+        breaker.record(False)
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        call_with_policy(calls.append, CallPolicy(), breaker, sleep=lambda delay: None)
+    assert calls == []
+
+
+def test_policy_spec_agent_overrides_win():
+    policy = CallPolicy.from_spec("ConfidenceRuleAgent.timeout=5,timeout=30,max_retries=1", agent="ConfidenceRuleAgent")
+    assert (policy.timeout, policy.max_retries) == (5.0, 1)
+    assert CallPolicy.from_spec("ConfidenceRuleAgent.timeout=5,timeout=30").timeout == 30.0
+    with pytest.raises(ValueError):
+        CallPolicy.from_spec("bogus=1")
+
+
+def test_retryable_errors():
+    assert call_policy.is_retryable(TimeoutError())
+    assert call_policy.is_retryable(openai.APIConnectionError(request=None))
+    assert not call_policy.is_retryable(ValueError())
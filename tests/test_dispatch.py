@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from agents import dispatch
+from agents.dispatch import DispatchConfig, DispatchTimeout, LLMDispatcher, _Ticket, current_lane, dispatch_lane
+
+
+def make_dispatcher(max_concurrency: int = 1, **reservations) -> LLMDispatcher:
+    options = dict(reserve_interactive=0, reserve_re_review=0, reserve_background=0, aging_s=0)
+    options.update(reservations)
+    return LLMDispatcher(DispatchConfig(max_concurrency=max_concurrency, **options))
+
+
+def enqueue(dispatcher: LLMDispatcher, lane: str) -> _Ticket:
+    """Queue a ticket without blocking on it, the way acquire() does"""
+    ticket = _Ticket(lane, next(dispatcher._seq))
+    with dispatcher._lock:
+        dispatcher._waiting.append(ticket)
+        dispatcher._dispatch()
+    return ticket
+
+
+def test_timeout_withdraws_the_ticket():
+    dispatcher = make_dispatcher()
+    dispatcher.acquire("background")
+    with pytest.raises(DispatchTimeout):
+        dispatcher.acquire("interactive", timeout=0)
+
+    assert dispatcher._waiting == []
+    lanes = dispatcher.get_stats()["lanes"]
+    assert lanes["interactive"]["abandoned"] == 1
+    assert lanes["background"]["active"] == 1
+    # Releasing hands the slot to nobody, so the next caller gets it straight away
+    dispatcher.release("background")
+    dispatcher.acquire("interactive", timeout=0)
+    assert dispatcher._active["interactive"] == 1
+
+
+def test_slot_is_released_when_the_block_raises():
+    dispatcher = make_dispatcher()
+    with pytest.raises(ValueError):
+        with dispatcher.slot("interactive"):
+            assert dispatcher._active["interactive"] == 1
+            raise ValueError()
+    assert sum(dispatcher._active.values()) == 0
+
+
+class InterruptedEvent(threading.Event):
+    def wait(self, timeout=None):
+        raise KeyboardInterrupt()
+
+
+def test_interrupted_wait_releases_a_granted_slot(monkeypatch):
+    dispatcher = make_dispatcher()
+    monkeypatch.setattr(dispatch.threading, "Event", InterruptedEvent)
+    # Granted inside acquire() before the wait is interrupted
+    with pytest.raises(KeyboardInterrupt):
+        dispatcher.acquire("interactive")
+    assert sum(dispatcher._active.values()) == 0
+    assert dispatcher._waiting == []
+
+
+def test_interrupted_wait_withdraws_a_queued_ticket(monkeypatch):
+    dispatcher = make_dispatcher()
+    dispatcher.acquire("background")
+    monkeypatch.setattr(dispatch.threading, "Event", InterruptedEvent)
+    with pytest.raises(KeyboardInterrupt):
+        dispatcher.acquire("interactive")
+    assert dispatcher._waiting == []
+    assert dispatcher._active == {"interactive": 0, "re_review": 0, "background": 1}
+    assert dispatcher.get_stats()["lanes"]["interactive"]["abandoned"] == 1
+
+
+def test_freed_slot_goes_to_the_highest_priority_waiter():
+    dispatcher = make_dispatcher()
+    dispatcher.acquire("background")
+    first_background = enqueue(dispatcher, "background")
+    re_review = enqueue(dispatcher, "re_review")
+    interactive = enqueue(dispatcher, "interactive")
+
+    dispatcher.release("background")
+    assert interactive.event.is_set()
+    assert not re_review.event.is_set() and not first_background.event.is_set()
+    dispatcher.release("interactive")
+    assert re_review.event.is_set() and not first_background.event.is_set()
+    dispatcher.release("re_review")
+    assert first_background.event.is_set()
+
+
+def test_reserved_slots_are_kept_for_their_lane():
+    dispatcher = make_dispatcher(max_concurrency=2, reserve_interactive=1)
+    dispatcher.acquire("background")
+    with pytest.raises(DispatchTimeout):
+        dispatcher.acquire("background", timeout=0)
+    dispatcher.acquire("interactive", timeout=0)
+    assert dispatcher._active == {"interactive": 1, "re_review": 0, "background": 1}
+
+
+def test_disabled_dispatcher_never_blocks():
+    dispatcher = make_dispatcher(max_concurrency=0)
+    with dispatcher.slot("background"), dispatcher.slot("background"):
+        assert sum(dispatcher._active.values()) == 0
+
+
+def test_lane_context_and_config_validation():
+    assert current_lane() == "interactive"
+    with dispatch_lane("background"):
+        with dispatch_lane("re_review"):
+            assert current_lane() == "re_review"
+        assert current_lane() == "background"
+    with pytest.raises(ValueError):
+        dispatch_lane("bulk").__enter__()
+    with pytest.raises(ValueError):
+        DispatchConfig.from_spec("max_concurrency=2,reserve_interactive=2,reserve_background=1")
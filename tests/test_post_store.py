@@ -0,0 +1,87 @@
+import pytest
+
+from agents.post_store import PostStore
+
+
+def post(post_id: str, confidence=None, rule_id=None, **fields):
+    return {"id": post_id, "confidence": confidence, "rule_id": rule_id, **fields}
+
+
+def test_snapshots_are_isolated_from_later_writes():
+    store = PostStore()
+    store.put_flagged(post("a", 0.9, "r1"))
+    before = store.snapshot()
+    store.approve("a")
+
+    assert (before.version, store.version) == (1, 2)
+    assert before.status("a") == "flagged" and before.todo_count == 1
+    assert store.snapshot().status("a") == "approved"
+    assert before.todo_posts == (before.get("a"),)
+
+
+def test_no_op_transaction_keeps_the_version():
+    store = PostStore()
+    with store.transaction() as txn:
+        assert not txn.approve("missing")
+        assert txn.remove("missing") is None
+    assert store.version == 0
+
+
+def test_failed_transaction_publishes_nothing():
+    store = PostStore()
+    store.put_flagged(post("a"))
+    snapshot = store.snapshot()
+    with pytest.raises(RuntimeError):
+        with store.transaction() as txn:
+            txn.approve("a")
+            txn.put_flagged(post("b"))
+            raise RuntimeError()
+    assert store.snapshot() is snapshot
+    # The write lock was released on the error path
+    store.put_flagged(post("c"))
+    assert store.version == 2
+
+
+def test_transaction_publishes_one_version_for_many_writes():
+    store = PostStore()
+    with store.transaction() as txn:
+        txn.put_flagged(post("a"))
+        txn.put_approved(post("b"))
+        txn.approve("a")
+    snapshot = store.snapshot()
+    assert snapshot.version == 1
+    assert set(snapshot.approved) == {"a", "b"} and snapshot.todo_count == 0
+
+
+def test_update_post_replaces_instead_of_mutating():
+    store = PostStore()
+    original = post("a", 0.5)
+    store.put_flagged(original)
+    before = store.snapshot()
+    assert store.update_post("a", confidence=0.8)
+    assert not store.update_post("missing", confidence=0.1)
+
+    assert original["confidence"] == 0.5
+    assert before.get("a")["confidence"] == 0.5
+    assert store.snapshot().get("a")["confidence"] == 0.8
+
+
+def test_query_confidence_bounds_and_rule_filter():
+    store = PostStore()
+    with store.transaction() as txn:
+        txn.put_flagged(post("low", 0.2, "r1", confidence_level="low"))
+        txn.put_flagged(post("mid", 0.5, "r1", confidence_level="medium"))
+        txn.put_flagged(post("high", 0.9, "r2", confidence_level="high"))
+        txn.put_flagged(post("unscored"))
+        txn.put_approved(post("ok", 0.5, "r1"))
+    snapshot = store.snapshot()
+
+    ids = lambda posts: [p["id"] for p in posts]
+    assert ids(snapshot.query()) == ["unscored", "low", "mid", "high"]
+    # min inclusive, max exclusive; unscored posts never match a confidence filter
+    assert ids(snapshot.query(min_confidence=0.5)) == ["mid", "high"]
+    assert ids(snapshot.query(max_confidence=0.5)) == ["low"]
+    assert ids(snapshot.query(rule_id="r1")) == ["low", "mid"]
+    assert ids(snapshot.query(confidence_level="high")) == ["high"]
+    assert ids(snapshot.query(status="approved", rule_id="r1")) == ["ok"]
+    assert snapshot.query(rule_id="r3") == []
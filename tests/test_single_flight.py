@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from agents.single_flight import SingleFlight
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition never became true"
+        time.sleep(0.001)
+
+
+class Leader:
+    """Runs flight.do(key, ...) on a thread and holds the call open until released"""
+
+    def __init__(self, flight: SingleFlight, key: str, outcome, rank: int = 0):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.result = None
+        self.error = None
+        self.outcome = outcome
+        self.thread = threading.Thread(target=self._run, args=(flight, key, rank))
+        self.thread.start()
+        assert self.started.wait(5)
+
+    def _call(self):
+        self.started.set()
+        assert self.release.wait(5)
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        return self.outcome
+
+    def _run(self, flight, key, rank):
+        try:
+            self.result = flight.do(key, self._call, rank=rank)
+        except BaseException as e:
+            self.error = e
+
+    def finish(self):
+        self.release.set()
+        self.thread.join(5)
+
+
+def join_in_background(flight: SingleFlight, key: str, call, rank: int = 0):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = flight.do(key, call, rank=rank)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_waiter_shares_the_leader_result():
+    flight = SingleFlight()
+    leader = Leader(flight, "k", "answer")
+    thread, outcome = join_in_background(flight, "k", lambda: pytest.fail("waiter must not call"))
+    wait_until(lambda: flight.get_stats()["coalesced"] == 1)
+    leader.finish()
+    thread.join(5)
+
+    assert leader.result == ("answer", False)
+    assert outcome["result"] == ("answer", True)
+    assert flight.in_flight() == 0
+    assert flight.get_stats()["executed"] == 1
+
+
+def test_leader_exception_propagates_to_waiters():
+    flight = SingleFlight()
+    error = RuntimeError("upstream failed")
+    leader = Leader(flight, "k", error)
+    thread, outcome = join_in_background(flight, "k", lambda: pytest.fail("waiter must not call"))
+    wait_until(lambda: flight.get_stats()["coalesced"] == 1)
+    leader.finish()
+    thread.join(5)
+
+    assert leader.error is error
+    assert outcome["error"] is error
+    assert flight.get_stats()["shared_errors"] == 1
+    assert flight.in_flight() == 0
+    # The failure is not cached: the next call runs again
+    assert flight.do("k", lambda: "retried") == ("retried", False)
+
+
+def test_more_urgent_caller_does_not_wait_behind_background_flight():
+    flight = SingleFlight()
+    background = Leader(flight, "k", "background", rank=2)
+    assert flight.do("k", lambda: "interactive", rank=0) == ("interactive", False)
+    assert flight.get_stats()["outranked"] == 1
+    # The background flight's landing leaves the newer flight's bookkeeping alone
+    background.finish()
+    assert background.result == ("background", False)
+    assert flight.in_flight() == 0
+
+
+def test_less_urgent_caller_joins_urgent_flight():
+    flight = SingleFlight()
+    leader = Leader(flight, "k", "interactive", rank=0)
+    thread, outcome = join_in_background(flight, "k", lambda: pytest.fail("waiter must not call"), rank=2)
+    wait_until(lambda: flight.get_stats()["coalesced"] == 1)
+    leader.finish()
+    thread.join(5)
+    assert outcome["result"] == ("interactive", True)
+
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    calls = []
+    for _ in range(2):
+        assert flight.do("k", lambda: calls.append(1) or len(calls)) == (len(calls), False)
+    assert len(calls) == 2
+    assert flight.get_stats()["calls"] == 0